@@ -1,97 +1,553 @@
-import copy
+import atexit
+import collections
+import concurrent.futures
+import hashlib
+import multiprocessing.shared_memory
 import random
+import sys
 import time
+
+import numpy as np
+
+import domaines as dom
+import lexique
+import moteur_feedback
 import utils
 
 
-def filtrer_propositions(pool, proposition, feedback):
+def filtrer_propositions(liste_mots, pool, proposition, feedback):
     """
     Fonction qui filtre l'ensemble des possibilités (pool) et élimine celles qui ne peuvent pas
-    être le mot secret selon le feedback (nombres des lettres correctes et proches).
+    être le mot secret selon le feedback (nombres des lettres correctes et proches) : préfiltre avec l'index
+    des lettres de la liste, puis feedback exact (vectorisé) pour les mots restants.
 
-    :param pool: liste des mots possibles
+    :param liste_mots: liste (ou groupe du lexique) des mots de la taille du mot secret
+    :param pool: indices des mots possibles dans la liste
     :param proposition: mot proposé
     :param feedback: feedback
 
-    :type pool: list[list[str]]
+    :type liste_mots: list[list[str]] | GroupeMots
+    :type pool: np.ndarray
     :type proposition: list[str]
     :type feedback: Feedback
 
-    :return: liste de mots possibles filtrés
-    :rtype: list[list[str]]
+    :return: indices des mots possibles filtrés
+    :rtype: np.ndarray
+    """
+
+    if len(pool) == 0:
+        return pool
+
+    # préfiltre avec les ensembles de l'index (bit à bit) : les mots éliminés sont sûrement incompatibles
+    index = lexique.obtenir_groupe(liste_mots, len(proposition)).index()
+    identifiants = index.identifiants(index.prefiltrer(proposition, feedback, index.ensemble(pool)))
+    if len(identifiants) == 0:
+        return identifiants
+
+    # calcul vectorisé des feedbacks de la proposition par rapport aux mots restants, avec le moteur de la liste
+    moteur = moteur_feedback.obtenir_moteur(liste_mots)
+
+    return moteur.filtrer(identifiants, proposition, feedback)
+
+
+# stratégies possibles pour évaluer la partition du pool induite par un mot proposé
+STRATEGIES = ("minimax", "esperance", "entropie")
+
+
+def scorer_partitions(histogrammes, strategy="minimax"):
     """
+    Fonction qui évalue, pour chaque mot proposé, la partition du pool selon les feedbacks qu'il induit
+    (plus le score est petit, meilleure est la proposition).
+    - "minimax" : taille de la plus grande partie (le pire cas)
+    - "esperance" : taille moyenne de la partie dans laquelle se trouvera le mot secret
+    - "entropie" : opposé de l'entropie de la partition (on cherche à maximiser l'information obtenue)
 
-    # pour chaque mot possible (pour chaque mot du pool des possibilités)
-    # si le mot est possible selon le feedback et si le mot n'est pas déjà le mot proposé
-    return [mot for mot in pool if utils.test_compatibilite(proposition, feedback, mot) and (mot != proposition)]
+    :param histogrammes: matrice du nombre de mots du pool par code de feedback (une ligne par mot proposé)
+    :param strategy: "minimax", "esperance" ou "entropie"
 
+    :type histogrammes: np.ndarray
+    :type strategy: str
 
-def donner_proposition(pool, feedback):
+    :return: vecteur des scores
+    :rtype: np.ndarray
     """
-    Fonction qui renvoie le meilleur choix de mot parmi les mots possibles (pool)
-    selon le feedback (nombres des lettres correctes et proches).
 
-    :param pool: liste des mots possibles
-    :param feedback: feedback
+    if strategy == "minimax":
+        return histogrammes.max(axis=1)
 
-    :type pool: list[list[str]]
-    :type feedback: Feedback
+    nb_mots = histogrammes.sum(axis=1, dtype=np.float64)
+
+    if strategy == "esperance":
+        return (histogrammes.astype(np.float64) ** 2).sum(axis=1) / nb_mots
+
+    if strategy == "entropie":
+        probas = histogrammes / nb_mots[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            termes = np.where(probas > 0, probas * np.log2(probas), 0.0)
+        return termes.sum(axis=1)
+
+    raise ValueError("Stratégie inconnue : {} (possibles : {}).".format(strategy, ", ".join(STRATEGIES)))
+
+
+# nombre min de mots possibles pour répartir leur évaluation sur plusieurs processus
+TAILLE_MIN_PARALLELE = 256
+
+
+def donner_proposition(moteur, pool, strategy="minimax", workers=None):
+    """
+    Fonction qui renvoie le meilleur choix de mot parmi les mots possibles (pool).
+    Pour chaque mot possible, on calcule en une passe l'histogramme des feedbacks qu'il induirait
+    sur le pool, c'est-à-dire la partition du pool selon le mot secret, et on choisit le mot
+    dont la partition a le meilleur score selon la stratégie.
+    En cas d'égalité, le premier mot du pool est choisi.
+    Avec plusieurs processus, les mots possibles sont répartis en tranches sur un pool de processus
+    (voir PoolPropositions) : le mot choisi est le même qu'avec un seul processus.
+
+    :param moteur: moteur de feedback de la taille des mots du pool
+    :param pool: indices des mots possibles dans le moteur
+    :param strategy: "minimax", "esperance" ou "entropie"
+    :param workers: nombre de processus (un seul, le processus courant, si None)
+
+    :type moteur: MoteurFeedback
+    :type pool: np.ndarray
+    :type strategy: str
+    :type workers: int
+
+    :return: indice du mot choisi dans le moteur (None si le pool est vide)
+    :rtype: int
+    """
+
+    if len(pool) == 0:
+        return None
+
+    if workers is not None and workers > 1 and len(pool) >= TAILLE_MIN_PARALLELE:
+        return obtenir_pool_propositions(moteur, workers).donner_proposition(pool, strategy)
+
+    _, position = meilleure_position(moteur, pool, 0, len(pool), strategy)
+
+    return int(pool[position])
+
+
+def meilleure_position(moteur, pool, debut, fin, strategy="minimax"):
+    """
+    Fonction qui renvoie le meilleur score et la position du premier mot qui l'atteint parmi les mots
+    possibles des positions debut à fin-1 du pool.
+
+    :param moteur: moteur de feedback de la taille des mots du pool
+    :param pool: indices des mots possibles dans le moteur
+    :param debut: position du premier mot évalué
+    :param fin: position du dernier mot évalué + 1
+    :param strategy: "minimax", "esperance" ou "entropie"
+
+    :type moteur: MoteurFeedback
+    :type pool: np.ndarray
+    :type debut: int
+    :type fin: int
+    :type strategy: str
+
+    :return: meilleur score, position du mot dans le pool
+    :rtype: (float, int)
+    """
+
+    meilleur_score = float('infinity')
+    position = None
+
+    # les histogrammes sont calculés par blocs de mots possibles pour limiter la mémoire utilisée
+    pas = max(1, moteur_feedback.TAILLE_BLOC // len(pool))
+    for debut_bloc in range(debut, fin, pas):
+        bloc = pool[debut_bloc:min(debut_bloc + pas, fin)]
+        scores = scorer_partitions(moteur.histogrammes(bloc, pool), strategy)
+
+        meilleur = int(np.argmin(scores))
+        if scores[meilleur] < meilleur_score:
+            meilleur_score = float(scores[meilleur])
+            position = debut_bloc + meilleur
+
+    return meilleur_score, position
+
+
+# dans chaque processus d'un pool de propositions : mémoires partagées, moteur de feedback et indices du pool
+_memoires_travailleur = None
+_moteur_travailleur = None
+_pool_travailleur = None
+
+
+def initialiser_travailleur(noms, taille, nb_mots, dossier_cache):
+    """
+    Fonction d'initialisation d'un processus d'un pool de propositions : construit le moteur de feedback
+    à partir des mots et des occurrences de leurs lettres en mémoire partagée (sans les copier).
+
+    :param noms: noms des mémoires partagées des mots, des occurrences et des indices du pool
+    :param taille: taille des mots
+    :param nb_mots: nombre de mots
+    :param dossier_cache: dossier du cache disque des tables de feedback (None si pas de cache)
+
+    :type noms: (str, str, str)
+    :type taille: int
+    :type nb_mots: int
+    :type dossier_cache: str
+    """
+
+    global _memoires_travailleur, _moteur_travailleur, _pool_travailleur
+    _memoires_travailleur = [multiprocessing.shared_memory.SharedMemory(name=nom) for nom in noms]
+    mots, compteurs, pool = _tableaux_partages(_memoires_travailleur, taille, nb_mots)
+
+    _moteur_travailleur = moteur_feedback.MoteurFeedback(lexique.GroupeMots(taille, mots, compteurs),
+                                                         dossier_cache=dossier_cache)
+    _pool_travailleur = pool
+
+
+def _tableaux_partages(memoires, taille, nb_mots):
+    """
+    Fonction qui renvoie les tableaux numpy des mémoires partagées d'un pool de propositions.
+    """
+
+    mots = np.ndarray((nb_mots, taille), dtype=np.uint8, buffer=memoires[0].buf)
+    compteurs = np.ndarray((nb_mots, moteur_feedback.NB_LETTRES), dtype=np.uint8, buffer=memoires[1].buf)
+    pool = np.ndarray((nb_mots,), dtype=np.int64, buffer=memoires[2].buf)
+
+    return mots, compteurs, pool
+
+
+def evaluer_tranche(taille_pool, debut, fin, strategy):
+    """
+    Fonction exécutée par un processus d'un pool de propositions : évalue les mots possibles des positions
+    debut à fin-1 du pool (lu en mémoire partagée).
+
+    :param taille_pool: nombre de mots du pool
+    :param debut: position du premier mot évalué
+    :param fin: position du dernier mot évalué + 1
+    :param strategy: "minimax", "esperance" ou "entropie"
+
+    :type taille_pool: int
+    :type debut: int
+    :type fin: int
+    :type strategy: str
 
-    :return: un mot
-    :rtype: str
+    :return: meilleur score de la tranche, position du mot dans le pool
+    :rtype: (float, int)
     """
 
-    longueur_minimale = float('infinity')
+    return meilleure_position(_moteur_travailleur, _pool_travailleur[:taille_pool], debut, fin, strategy)
+
+
+class PoolPropositions:
+    """
+    Pool de processus qui évalue les mots possibles de donner_proposition pour un moteur de feedback.
+    Les mots, les occurrences de leurs lettres et les indices du pool courant sont en mémoire partagée :
+    à chaque proposition, seules les bornes des tranches sont envoyées aux processus, qui renvoient le meilleur
+    score de leur tranche et sa position. La table des feedbacks, si le moteur a un cache disque, est projetée
+    en mémoire par chaque processus depuis le même fichier.
+    Le meilleur (score, position) des tranches est le premier meilleur mot du pool, comme en série.
+    """
+
+    def __init__(self, moteur, workers):
+        self.moteur = moteur        # moteur de feedback
+        self.workers = workers      # nombre de processus
+
+        if moteur.dossier_cache is not None:
+            # la table est calculée une seule fois ici, puis projetée en mémoire par chaque processus
+            moteur.table()
+
+        tailles = [moteur.mots.nbytes, moteur.compteurs.nbytes, moteur.nb_mots * np.dtype(np.int64).itemsize]
+        self.memoires = [multiprocessing.shared_memory.SharedMemory(create=True, size=max(1, taille))
+                         for taille in tailles]
+        mots, compteurs, self.pool = _tableaux_partages(self.memoires, moteur.taille, moteur.nb_mots)
+        mots[:] = moteur.mots + np.uint8(ord("a"))
+        compteurs[:] = moteur.compteurs
+
+        self.executeur = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=initialiser_travailleur,
+            initargs=(tuple(memoire.name for memoire in self.memoires), moteur.taille, moteur.nb_mots,
+                      moteur.dossier_cache))
+
+    def donner_proposition(self, pool, strategy="minimax"):
+        """
+        Fonction qui renvoie le meilleur choix de mot parmi les mots possibles (voir donner_proposition).
+
+        :param pool: indices des mots possibles dans le moteur
+        :param strategy: "minimax", "esperance" ou "entropie"
+
+        :type pool: np.ndarray
+        :type strategy: str
+
+        :return: indice du mot choisi dans le moteur
+        :rtype: int
+        """
+
+        self.pool[:len(pool)] = pool
+
+        bornes = np.linspace(0, len(pool), self.workers + 1).astype(int)
+        taches = [self.executeur.submit(evaluer_tranche, len(pool), int(debut), int(fin), strategy)
+                  for debut, fin in zip(bornes[:-1], bornes[1:]) if debut < fin]
+        _, position = min(tache.result() for tache in taches)
+
+        return int(pool[position])
+
+    def fermer(self):
+        """
+        Fonction qui arrête les processus et libère les mémoires partagées.
+        """
+
+        self.executeur.shutdown()
+        self.pool = None    # la mémoire partagée ne peut pas être fermée tant qu'un tableau l'utilise
+        for memoire in self.memoires:
+            memoire.close()
+            memoire.unlink()
+
+
+# pools de propositions déjà lancés, indexés par (identifiant du moteur, nombre de processus) :
+# ils sont gardés d'un tour et d'une partie à l'autre, et arrêtés à la fin du programme
+_pools_propositions = dict()
+
+
+def obtenir_pool_propositions(moteur, workers):
+    """
+    Fonction qui renvoie le pool de propositions d'un moteur de feedback (lancé une seule fois par moteur
+    et par nombre de processus).
+
+    :param moteur: moteur de feedback
+    :param workers: nombre de processus
+
+    :type moteur: MoteurFeedback
+    :type workers: int
+
+    :return: pool de propositions
+    :rtype: PoolPropositions
+    """
+
+    pool = _pools_propositions.get((id(moteur), workers))
+    if pool is not None and pool.moteur is not moteur:
+        # l'identifiant d'un moteur disparu a été réutilisé
+        pool.fermer()
+        pool = None
+    if pool is None:
+        pool = _pools_propositions[(id(moteur), workers)] = PoolPropositions(moteur, workers)
+
+    return pool
+
+
+@atexit.register
+def fermer_pools_propositions():
+    """
+    Fonction qui arrête tous les pools de propositions (appelée à la fin du programme).
+    """
+
+    for pool in _pools_propositions.values():
+        pool.fermer()
+    _pools_propositions.clear()
+
+
+# nombre de mots secrets de l'échantillon du premier tour de donner_proposition_echantillon
+TAILLE_ECHANTILLON = 256
+
+# nombre max d'éléments des matrices de feedbacks calculées entre deux vérifications de l'échéance
+TAILLE_BLOC_ECHANTILLON = 1 << 16
+
+
+def donner_proposition_echantillon(moteur, pool, strategy="minimax", budget_ms=100, rng=None, compteurs=None):
+    """
+    Fonction qui renvoie un bon choix de mot parmi les mots possibles (pool) en un temps limité.
+    Les mots possibles sont évalués dans un ordre aléatoire sur un échantillon de mots secrets du pool
+    (le pool entier s'il est petit), par blocs, jusqu'à l'échéance. Si tous les mots ont été évalués avant
+    l'échéance, les meilleurs sont réévalués sur un échantillon quatre fois plus grand, et ainsi de suite
+    jusqu'à évaluer sur tout le pool.
+    Le mot renvoyé est le meilleur du dernier tour terminé (ou, si le premier tour n'est pas terminé, le meilleur
+    des mots évalués) : au moins un bloc de mots est toujours évalué. Si le pool est petit et le budget suffisant,
+    le mot choisi est celui de donner_proposition.
+
+    :param moteur: moteur de feedback de la taille des mots du pool
+    :param pool: indices des mots possibles dans le moteur
+    :param strategy: "minimax", "esperance" ou "entropie"
+    :param budget_ms: temps max (en millisecondes)
+    :param rng: générateur aléatoire (un nouveau générateur si None)
+    :param compteurs: compteurs d'instrumentation (ou None)
+
+    :type moteur: MoteurFeedback
+    :type pool: np.ndarray
+    :type strategy: str
+    :type budget_ms: float
+    :type rng: np.random.Generator
+    :type compteurs: Compteurs
+
+    :return: indice du mot choisi dans le moteur (None si le pool est vide)
+    :rtype: int
+    """
+
+    if len(pool) == 0:
+        return None
+
+    echeance = time.perf_counter() + budget_ms / 1000
+    if rng is None:
+        rng = np.random.default_rng()
+
+    positions = rng.permutation(len(pool))  # positions dans le pool des mots à évaluer, dans l'ordre d'évaluation
+    taille_echantillon = min(len(pool), TAILLE_ECHANTILLON)
     mot_choisi = None
-    # mp = []  # liste (mot actuel, nombre de mots du pool ayant le même feedback que le mot actuel)
-    # mp_fb = []  # liste des mots du pool ayant le même feedback que le mot actuel
-
-    # pour chaque mot possible (pour chaque mot du pool des possibilités)
-    for mot_possible in pool:
-        # on filtre les possibilités pour le mot_possible
-        # c'est-à-dire qu'on récupère les mots du pool ayant le même feedback que le mot_possible
-        liste_mots_possibles = filtrer_propositions(pool, mot_possible, feedback)
-        # nombre de mots du pool ayant le même feedback que le mot_possible
-        nb_mots_possibles = len(liste_mots_possibles)
-        # mp.append((mot_possible, nb_mots_possibles))
-
-        # le pire cas : quand le feedback reste le même au prochain tour
-        # (quand on ne gagne aucune informations supplémentaires sur les lettres du mot secret)
-        # on cherche à ce que dans le pire cas, l'espace de recherche soit le plus petit possible
-        # (d'où l'intérêt de choisir la longueur minimale ici)
-        # dans le cas où nb_mots_possibles = 0 (quand aucun mot du pool n'a le même feedback que le mot_possible)
-        # ça veut dire que si le mot choisi n'est pas le bon, ça donnera forcément des informations en plus
-        if longueur_minimale > nb_mots_possibles:
-            longueur_minimale = nb_mots_possibles
-            mot_choisi = mot_possible
-            # mp_fb = liste_mots_possibles
-
-    # mp.sort(key=lambda x: x[1])
-    # print("mp : ", mp)
-    # print("mp_fb : ", mp_fb)
+
+    while True:
+        if taille_echantillon == len(pool):
+            secrets = pool
+        else:
+            secrets = pool[np.sort(rng.choice(len(pool), taille_echantillon, replace=False))]
+
+        # évaluation des mots par blocs, jusqu'à l'échéance
+        scores = np.full(len(pool), np.inf)
+        pas = max(1, TAILLE_BLOC_ECHANTILLON // len(secrets))
+        nb_evalues = 0
+        while nb_evalues < len(positions):
+            bloc = positions[nb_evalues:nb_evalues + pas]
+            scores[bloc] = scorer_partitions(moteur.histogrammes(pool[bloc], secrets), strategy)
+            nb_evalues += len(bloc)
+            if compteurs is not None:
+                compteurs.candidats_evalues += len(bloc)
+                compteurs.evaluations_feedback += len(bloc) * len(secrets)
+            if time.perf_counter() >= echeance:
+                break
+
+        termine = nb_evalues == len(positions)
+        if termine or mot_choisi is None:
+            # en cas d'égalité, le premier mot du pool est choisi (comme dans donner_proposition)
+            evalues = np.sort(positions[:nb_evalues])
+            mot_choisi = int(pool[evalues[np.argmin(scores[evalues])]])
+
+        if not termine or taille_echantillon == len(pool):
+            break
+
+        # raffinement : le quart des meilleurs mots est réévalué sur un échantillon plus grand
+        positions = positions[np.argsort(scores[positions], kind="stable")[:max(1, len(positions) // 4)]]
+        taille_echantillon = min(len(pool), 4 * taille_echantillon)
 
     return mot_choisi
 
 
-def verifie_consistance_locale(instanciation, contraintes):
+# taille max (en octets) par défaut d'un cache de propositions
+TAILLE_MAX_CACHE_PROPOSITIONS = 64 << 20
+
+# estimation de la place occupée par une entrée d'un OrderedDict, en plus de sa clé et de sa valeur
+TAILLE_ENTREE = 100
+
+
+class CachePropositions:
+    """
+    Cache des mots choisis par donner_proposition, indexé par une empreinte du pool : d'une partie à l'autre
+    (avec le même premier mot), les mêmes pools reviennent, et la proposition n'est calculée qu'une fois.
+    L'empreinte est le sha1 des mots du moteur, de la stratégie et de l'ensemble (bitset) des indices du pool :
+    elle ne dépend pas de l'ordre du pool, les pools doivent donc être triés (comme ceux donnés par moteur.filtrer)
+    pour que le mot choisi en cas d'égalité soit le même.
+    Quand la place occupée dépasse taille_max, les entrées utilisées le moins récemment sont supprimées.
     """
-    Fonction qui vérifie la consistance locale de l'instanciation donnée avec les contraintes.
 
-    :param instanciation: une instanciation
-    :param contraintes: liste des contraintes
+    def __init__(self, taille_max=TAILLE_MAX_CACHE_PROPOSITIONS):
+        self.taille_max = taille_max                # taille max (en octets) des entrées
+        self.taille = 0                             # taille estimée (en octets) des entrées
+        self.entrees = collections.OrderedDict()    # empreinte -> indice du mot choisi (du moins au plus récent)
+        self.succes = 0                             # nombre de propositions trouvées dans le cache
+        self.echecs = 0                             # nombre de propositions absentes du cache
+        self.evictions = 0                          # nombre d'entrées supprimées
 
-    :type instanciation: list[str]
-    :type contraintes:
+    def __len__(self):
+        return len(self.entrees)
 
-    :return: vrai si consistance locale, faux sinon
-    :rtype: bool
+    def __repr__(self):
+        return "CachePropositions({} entrées, {} octets, {} succès, {} échecs, {} évictions)".format(
+            len(self.entrees), self.taille, self.succes, self.echecs, self.evictions)
+
+    def empreinte(self, moteur, pool, strategy="minimax"):
+        """
+        Fonction qui renvoie l'empreinte d'un pool.
+
+        :param moteur: moteur de feedback de la taille des mots du pool
+        :param pool: indices des mots possibles dans le moteur
+        :param strategy: "minimax", "esperance" ou "entropie"
+
+        :type moteur: MoteurFeedback
+        :type pool: np.ndarray
+        :type strategy: str
+
+        :return: empreinte du pool
+        :rtype: bytes
+        """
+
+        ensemble = np.zeros(moteur.nb_mots, dtype=bool)
+        ensemble[pool] = True
+
+        empreinte = hashlib.sha1(moteur.empreinte.encode("ascii"))
+        empreinte.update(strategy.encode("ascii"))
+        empreinte.update(np.packbits(ensemble).tobytes())
+
+        return empreinte.digest()
+
+    def chercher(self, empreinte):
+        """
+        Fonction qui renvoie le mot choisi pour un pool s'il est dans le cache.
+
+        :param empreinte: empreinte du pool
+        :type empreinte: bytes
+
+        :return: indice du mot choisi (None s'il n'est pas dans le cache)
+        :rtype: int
+        """
+
+        mot_choisi = self.entrees.get(empreinte)
+        if mot_choisi is None:
+            self.echecs += 1
+        else:
+            self.succes += 1
+            self.entrees.move_to_end(empreinte)
+
+        return mot_choisi
+
+    def ajouter(self, empreinte, mot_choisi):
+        """
+        Fonction qui ajoute le mot choisi pour un pool, puis supprime les entrées utilisées le moins récemment
+        tant que le cache dépasse sa taille max.
+
+        :param empreinte: empreinte du pool
+        :param mot_choisi: indice du mot choisi
+
+        :type empreinte: bytes
+        :type mot_choisi: int
+        """
+
+        if empreinte not in self.entrees:
+            self.taille += sys.getsizeof(empreinte) + sys.getsizeof(mot_choisi) + TAILLE_ENTREE
+        self.entrees[empreinte] = mot_choisi
+        self.entrees.move_to_end(empreinte)
+
+        while self.taille > self.taille_max and self.entrees:
+            ancienne, ancien_mot = self.entrees.popitem(last=False)
+            self.taille -= sys.getsizeof(ancienne) + sys.getsizeof(ancien_mot) + TAILLE_ENTREE
+            self.evictions += 1
+
+    def vider(self):
+        """
+        Fonction qui vide le cache et remet les statistiques à zéro.
+        """
+
+        self.entrees.clear()
+        self.taille = 0
+        self.succes = 0
+        self.echecs = 0
+        self.evictions = 0
+
+
+# cache de propositions partagé par toutes les parties du processus
+_cache_propositions = CachePropositions()
+
+
+def obtenir_cache_propositions():
     """
+    Fonction qui renvoie le cache de propositions partagé par toutes les parties du processus.
 
-    # TODO ?
-    return True
+    :return: cache de propositions
+    :rtype: CachePropositions
+    """
+
+    return _cache_propositions
 
 
-def verifie_consistance_globale(instanciation, tentatives, dictionnaire, type_dico="trie"):
+def verifie_consistance_globale(instanciation, tentatives, dictionnaire, type_dico="trie", probleme=None):
     """
     Fonction qui vérifie la consistance globale de l'instanciation donnée avec les contraintes et le dictionnaire.
 
@@ -99,18 +555,23 @@ def verifie_consistance_globale(instanciation, tentatives, dictionnaire, type_di
     :param tentatives: liste des tentatives précédentes
     :param dictionnaire: dictionnaire de mots
     :param type_dico: "dict" ou "trie"
+    :param probleme: problème qui maintient l'ensemble des mots compatibles avec les tentatives (ou None)
 
     :type instanciation: list[str]
     :type tentatives: list[(list[str], Feedback)]
-    :type dictionnaire: dict[int, list[lits[str]]]
+    :type dictionnaire: dict[int, list[lits[str]]] | Lexique
     :type type_dico: str
+    :type probleme: WordleMindProblem
 
     :return: vrai si consistance globale, faux sinon
     :rtype: bool
     """
 
     # teste la compatibilité du mot avec les tentatives précédentes
-    if utils.get_nb_incompatibilites(instanciation, tentatives) != 0:
+    if probleme is not None:
+        if not probleme.is_compatible(instanciation):
+            return False
+    elif utils.get_nb_incompatibilites(instanciation, tentatives) != 0:
         return False
 
     # teste l'existence du mot dans le dictionnaire
@@ -119,11 +580,8 @@ def verifie_consistance_globale(instanciation, tentatives, dictionnaire, type_di
         taille_mot = len(instanciation)
         liste_mots = dictionnaire[taille_mot]
 
-        for m in liste_mots:
-            if m == instanciation:
-                return True
-
-        return False
+        # en temps constant avec un Lexique, par parcours de la liste avec un dictionnaire de listes
+        return instanciation in liste_mots
 
     elif type_dico == "trie":
         
@@ -136,109 +594,144 @@ def verifie_consistance_globale(instanciation, tentatives, dictionnaire, type_di
 
     print("Type du dictionnaire inconnu.")
 
-def instancier_variable(lettres_restantes, instanciation_partielle):
+def instancier_variable(domaines, var, instanciation):
+    """
+    Fonction qui instancie la variable avec la première lettre de son domaine. Les domaines ne contiennent que des
+    lettres localement consistantes (réduits par les feedbacks, puis par le forward-checking ou la propagation) :
+    la consistance du préfixe est vérifiée par l'appelant, qui essaie la lettre suivante en cas d'échec.
+    Les lettres essayées sont retirées du domaine (modification annulable avec le trail des domaines).
+
+    :param domaines: domaines des variables
+    :param var: indice de la variable à instancier
+    :param instanciation: instanciation courante (liste de taille fixe, modifiée sur place)
+
+    :type domaines: Domaines
+    :type var: int
+    :type instanciation: list[str]
+
+    :return: réussite de l'instanciation
+    :rtype: bool
+    """
+
+    # s'il ne reste plus de lettres, l'instanciation est impossible
+    if not domaines[var]:
+        return False
+
+    # prendre la premiere lettre du domaine et faire une instanciation avec cette lettre
+    lettre = dom.premiere_lettre(domaines[var])
+    domaines.retirer(var, dom.MASQUE_LETTRE[lettre])
+    instanciation[var] = lettre
+
+    return True
+
+
+def feedback_prefixe(tentative, instanciation, taille_prefixe):
     """
-    Fonction qui instancie la variable en vérifiant les contraintes locales.
+    Fonction qui renvoie le feedback du préfixe de l'instanciation par rapport à une tentative,
+    identique à utils.recuperer_feedback(tentative, instanciation[:taille_prefixe]) mais sans copier le préfixe.
+    Le nombre de lettres communes est le nombre de positions du préfixe dont la lettre n'apparait pas plus
+    de fois dans le préfixe (jusqu'à cette position) que dans la tentative.
 
-    :param lettres_restantes: liste des lettres restantes possibles
-    :param instanciation_partielle: une instanciation
+    :param tentative: mot de la tentative
+    :param instanciation: instanciation courante
+    :param taille_prefixe: nombre de variables instanciées
 
-    :type lettres_restantes: list[str]
-    :type instanciation_partielle: list[str]
+    :type tentative: list[str]
+    :type instanciation: list[str]
+    :type taille_prefixe: int
 
-    :return: réussite de l'instanciation, liste des lettres restantes après instantiation, instanciation courante
-    :rtype: (bool, list[str], list[str])
+    :return: nombre de lettres correctes, nombre de lettres proches
+    :rtype: (int, int)
     """
 
-    # tant qu'il reste des lettres
-    while lettres_restantes:
-        # prendre la premiere lettre de la liste
-        lettre = lettres_restantes.pop(0)
-        # faire une instanciation avec cette lettre
-        instanciation_courante = instanciation_partielle + [lettre]
+    correctes = 0
+    communes = 0
+    for i in range(taille_prefixe):
+        lettre = instanciation[i]
+        if tentative[i] == lettre:
+            correctes += 1
 
-        # si cette instanciation est possible,
-        # alors on retourne vrai avec la liste des lettres restantes et l'instanciation courante
-        if verifie_consistance_locale(instanciation_courante, []):  # TODO
-            return True, lettres_restantes, instanciation_courante
+        rang = 1
+        for j in range(i):
+            if instanciation[j] == lettre:
+                rang += 1
+        if rang <= tentative.count(lettre):
+            communes += 1
 
-    return False, [], instanciation_partielle
+    return correctes, communes - correctes
 
 
-def forward_checking(instanciation_partielle, taille_mot, all_lettres_restantes, tentatives, trie):
+def forward_checking(instanciation, taille_instanciation, taille_mot, domaines, tentatives, trie, curseurs,
+                     compteurs=None):
     """
+    Fonction qui réduit les domaines des variables non instanciées (modifications annulables avec le trail
+    des domaines) et vérifie qu'il reste possible de satisfaire les contraintes des tentatives précédentes.
+    Les noeuds du trie atteints par les préfixes de l'instanciation sont gardés dans une pile de curseurs :
+    curseurs[k] est le noeud du préfixe de taille k, et seul le dernier est calculé à chaque appel.
 
-    :param instanciation_partielle: mot partiellement instancié
+    :param instanciation: instanciation courante (seules les taille_instanciation premières lettres sont fixées)
+    :param taille_instanciation: nombre de variables instanciées
     :param taille_mot: nombre de lettres du mot secret
-    :param all_lettres_restantes: 
+    :param domaines: domaines des variables
     :param tentatives: liste des tentatives précédentes avec leur feedback
     :param trie: dictionnaire sous forme de Trie
+    :param curseurs: pile des noeuds du trie (curseurs[0] est la racine des mots de taille taille_mot)
+    :param compteurs: compteurs d'instrumentation (ou None)
 
-    :type instanciation_partielle: list[str]
+    :type instanciation: list[str]
+    :type taille_instanciation: int
     :type taille_mot: int
-    :type all_lettres_restantes: dict[int, list[str]]
+    :type domaines: Domaines
     :type tentatives: list[list[str], Feedback]
-    :type trie: 
+    :type trie: TrieCompact
+    :type curseurs: list[int]
+    :type compteurs: Compteurs
+
+    :return: vrai si l'instanciation peut encore être étendue en une solution, faux sinon
+    :rtype: bool
     """
-    
-    taille_instanciation = len(instanciation_partielle)
 
     # Etape 1 : forward-checking sur les contraintes induites par le dictionnaire
 
-    dico_de_travail = trie[taille_mot]
-
-    # On se positionne au bon niveau du Trie
-    for lettre in instanciation_partielle:
-        if lettre in dico_de_travail:
-            dico_de_travail = dico_de_travail[lettre]
+    # On avance le curseur du Trie avec la dernière lettre instanciée
+    noeud = trie.enfant(curseurs[taille_instanciation - 1], instanciation[taille_instanciation - 1])
+    curseurs[taille_instanciation] = noeud
+    if compteurs is not None:
+        compteurs.noeuds_trie += 1
+    if noeud < 0:
+        # aucun mot du dictionnaire ne commence par ce préfixe
+        return False
 
     # On met à jour le domaine de chaque variable qui n'est pas encore instanciée
+    # avec les lettres qu'on peut trouver à sa position sous le noeud courant
     # (Toutes les variables sont liées entre elles par le dictionnaire et les infos obtenues lors des tentatives)
 
-    lettres_possibles = dict()
-    for i in range(taille_instanciation, taille_mot):
-        lettres_possibles[i] = set()
-
-    check_forward(taille_instanciation, taille_mot, all_lettres_restantes, dico_de_travail, lettres_possibles)
-    
-    lettres_restantes = copy.copy(all_lettres_restantes[taille_instanciation])
-
     for i in range(taille_instanciation, taille_mot):
-        lettres_restantes = copy.copy(all_lettres_restantes[i])
-        for lettre in lettres_restantes:
-            if lettre not in lettres_possibles[i]:
-                all_lettres_restantes[i].remove(lettre)
+        if domaines.restreindre(i, trie.support(noeud, i - taille_instanciation)) == 0:
+            return False
 
     # Etape 2 : forward-checking sur les contraintes induites par les tentatives précédentes
 
     for tentative, (correctes, proches) in tentatives:
 
-        feedback = utils.recuperer_feedback(tentative, instanciation_partielle)
-        inst_partielle_correctes, inst_partielle_proches = feedback
+        inst_partielle_correctes, inst_partielle_proches = feedback_prefixe(tentative, instanciation,
+                                                                            taille_instanciation)
 
         correctes_manquantes = correctes - inst_partielle_correctes
-        # if correctes_manquantes == 0: 
-        #     for i in range(taille_instanciation, taille_mot): # parmi les variables restantes
-        #         if tentative[i] in all_lettres_restantes[i]:
-        #             all_lettres_restantes[i].remove(tentative[i])
-        if correctes_manquantes > 0 :
-            for i in range(taille_instanciation, taille_mot): # parmi les variables restantes
-                if tentative[i] in all_lettres_restantes[i]:
+        if correctes_manquantes > 0:
+            for i in range(taille_instanciation, taille_mot):  # parmi les variables restantes
+                if domaines[i] & dom.MASQUE_LETTRE[tentative[i]]:
                     correctes_manquantes -= 1
             if correctes_manquantes > 0:
                 return False
         # correctes_manquantes ne peut pas être négatif normalement car on n'instancie qu'une lettre à la fois
 
         proches_manquantes = proches - inst_partielle_proches
-        # if proches_manquantes == 0: 
-        #     for i in range(taille_mot): # parmi les lettres restantes dans la tentative
-        #         for j in range(taille_instanciation, taille_mot): # parmi les variables restantes
-        #             if i != j and tentative[i] in all_lettres_restantes[j]:
-        #                 all_lettres_restantes[j].remove(tentative[i])
-        if proches_manquantes > 0 :
-            for i in range(taille_mot): # parmi les lettres restantes dans la tentative
-                for j in range(taille_instanciation, taille_mot): # parmi les variables restantes
-                    if i != j and tentative[i] in all_lettres_restantes[j]:
+        if proches_manquantes > 0:
+            for i in range(taille_mot):  # parmi les lettres restantes dans la tentative
+                masque = dom.MASQUE_LETTRE[tentative[i]]
+                for j in range(taille_instanciation, taille_mot):  # parmi les variables restantes
+                    if i != j and domaines[j] & masque:
                         proches_manquantes -= 1
                         break
             if proches_manquantes > 0:
@@ -246,24 +739,224 @@ def forward_checking(instanciation_partielle, taille_mot, all_lettres_restantes,
 
     return True
 
-def check_forward(var, taille_mot, all_lettres_restantes, trie_partiel, lettres_possibles):
 
-    if var == taille_mot:
-        return
+def full_look_ahead(instanciation, taille_instanciation, taille_mot, domaines, tentatives, trie, curseurs,
+                    compteurs=None):
+    """
+    Fonction qui fait le forward-checking puis propage les contraintes jusqu'à un point fixe (style AC-3) :
+    la contrainte du dictionnaire (seules les lettres qui appartiennent à un mot du trie compatible avec
+    tous les domaines sont gardées) et, pour chaque tentative précédente, les contraintes de cardinalité
+    sur le nombre de lettres correctes et sur le nombre de lettres communes (correctes + proches).
+    Les modifications des domaines sont annulables avec le trail des domaines.
+
+    :param instanciation: instanciation courante (seules les taille_instanciation premières lettres sont fixées)
+    :param taille_instanciation: nombre de variables instanciées
+    :param taille_mot: nombre de lettres du mot secret
+    :param domaines: domaines des variables
+    :param tentatives: liste des tentatives précédentes avec leur feedback
+    :param trie: dictionnaire sous forme de Trie
+    :param curseurs: pile des noeuds du trie (curseurs[0] est la racine des mots de taille taille_mot)
+    :param compteurs: compteurs d'instrumentation (ou None)
+
+    :type instanciation: list[str]
+    :type taille_instanciation: int
+    :type taille_mot: int
+    :type domaines: Domaines
+    :type tentatives: list[list[str], Feedback]
+    :type trie: TrieCompact
+    :type curseurs: list[int]
+    :type compteurs: Compteurs
+
+    :return: vrai si l'instanciation peut encore être étendue en une solution, faux sinon
+    :rtype: bool
+    """
+
+    if not forward_checking(instanciation, taille_instanciation, taille_mot, domaines, tentatives, trie, curseurs,
+                            compteurs):
+        return False
+
+    # on propage tant que les tentatives réduisent un domaine (chaque réduction ajoute une entrée au trail)
+    while True:
+        if not propager_dictionnaire(taille_instanciation, taille_mot, domaines, trie,
+                                     curseurs[taille_instanciation], compteurs):
+            return False
+
+        marque = domaines.marque()
+        for tentative, feedback in tentatives:
+            if not propager_tentative(instanciation, taille_instanciation, taille_mot, domaines, tentative,
+                                      feedback):
+                return False
+        if domaines.marque() == marque:
+            return True
+
+
+def propager_dictionnaire(taille_instanciation, taille_mot, domaines, trie, noeud, compteurs=None):
+    """
+    Fonction qui rend la contrainte du dictionnaire arc-consistante : le domaine de chaque variable non
+    instanciée est réduit aux lettres qui apparaissent à sa position dans au moins un mot du trie qui
+    commence par le préfixe instancié et dont toutes les lettres sont dans les domaines.
+    On calcule les noeuds atteignables à chaque niveau depuis le noeud du préfixe, puis on remonte
+    en ne gardant que les noeuds qui mènent à la fin d'un mot.
+
+    :param taille_instanciation: nombre de variables instanciées
+    :param taille_mot: nombre de lettres du mot secret
+    :param domaines: domaines des variables
+    :param trie: dictionnaire sous forme de Trie
+    :param noeud: noeud du trie atteint par le préfixe instancié
+    :param compteurs: compteurs d'instrumentation (ou None)
+
+    :type taille_instanciation: int
+    :type taille_mot: int
+    :type domaines: Domaines
+    :type trie: TrieCompact
+    :type noeud: int
+    :type compteurs: Compteurs
+
+    :return: faux si un domaine devient vide, vrai sinon
+    :rtype: bool
+    """
+
+    # arcs du trie atteignables à chaque niveau en suivant les domaines : (noeud, lettre, fils)
+    niveaux = []
+    noeuds = [noeud]
+    for var in range(taille_instanciation, taille_mot):
+        domaine = domaines[var]
+        arcs = []
+        suivants = set()
+        for n in noeuds:
+            masque = domaine & trie.masque_lettres(n)
+            while masque:
+                bit = masque & -masque
+                masque ^= bit
+                fils = trie.enfant(n, dom.ALPHABET[bit.bit_length() - 1])
+                arcs.append((n, bit, fils))
+                suivants.add(fils)
+        if compteurs is not None:
+            compteurs.noeuds_trie += len(noeuds)
+        if not arcs:
+            return False
+        niveaux.append(arcs)
+        noeuds = suivants
+
+    # en remontant, on ne garde que les arcs qui mènent à un noeud vivant (qui mène à la fin d'un mot) :
+    # au dernier niveau, tous les fils sont des fins de mot
+    vivants = noeuds
+    for var in range(taille_mot - 1, taille_instanciation - 1, -1):
+        support = 0
+        nouveaux_vivants = set()
+        for n, bit, fils in niveaux[var - taille_instanciation]:
+            if fils in vivants:
+                support |= bit
+                nouveaux_vivants.add(n)
+
+        if domaines.restreindre(var, support) == 0:
+            return False
+        vivants = nouveaux_vivants
+
+    return True
+
+
+def propager_tentative(instanciation, taille_instanciation, taille_mot, domaines, tentative, feedback):
+    """
+    Fonction qui propage les contraintes de cardinalité d'une tentative précédente sur les domaines.
+    Lettres correctes : si le nombre de positions déjà correctes atteint le feedback, la lettre de la tentative
+    est retirée des autres positions ; s'il faut toutes les positions encore possibles, elles sont fixées.
+    Lettres communes : on encadre le nombre de lettres communes avec la tentative à partir des lettres
+    imposées (variables instanciées ou de domaine réduit à une lettre) et des lettres possibles ; si une borne
+    atteint le feedback, on retire ou on impose les lettres qui la feraient dépasser.
+
+    :param instanciation: instanciation courante
+    :param taille_instanciation: nombre de variables instanciées
+    :param taille_mot: nombre de lettres du mot secret
+    :param domaines: domaines des variables
+    :param tentative: mot de la tentative
+    :param feedback: feedback de la tentative
+
+    :type instanciation: list[str]
+    :type taille_instanciation: int
+    :type taille_mot: int
+    :type domaines: Domaines
+    :type tentative: list[str]
+    :type feedback: Feedback
+
+    :return: faux si la tentative ne peut plus être satisfaite, vrai sinon
+    :rtype: bool
+    """
 
-    for k in trie_partiel.keys():
-        lettres_possibles[var].add(k)
+    correctes, proches = feedback
 
-    lettres_restantes = copy.copy(all_lettres_restantes[var])
+    # lettres correctes
 
-    # pour chaque lettre possible pour la variable courante, on ajoute tous les successeurs
-    for lettre in lettres_restantes:
-        if lettre in trie_partiel:
-            check_forward(var+1, taille_mot, all_lettres_restantes, trie_partiel[lettre], lettres_possibles)
+    nb_correctes = 0    # positions forcément correctes
+    incertaines = []    # positions qui peuvent être correctes ou non
+    for i in range(taille_instanciation):
+        if instanciation[i] == tentative[i]:
+            nb_correctes += 1
+    for i in range(taille_instanciation, taille_mot):
+        bit = dom.MASQUE_LETTRE[tentative[i]]
+        if domaines[i] == bit:
+            nb_correctes += 1
+        elif domaines[i] & bit:
+            incertaines.append(i)
 
+    if nb_correctes > correctes or nb_correctes + len(incertaines) < correctes:
+        return False
+    if nb_correctes == correctes:
+        for i in incertaines:
+            domaines.retirer(i, dom.MASQUE_LETTRE[tentative[i]])
+    elif nb_correctes + len(incertaines) == correctes:
+        for i in incertaines:
+            domaines.restreindre(i, dom.MASQUE_LETTRE[tentative[i]])
+
+    # lettres communes
+
+    occurrences = dict()    # nombre d'occurrences de chaque lettre dans la tentative
+    for lettre in tentative:
+        occurrences[lettre] = occurrences.get(lettre, 0) + 1
+    minimum = dict.fromkeys(occurrences, 0)     # nombre minimal d'occurrences de chaque lettre dans le mot
+    maximum = dict.fromkeys(occurrences, 0)     # nombre maximal d'occurrences de chaque lettre dans le mot
+
+    for i in range(taille_instanciation):
+        lettre = instanciation[i]
+        if lettre in occurrences:
+            minimum[lettre] += 1
+            maximum[lettre] += 1
+    libres = []     # variables non instanciées dont le domaine a plusieurs lettres
+    for i in range(taille_instanciation, taille_mot):
+        masque = domaines[i]
+        for lettre in occurrences:
+            if masque & dom.MASQUE_LETTRE[lettre]:
+                maximum[lettre] += 1
+                if masque == dom.MASQUE_LETTRE[lettre]:
+                    minimum[lettre] += 1
+        if masque & (masque - 1):
+            libres.append(i)
+
+    communes = correctes + proches
+    borne_inf = sum(min(minimum[lettre], nb) for lettre, nb in occurrences.items())
+    borne_sup = sum(min(maximum[lettre], nb) for lettre, nb in occurrences.items())
+
+    if borne_inf > communes or borne_sup < communes:
+        return False
+    if borne_inf == communes:
+        # une lettre de plus en commun dépasserait le feedback
+        interdites = 0
+        for lettre, nb in occurrences.items():
+            if minimum[lettre] < nb:
+                interdites |= dom.MASQUE_LETTRE[lettre]
+        for i in libres:
+            if domaines.retirer(i, interdites) == 0:
+                return False
+    elif borne_sup == communes:
+        # chaque lettre doit apparaitre autant de fois que possible (dans la limite de la tentative)
+        for lettre, nb in occurrences.items():
+            if minimum[lettre] < maximum[lettre] <= nb:
+                bit = dom.MASQUE_LETTRE[lettre]
+                for i in libres:
+                    if domaines[i] & bit and domaines.restreindre(i, bit) == 0:
+                        return False
 
-def full_look_ahead():
-    pass
+    return True
 
     
 
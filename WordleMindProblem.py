@@ -1,39 +1,54 @@
-import copy
 import random
+import time
+
+import numpy as np
 
 import algo_genetique as ag
 import CSP as csp
+import domaines as dom
+import lexique
+import livre_ouvertures
+import moteur_feedback
 import utils
 
 
 class WordleMindProblem:
 
-    def __init__(self, mot_secret, dictionnaire, trie):
+    def __init__(self, mot_secret, dictionnaire, trie, compteurs=None):
         self.mot_secret = mot_secret        # mot secret (list[str])
         self.taille_mot = len(mot_secret)   # taille du mot secret
         self.dictionnaire = dictionnaire    # dictionnaire de mots
         self.trie = trie                    # Trie du dictionnaire
         self.tentatives = []                # liste de tentatives (les mots qui ont été testés)
         self.nb_tentatives = 0              # nombre de tentatives faites
+        self.budgets = []                   # temps utilisé et budget de chaque tour de l'algorithme génétique
+        self.compteurs = compteurs          # compteurs d'instrumentation (None : pas de comptage)
 
-        # key: indice des variables du csp
-        # value: domaine des variables (liste de lettres)
-        self.domaines = dict()
-        for i in range(self.taille_mot):
-            self.domaines[i] = utils.alphabet.copy()
+        # domaine des variables du csp (masque des lettres possibles pour chaque lettre du mot)
+        self.domaines = dom.Domaines([dom.MASQUE_ALPHABET] * self.taille_mot)
 
         self.contraintes = []  # liste des contraintes
 
+        # mots du dictionnaire encore compatibles avec toutes les tentatives (identifiant i pour le mot i du groupe
+        # des mots de la taille du mot secret) : l'index, l'ensemble et le masque ne sont construits qu'au premier
+        # accès (is_compatible, candidates ou count), puis mis à jour avec les tentatives faites depuis
+        self.groupe = lexique.obtenir_groupe(dictionnaire[self.taille_mot], self.taille_mot)
+        self.index = None                   # index des lettres du groupe
+        self.candidats = None               # ensemble des mots compatibles (bit i pour le mot i)
+        self.masque = None                  # masque des mots compatibles (masque[i] vaut 1 pour le mot i, bytearray)
+        self.nb_tentatives_filtrees = 0     # nombre de tentatives déjà prises en compte dans les candidats
+
 
     def resolution_par_CSP(self, type_dico="dict", version="A2", verbose=False):
         """
         Fonction qui fait la résolution de Wordle Mind sous forme de CSP, par Retour Arrière Chronologique (RAC). 
-        La version A2 utilise le forward-checking (FC).
-        Attention : A2 ne marche qu'avec un Trie.
+        La version A2 utilise le forward-checking (FC), la version A3 propage en plus toutes les contraintes
+        (dictionnaire et tentatives) jusqu'à un point fixe (full look-ahead).
+        Attention : A2 et A3 ne marchent qu'avec un Trie.
 
         :param verbose: si on veut l'affichage des tentatives
         :param type_dico: type du dictionnaire ("dict" ou "trie")
-        :param version: "A1" (version basique) ou "A2" (avec FC)
+        :param version: "A1" (version basique), "A2" (avec FC) ou "A3" (avec full look-ahead)
 
         :type type_dico: str
         :type version: str
@@ -48,80 +63,109 @@ class WordleMindProblem:
         elif type_dico == "trie":
             dictionnaire = self.trie
 
-        fin = False  # flag pour savoir quand le jeu se termine
         indice_var = 0  # indice de la variable du csp (lettre du mot)
-        instanciation_courante = []  # instanciation courante (list[str])
-        all_lettres_restantes = copy.deepcopy(self.domaines)  # dictionnaire des lettres restantes pour chaque variable
+        instanciation_courante = [None] * self.taille_mot  # instanciation courante (list[str])
 
-        # tant qu'on a pas fini (trouvé le mot secret)
-        while not fin:
+        # domaines des lettres restantes pour chaque variable : les modifications sont enregistrées dans le trail
+        # et annulées au backtrack, sans jamais dépasser les domaines réduits par les tentatives
+        domaines = dom.Domaines(self.domaines.masques, bornes=self.domaines.masques)
+        choix = [0] * self.taille_mot  # marque du trail juste après l'instanciation de chaque variable
 
-            if indice_var < 0:
-                print("Le mot secret n'existe pas dans le dictionnaire.")
+        # pile des noeuds du trie atteints par les préfixes de l'instanciation (pour le forward-checking)
+        curseurs = [-1] * (self.taille_mot + 1)
+        if version in ("A2", "A3"):
+            curseurs[0] = dictionnaire.racine(self.taille_mot)
 
-            continuer_avec_var = False
-            backtrack = False
+        # tant qu'on a pas fini (trouvé le mot secret)
+        while indice_var >= 0:
 
-            # réussite de l'instanciation, lettres restantes pour la variable courante, instanciation courante
-            reussite, lettres_restantes, instanciation_courante \
-                = csp.instancier_variable(all_lettres_restantes[indice_var], instanciation_courante)
-            # print("reussite:", reussite, "| var:", indice_var, "| inst:", instanciation_courante)
-            # print("all:", all_lettres_restantes)
+            # réussite de l'instanciation de la variable courante
+            reussite = csp.instancier_variable(domaines, indice_var, instanciation_courante)
 
             # si l'instanciation de la variable courante a réussi
             if reussite:
-                all_lettres_restantes[indice_var] = lettres_restantes
-                indice_var += 1  # variable suivante
+                choix[indice_var] = domaines.marque()
                 # si la taille du mot courant est celle du mot secret
-                if indice_var == self.taille_mot:
+                if indice_var == self.taille_mot - 1:
                     # si le mot existe et s'il est compatible
-                    if csp.verifie_consistance_globale(instanciation_courante, self.tentatives, dictionnaire, type_dico):
+                    mot = instanciation_courante[:]
+                    if csp.verifie_consistance_globale(mot, self.tentatives, dictionnaire, type_dico, self):
 
                         # fait une tentative avec l'instanciation courante
-                        fin, feedback = self.test_tentative(instanciation_courante, verbose)
+                        fin, feedback = self.test_tentative(mot, verbose)
 
                         # si on a trouvé le mot secret, alors on s'arrête et on renvoie le nombre de tentatives faites
                         if fin:
                             return self.nb_tentatives
                         else:  # sinon on reste sur la même variable
-                            # met à jour la liste des lettres restantes en fonction de la mise à jour des domaines
-                            utils.reduire_domaines(instanciation_courante, feedback, all_lettres_restantes)
-                            continuer_avec_var = True
+                            # met à jour les lettres restantes en fonction de la mise à jour des domaines
+                            utils.reduire_domaines(mot, feedback, domaines)
 
-                    else:  # sinon on reste sur la même variable
-                        continuer_avec_var = True
-                else:
+                    # sinon on reste sur la même variable
+                elif version in ("A2", "A3"):
                     if version == "A2":
-                        consistant = csp.forward_checking(instanciation_courante, self.taille_mot, all_lettres_restantes, self.tentatives, dictionnaire)
-                        if not consistant:
-                            backtrack = True
+                        consistant = csp.forward_checking(instanciation_courante, indice_var + 1, self.taille_mot,
+                                                          domaines, self.tentatives, dictionnaire, curseurs,
+                                                          self.compteurs)
+                    else:
+                        consistant = csp.full_look_ahead(instanciation_courante, indice_var + 1, self.taille_mot,
+                                                         domaines, self.tentatives, dictionnaire, curseurs,
+                                                         self.compteurs)
+                    if self.compteurs is not None:
+                        self.compteurs.elagages_fc += not consistant
+                    if consistant:
+                        indice_var += 1  # variable suivante
+                    else:
+                        # on annule le filtrage et on essaie la lettre suivante
+                        domaines.annuler(choix[indice_var])
+                else:
+                    indice_var += 1  # variable suivante
 
             else:  # sinon backtracking
-                backtrack = True
-
-            if continuer_avec_var:
-                indice_var -= 1
-                instanciation_courante = instanciation_courante[:indice_var]
-            elif backtrack:
-                if version == "A1":
-                    all_lettres_restantes[indice_var] = copy.copy(self.domaines[indice_var])                    
-                elif version == "A2":
-                    for i in range(indice_var, self.taille_mot):
-                        all_lettres_restantes[i] = copy.copy(self.domaines[i])
                 indice_var -= 1
-                instanciation_courante = instanciation_courante[:indice_var]
+                if self.compteurs is not None:
+                    self.compteurs.retours_arriere += 1
+                if indice_var >= 0:
+                    # on rend aux variables suivantes les lettres retirées depuis l'instanciation de la variable
+                    domaines.annuler(choix[indice_var])
+
+        print("Le mot secret n'existe pas dans le dictionnaire.")
 
         return self.nb_tentatives
 
-    def resolution_par_CSP_opt(self, premier_mot=None, verbose=False):
+    def resolution_par_CSP_opt(self, premier_mot=None, verbose=False, strategy="minimax", arbre=None, cache=None,
+                               ouvertures=True, budget_ms=None, rng=None, workers=None):
         """
         Fonction qui fait la résolution de Wordle Mind en CSP de manière optimisée.
-
-        :param premier_mot: premier mot à tester
+        À chaque tour, on propose le mot possible qui partitionne le mieux les mots possibles restants.
+        Avec un arbre de stratégie (voir arbre_strategie), les propositions sont lues dans l'arbre au lieu
+        d'être recalculées : les tentatives sont les mêmes que sans arbre pour ce premier mot et cette stratégie.
+        Sans arbre, les deuxième et troisième propositions sont lues dans le livre d'ouvertures s'il en contient
+        pour ce premier mot (voir livre_ouvertures), et les propositions déjà calculées pour le même pool
+        (dans cette partie ou une précédente) sont lues dans un cache de propositions.
+        Avec un budget, les autres propositions sont choisies en temps limité par échantillonnage
+        (voir donner_proposition_echantillon) et ne sont pas ajoutées au cache.
+
+        :param premier_mot: premier mot à tester (avec un arbre : celui de l'arbre si None)
         :param verbose: si on veut l'affichage des tentatives
+        :param strategy: score de la partition à minimiser ("minimax", "esperance" ou "entropie")
+        :param arbre: arbre de stratégie des mots de la taille du mot secret (ou None)
+        :param cache: cache de propositions (celui partagé par les parties du processus si None)
+        :param ouvertures: si on veut utiliser le livre d'ouvertures (quand un premier mot est donné)
+        :param budget_ms: temps max (en millisecondes) du choix de chaque proposition (choix exact si None)
+        :param rng: générateur aléatoire de l'échantillonnage (un nouveau générateur si None)
+        :param workers: nombre de processus qui évaluent les mots possibles du choix exact (voir
+                        donner_proposition ; un seul, le processus courant, si None)
 
         :type premier_mot: list[str]
         :type verbose: bool
+        :type strategy: str
+        :type arbre: ArbreStrategie
+        :type cache: CachePropositions
+        :type ouvertures: bool
+        :type budget_ms: float
+        :type rng: np.random.Generator
+        :type workers: int
 
         :return: nombre de tentatives faites
         :rtype: int
@@ -129,52 +173,155 @@ class WordleMindProblem:
 
         fin = False  # flag pour savoir quand le jeu se termine
         liste_mots = self.dictionnaire[self.taille_mot]  # sélection des mots correspondant à la taille du mot secret
+        moteur = moteur_feedback.obtenir_moteur(liste_mots)  # moteur de feedback de la taille du mot secret
+        indices = np.arange(len(liste_mots))  # indices des mots possibles
+
+        if arbre is not None:
+            return self._resolution_par_arbre(arbre, moteur, premier_mot, verbose)
+
+        if cache is None:
+            cache = csp.obtenir_cache_propositions()
 
         # choix du premier (s'il n'y pas de premier mot donné)
+        livre = dict()
         if premier_mot is None:
             # aléatoire
             proposition = random.choice(liste_mots)
         else:
             # celui donné en paramètre
             proposition = premier_mot
+            if ouvertures:
+                livre = livre_ouvertures.obtenir_livre(liste_mots, premier_mot, strategy)
+        codes = ()  # codes des feedbacks obtenus
 
         # tant qu'on a pas fini (trouvé le mot secret)
         while not fin:
             fin, feedback = self.test_tentative(proposition, verbose)
-            liste_mots = csp.filtrer_propositions(liste_mots, proposition, feedback)
-            proposition = csp.donner_proposition(liste_mots, feedback)
+            if self.compteurs is not None:
+                self.compteurs.evaluations_feedback += len(indices)
+            indices = moteur.filtrer(indices, proposition, feedback)
+            if not fin:
+                codes += (moteur.code(feedback),)
+                mot_choisi = livre.get(codes)
+                if mot_choisi is None:
+                    empreinte = cache.empreinte(moteur, indices, strategy)
+                    mot_choisi = cache.chercher(empreinte)
+                if mot_choisi is None and budget_ms is not None:
+                    mot_choisi = csp.donner_proposition_echantillon(moteur, indices, strategy, budget_ms, rng,
+                                                                    self.compteurs)
+                elif mot_choisi is None:
+                    if self.compteurs is not None:
+                        self.compteurs.evaluations_feedback += len(indices) ** 2
+                        self.compteurs.candidats_evalues += len(indices)
+                    mot_choisi = csp.donner_proposition(moteur, indices, strategy, workers)
+                    cache.ajouter(empreinte, mot_choisi)
+                proposition = liste_mots[mot_choisi]
+
+        return self.nb_tentatives
+
+    def _resolution_par_arbre(self, arbre, moteur, premier_mot, verbose=False):
+        """
+        Fonction qui joue une partie de resolution_par_CSP_opt en descendant dans un arbre de stratégie :
+        à chaque tour, le mot proposé est celui du noeud, et le feedback obtenu donne le fils.
+
+        :param arbre: arbre de stratégie
+        :param moteur: moteur de feedback de la taille du mot secret
+        :param premier_mot: premier mot à tester (doit être celui de l'arbre, ou None)
+        :param verbose: si on veut l'affichage des tentatives
+
+        :type arbre: ArbreStrategie
+        :type moteur: MoteurFeedback
+        :type premier_mot: list[str]
+        :type verbose: bool
+
+        :return: nombre de tentatives faites
+        :rtype: int
+        """
+
+        if arbre.empreinte != moteur.empreinte:
+            raise ValueError("L'arbre de stratégie n'a pas été construit pour les mots de taille {}."
+                             .format(self.taille_mot))
+
+        liste_mots = self.dictionnaire[self.taille_mot]
+        noeud = 0
+        if premier_mot is not None and list(premier_mot) != list(liste_mots[arbre.proposition(noeud)]):
+            raise ValueError("L'arbre de stratégie commence par {}, pas par {}."
+                             .format(self.groupe.mot_str(arbre.proposition(noeud)), "".join(premier_mot)))
+
+        fin = False
+        while not fin:
+            fin, feedback = self.test_tentative(liste_mots[arbre.proposition(noeud)], verbose)
+            if not fin:
+                noeud = arbre.fils(noeud, moteur.code(feedback))
+                if noeud < 0:
+                    print("Le mot secret n'existe pas dans le dictionnaire.")
+                    break
 
         return self.nb_tentatives
 
-    def resolution_par_algo_genetique(self, maxsize, maxgen, verbose=False):
+    def resolution_par_algo_genetique(self, maxsize, maxgen, verbose=False, taille_pop=5, vectorise=False,
+                                      rng=None, workers=None, budget_tour=300):
         """
         Fonction qui fait la résolution de Wordle Mind avec un algorithme génétique.
+        La version vectorisée fait évoluer toute la population à la fois (adaptée aux grandes populations).
+        Avec plusieurs processus (workers), la version vectorisée est lancée en modèle en îles : une population
+        de taille taille_pop par processus, avec migration des meilleurs individus entre les îles.
+        Si un générateur est donné, il sert aussi à choisir les mots proposés : la partie est reproductible.
+        Chaque tour a un budget de temps : à l'échéance, si aucun mot compatible n'a été trouvé, le mot proposé
+        est choisi parmi les meilleurs enfants trouvés. Le temps utilisé par chaque tour est gardé dans budgets.
 
         :param maxsize: taille max de l'ensemble E
         :param maxgen: nombre de génération
         :param verbose: si on veut l'affichage des tentatives
+        :param taille_pop: taille de la population
+        :param vectorise: si on veut la version vectorisée de l'algorithme génétique
+        :param rng: générateur aléatoire de la version vectorisée (un nouveau générateur si None)
+        :param workers: nombre de processus (et d'îles) du modèle en îles (None pour un seul processus)
+        :param budget_tour: temps max (en secondes) de la génération de l'ensemble E à chaque tour
 
         :type maxsize: int
         :type maxgen: int
         :type verbose: bool
+        :type taille_pop: int
+        :type vectorise: bool
+        :type rng: np.random.Generator
+        :type workers: int
+        :type budget_tour: float
 
-        :return: nombre de tentatives faites
+        :return: nombre de tentatives faites (-1 si aucun mot n'a pu être proposé)
         :rtype: int
         """
 
+        liste_mots = self.dictionnaire[self.taille_mot]
+
+        # pool des îles (lancé au premier appel, puis réutilisé par les parties suivantes)
+        pool = None if workers is None else ag.obtenir_pool_iles(self.groupe, workers)
+
         # choix aléatoire d'un mot parmi ceux qui ont la même taille que le mot secret
-        mot_choisi = random.choice(self.dictionnaire[self.taille_mot])
+        mot_choisi = random.choice(liste_mots) if rng is None else liste_mots[int(rng.integers(len(liste_mots)))]
         # teste du mot choisi
         fin, feedback = self.test_tentative(mot_choisi, verbose)
 
         # tant qu'on a pas fini (trouvé le mot secret)
         while not fin:
             # génération de l'ensemble des mots compatibles avec les tentatives précédentes
-            ens = ag.engendrer_ens(mot_choisi, self.dictionnaire, self.tentatives, maxsize, maxgen, taille_pop=5, nb_parents=2, proba_mutation_remplacement=0.4, proba_mutation_echange=0.4, proba_mutation_renversement=0.4, proba_croisement=0.4)
+            debut = time.perf_counter()
+            if pool is not None:
+                ens = ag.engendrer_ens_iles(pool, workers, mot_choisi, self.dictionnaire, self.tentatives, maxsize, maxgen, taille_pop=taille_pop, nb_parents=2, proba_mutation_remplacement=0.4, proba_mutation_echange=0.4, proba_mutation_renversement=0.4, proba_croisement=0.4, timeout=budget_tour, rng=rng, compteurs=self.compteurs)
+            elif vectorise:
+                ens = ag.engendrer_ens_population(mot_choisi, self.dictionnaire, self.tentatives, maxsize, maxgen, taille_pop=taille_pop, nb_parents=2, proba_mutation_remplacement=0.4, proba_mutation_echange=0.4, proba_mutation_renversement=0.4, proba_croisement=0.4, timeout=budget_tour, rng=rng, compteurs=self.compteurs)
+            else:
+                ens = ag.engendrer_ens(mot_choisi, self.dictionnaire, self.tentatives, maxsize, maxgen, taille_pop=taille_pop, nb_parents=2, proba_mutation_remplacement=0.4, proba_mutation_echange=0.4, proba_mutation_renversement=0.4, proba_croisement=0.4, timeout=budget_tour, probleme=self, compteurs=self.compteurs)
+            duree = time.perf_counter() - debut
+            self.budgets.append((duree, budget_tour))
+
+            if verbose:
+                print("Budget du tour {}:\t{:.3f} s / {} s ({:.1f} %)".format(len(self.budgets), duree, budget_tour,
+                                                                           100 * duree / budget_tour))
 
             if ens:
                 # choix aléatoire du mot parmi cette ensemble
-                mot_choisi = random.choice(ens)
+                mot_choisi = random.choice(ens) if rng is None else ens[int(rng.integers(len(ens)))]
                 # teste du mot choisi
                 fin, feedback = self.test_tentative(mot_choisi, verbose)
             else:
@@ -209,4 +356,89 @@ class WordleMindProblem:
         self.tentatives.append((mot, feedback))
         utils.reduire_domaines(mot, feedback, self.domaines)
 
+        if self.compteurs is not None:
+            self.compteurs.evaluations_feedback += 1
+            self.compteurs.tailles_pool.append(self.count())
+
         return False, feedback
+
+    def mettre_a_jour_candidats(self):
+        """
+        Fonction qui retire des candidats les mots incompatibles avec les tentatives faites depuis la dernière
+        mise à jour (tous les mots au premier appel) : préfiltre avec l'index des lettres (domaines des variables,
+        déjà réduits par les feedbacks, puis nombres de lettres correctes et proches), puis feedbacks exacts
+        (vectorisés) pour les mots restants.
+        """
+
+        if self.index is None:
+            self.index = self.groupe.index()
+            self.candidats = self.index.tous
+            self.masque = bytearray(b"\x01") * len(self.groupe)
+
+        nouvelles = self.tentatives[self.nb_tentatives_filtrees:]
+        if not nouvelles:
+            return
+
+        candidats = self.index.filtrer_domaines(self.domaines, self.candidats)
+        for mot, feedback in nouvelles:
+            candidats = self.index.prefiltrer(mot, feedback, candidats)
+        identifiants = self.index.identifiants(candidats)
+
+        moteur = moteur_feedback.obtenir_moteur(self.groupe)
+        for mot, feedback in nouvelles:
+            if len(identifiants) == 0:
+                break
+            if self.compteurs is not None:
+                self.compteurs.evaluations_feedback += len(identifiants)
+            identifiants = moteur.filtrer(identifiants, mot, feedback)
+
+        self.candidats = self.index.ensemble(identifiants)
+        masque = np.frombuffer(self.masque, dtype=np.uint8)
+        masque[:] = 0
+        masque[identifiants] = 1
+        self.nb_tentatives_filtrees = len(self.tentatives)
+
+    def is_compatible(self, mot):
+        """
+        Fonction qui teste si un mot est compatible avec toutes les tentatives précédentes :
+        en temps constant pour un mot du dictionnaire, par le calcul des feedbacks sinon.
+
+        :param mot: un mot
+        :type mot: list[str]
+
+        :return: vrai si le mot est compatible
+        :rtype: bool
+        """
+
+        identifiant = self.groupe.identifiant(mot)
+        if identifiant < 0:
+            return len(mot) == self.taille_mot and utils.get_nb_incompatibilites(mot, self.tentatives) == 0
+
+        if self.nb_tentatives_filtrees < len(self.tentatives) or self.masque is None:
+            self.mettre_a_jour_candidats()
+
+        return self.masque[identifiant] == 1
+
+    def candidates(self):
+        """
+        Fonction qui renvoie les mots du dictionnaire encore compatibles avec toutes les tentatives.
+
+        :return: liste des mots candidats
+        :rtype: list[list[str]]
+        """
+
+        self.mettre_a_jour_candidats()
+
+        return [self.groupe[i] for i in self.index.identifiants(self.candidats)]
+
+    def count(self):
+        """
+        Fonction qui renvoie le nombre de mots du dictionnaire encore compatibles avec toutes les tentatives.
+
+        :return: nombre de mots candidats
+        :rtype: int
+        """
+
+        self.mettre_a_jour_candidats()
+
+        return self.candidats.bit_count()
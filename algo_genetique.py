@@ -1,8 +1,12 @@
+import concurrent.futures
 import copy
+import multiprocessing.util
 import random
 import time
 import numpy as np
 
+import lexique
+import moteur_feedback
 import utils
 import WordleMindProblem as WMP
 
@@ -136,53 +140,80 @@ def croisement(probabilite, parents):
     return True, random.choice([parent1, parent2])
 
 
-def get_mot_proche(mot, dictionnaire):
+def get_mot_proche(mot, dictionnaire, compteurs=None):
     """
     Fonction qui retourne le mot le plus proche dans le dictionnaire au sens de la distance d'édition
-    (le mot lui-même s'il existe déjà).
+    (le mot lui-même s'il existe déjà), avec l'index des plus proches voisins du groupe des mots de sa taille.
+    En cas d'égalité, le premier mot du dictionnaire est choisi.
 
     :param mot: un mot
     :param dictionnaire: dictionnaire de mots
+    :param compteurs: compteurs d'instrumentation (ou None)
 
     :type mot: list[str]
-    :type dictionnaire: dict[int, list[lits[str]]]
+    :type dictionnaire: dict[int, list[lits[str]]] | Lexique
+    :type compteurs: Compteurs
 
     :return: mot le plus proche
     :rtype: list[str]
     """
 
-    # pour optimiser il faudrait une structure de données qui stocke
-    # les mots du dictionnaire par ordre alphabétique (une structure par taille de mot)
-
     taille_mot = len(mot)  # taille du mot donné
-    liste_mots = dictionnaire[taille_mot]  # liste de mots qui on la même taille que le mot donné
-    diff_min = float('infinity')  # nombre de lettres différentes entre le mot donné et le mot courant
-    meilleur_mot = mot  # le mot le plus proche du mot donné
-
-    # pour chaque mot de la liste
-    for m in liste_mots:
-        # si le mot donné existe déjà, alors le renvoyé
-        if m == mot:
-            return mot
-        else:  # sinon prendre le plus proche
-            diff = 0
-            # pour chaque position de lettre du mot donné
-            for i in range(taille_mot):
-                # si la lettre à cette position n'est pas la même que le mot courant
-                if mot[i] != m[i]:
-                    # incrémenter le nombre de différences
-                    diff += 1
-            # choisir le mot avec la plus petite différence
-            if diff < diff_min:
-                diff_min = diff
-                meilleur_mot = m
-
-    return meilleur_mot
+    # groupe des mots qui ont la même taille que le mot donné, avec son index des plus proches voisins
+    groupe = lexique.obtenir_groupe(dictionnaire[taille_mot], taille_mot)
+
+    # si le mot donné existe déjà, alors le renvoyer (en temps constant)
+    if mot in groupe:
+        return mot
+
+    # sinon prendre le plus proche (le mot lui-même s'il n'y a aucun mot de cette taille)
+    if compteurs is not None:
+        compteurs.recherches_mot_proche += 1
+    identifiant = groupe.voisins().plus_proche(mot)
+    if identifiant < 0:
+        return mot
+
+    return groupe[identifiant]
+
+
+def get_nb_incompatibilites_prefiltre(mot, tentatives, groupe, prefiltres):
+    """
+    Fonction qui renvoie le nombre d'incompatibilités d'un mot du dictionnaire par rapport aux tentatives
+    précédentes, en utilisant d'abord le préfiltre de chaque tentative (ensemble de mots calculé avec l'index
+    des lettres) : le feedback exact n'est calculé que pour les tentatives dont le préfiltre contient le mot.
+
+    :param mot: mot du dictionnaire
+    :param tentatives: liste des tentatives précédentes
+    :param groupe: groupe des mots de la taille du mot
+    :param prefiltres: préfiltre de chaque tentative
+
+    :type mot: list[str]
+    :type tentatives: list[list[str], Feedback]
+    :type groupe: GroupeMots
+    :type prefiltres: list[int]
+
+    :return: nombre d'incompatibilités
+    :rtype: int
+    """
+
+    identifiant = groupe.identifiant(mot)
+    if identifiant < 0:
+        return utils.get_nb_incompatibilites(mot, tentatives)
+
+    nb_incompatibilites = 0
+    a_verifier = []     # tentatives à vérifier avec le feedback exact
+    for tentative, prefiltre in zip(tentatives, prefiltres):
+        if prefiltre >> identifiant & 1:
+            a_verifier.append(tentative)
+        else:
+            nb_incompatibilites += 1
+
+    return nb_incompatibilites + utils.get_nb_incompatibilites(mot, a_verifier)
 
 
 def engendrer_ens(tentative_precedente, dictionnaire, tentatives, maxsize, maxgen, taille_pop=5, nb_parents=2,
                   proba_mutation_remplacement=0.4, proba_mutation_echange=0.4, proba_mutation_renversement=0.4, 
-                  proba_croisement=0.4, timeout=300):
+                  proba_croisement=0.4, timeout=300, probleme=None, compteurs=None):
     """
     Fonction qui génère l'ensemble E des mots compatibles avec les tentatives précédentes.
 
@@ -197,10 +228,12 @@ def engendrer_ens(tentative_precedente, dictionnaire, tentatives, maxsize, maxge
     :param proba_mutation_echange: probabilité de mutation par échange
     :param proba_mutation_renversement: probabilité de mutation par renversement
     :param proba_croisement: probabilité de croisement
-    :param timeout: temps max d'exécution
+    :param timeout: temps max d'exécution (échéance vérifiée pour chaque enfant)
+    :param probleme: problème qui maintient l'ensemble des mots compatibles avec les tentatives (ou None)
+    :param compteurs: compteurs d'instrumentation (ou None)
 
     :type tentative_precedente: list[str]
-    :type dictionnaire: dict[int, list[list[str]]]
+    :type dictionnaire: dict[int, list[list[str]]] | Lexique
     :type tentatives: list[list[str]]
     :type maxsize: int
     :type maxgen: int
@@ -211,23 +244,37 @@ def engendrer_ens(tentative_precedente, dictionnaire, tentatives, maxsize, maxge
     :type proba_mutation_renversement: float
     :type proba_croisement: float
     :type timeout: int
+    :type probleme: WordleMindProblem
+    :type compteurs: Compteurs
 
-    :return: l'ensemble E
+    :return: l'ensemble E (à l'échéance, si aucun mot compatible n'a été trouvé, les meilleurs enfants trouvés)
     :rtype: list[list[str]]
     """
 
+    echeance = time.perf_counter() + timeout  # échéance du tour
+
     parents = [tentative_precedente] * nb_parents  # liste des parents
 
+    # préfiltre de chaque tentative avec l'index des lettres (si le dictionnaire est un Lexique)
+    groupe = dictionnaire[len(tentative_precedente)]
+    prefiltres = None
+    if isinstance(groupe, lexique.GroupeMots):
+        index = groupe.index()
+        prefiltres = [index.prefiltrer(mot, feedback) for mot, feedback in tentatives]
+
     ens = []  # l'ensemble E
     taille_ens = 0  # taille de l'ensemble E
 
+    meilleurs = []  # meilleurs enfants trouvés (solution de repli si l'ensemble E est vide à l'échéance)
+    meilleure_fitness = None  # fitness des meilleurs enfants
+    mots_tentes = [mot for mot, _ in tentatives]  # mots déjà tentés (jamais gardés parmi les meilleurs enfants)
+
     gen = 0  # génération actuelle
-    total_time = 0  # temps d'exécution de l'algorithme génétique
+    expire = False  # si l'échéance est atteinte
 
-    # tant que le temps d'exécution est inférieure à 300 s
+    # tant que l'échéance n'est pas atteinte
     # et que l'ensemble E est vide (tant qu'on n'a pas trouvé de mots compatibles)
-    while total_time < timeout and taille_ens == 0:
-        start = time.time()
+    while not expire and taille_ens == 0:
 
         # tant que la taille de l'ensemble E n'a pas atteint sa taille max
         # et que la génération actuelle n'est pas la dernière
@@ -246,36 +293,658 @@ def engendrer_ens(tentative_precedente, dictionnaire, tentatives, maxsize, maxge
                 mutation_renversement(proba_mutation_renversement, enfant)
 
                 # choisir le mot existant le plus proche
-                enfant = get_mot_proche(enfant, dictionnaire)
+                enfant = get_mot_proche(enfant, dictionnaire, compteurs)
 
                 # calcul de la fitness de l'enfant
-                fitness = - utils.get_nb_incompatibilites(enfant, tentatives) - 1
+                if probleme is not None and probleme.is_compatible(enfant):
+                    fitness = -1
+                else:
+                    if compteurs is not None:
+                        compteurs.evaluations_feedback += len(tentatives)
+                    if prefiltres is None:
+                        fitness = - utils.get_nb_incompatibilites(enfant, tentatives) - 1
+                    else:
+                        fitness = - get_nb_incompatibilites_prefiltre(enfant, tentatives, groupe, prefiltres) - 1
                 # si ce n'est pas incompatible, ajouter l'enfant à l'ensemble E
                 if fitness == -1:
                     ens.append(enfant)
                     taille_ens += 1
 
+                # garder les meilleurs enfants (sauf les mots déjà tentés)
+                if enfant not in mots_tentes:
+                    if meilleure_fitness is None or fitness > meilleure_fitness:
+                        meilleure_fitness = fitness
+                        meilleurs = [enfant]
+                    elif fitness == meilleure_fitness and len(meilleurs) < maxsize and enfant not in meilleurs:
+                        meilleurs.append(enfant)
+
                 # print("pop:", population, "fitnesses:", fitnesses)
                 population.append(enfant)
                 fitnesses.append(fitness)
 
+                if time.perf_counter() >= echeance:
+                    expire = True
+                    break
+
+            if expire:
+                break
+
             somme = sum(fitnesses)
             distribution_proba = [fitness / somme for fitness in fitnesses]
             indices_parents = np.random.choice(range(taille_pop), size=nb_parents, p=distribution_proba)
             parents = [population[i] for i in indices_parents]
             gen += 1
-
-        stop = time.time()
-        total_time += stop - start
+            if compteurs is not None:
+                compteurs.generations += 1
 
         # si on n'a pas trouvé de mots compatibles, alors on recommence (on revient à la génération 0)
         if taille_ens == 0:
             gen = 0
+            if compteurs is not None and not expire:
+                compteurs.redemarrages += 1
 
-    # si le temps d'exécution à dépasser 300 s et si on n'a pas trouvé de mots
-    if total_time >= timeout and taille_ens == 0:
-        print("La méthode a échouée (l'ensemble E est vide après {} s).".format(timeout))
-        # raise TimeoutError()
-        return []
+    # si l'échéance est atteinte et si on n'a pas trouvé de mots, on renvoie les meilleurs enfants trouvés
+    if taille_ens == 0:
+        return meilleurs
 
     return ens
+
+
+# Version vectorisée : la population est un tableau d'entiers (codes ASCII des lettres, un mot par ligne)
+
+
+def croisement_population(rng, parents, taille_pop, probabilite):
+    """
+    Fonction qui engendre une population d'enfants à partir des parents : chaque enfant est, selon une
+    probabilité donnée, le croisement en une position aléatoire de deux parents différents, ou sinon
+    la copie d'un parent aléatoire.
+
+    :param rng: générateur aléatoire
+    :param parents: parents (nb_parents x taille)
+    :param taille_pop: nombre d'enfants
+    :param probabilite: probabilité de croisement (entre 0 et 1)
+
+    :type rng: np.random.Generator
+    :type parents: np.ndarray
+    :type taille_pop: int
+    :type probabilite: float
+
+    :return: enfants (taille_pop x taille)
+    :rtype: np.ndarray
+    """
+
+    nb_parents, taille = parents.shape
+
+    parent1 = rng.integers(nb_parents, size=taille_pop)
+    enfants = parents[parent1]
+    if nb_parents < 2 or taille < 2:
+        return enfants
+
+    # second parent différent du premier et position du croisement (entre 1 et taille - 1)
+    parent2 = (parent1 + rng.integers(1, nb_parents, size=taille_pop)) % nb_parents
+    pos = rng.integers(1, taille, size=taille_pop)
+    croises = rng.random(taille_pop) <= probabilite
+
+    # l'enfant prend les lettres du premier parent avant la position et celles du second après
+    suffixe = (np.arange(taille) >= pos[:, None]) & croises[:, None]
+
+    return np.where(suffixe, parents[parent2], enfants)
+
+
+def mutation_remplacement_population(rng, population, probabilite):
+    """
+    Fonction qui change une lettre aléatoire de chaque mot de la population selon une probabilité donnée.
+    Attention le changement se fait directement sur la population passée en paramètre.
+
+    :param rng: générateur aléatoire
+    :param population: population (taille_pop x taille)
+    :param probabilite: probabilité de mutation (entre 0 et 1)
+
+    :type rng: np.random.Generator
+    :type population: np.ndarray
+    :type probabilite: float
+    """
+
+    taille_pop, taille = population.shape
+
+    mutes = np.flatnonzero(rng.random(taille_pop) <= probabilite)
+    pos = rng.integers(taille, size=len(mutes))
+    population[mutes, pos] = rng.integers(ord("a"), ord("z") + 1, size=len(mutes), dtype=np.uint8)
+
+
+def mutation_echange_population(rng, population, probabilite):
+    """
+    Fonction qui échange deux lettres aléatoires de chaque mot de la population selon une probabilité donnée.
+    Attention le changement se fait directement sur la population passée en paramètre.
+
+    :param rng: générateur aléatoire
+    :param population: population (taille_pop x taille)
+    :param probabilite: probabilité de mutation (entre 0 et 1)
+
+    :type rng: np.random.Generator
+    :type population: np.ndarray
+    :type probabilite: float
+    """
+
+    taille_pop, taille = population.shape
+
+    mutes = np.flatnonzero(rng.random(taille_pop) <= probabilite)
+    pos1 = rng.integers(taille, size=len(mutes))
+    pos2 = rng.integers(taille, size=len(mutes))
+    lettres1 = population[mutes, pos1]
+    population[mutes, pos1] = population[mutes, pos2]
+    population[mutes, pos2] = lettres1
+
+
+def mutation_renversement_population(rng, population, probabilite):
+    """
+    Fonction qui inverse une sous-séquence aléatoire de lettres de chaque mot de la population
+    selon une probabilité donnée.
+    Attention le changement se fait directement sur la population passée en paramètre.
+
+    :param rng: générateur aléatoire
+    :param population: population (taille_pop x taille)
+    :param probabilite: probabilité de mutation (entre 0 et 1)
+
+    :type rng: np.random.Generator
+    :type population: np.ndarray
+    :type probabilite: float
+    """
+
+    taille_pop, taille = population.shape
+
+    mutes = np.flatnonzero(rng.random(taille_pop) <= probabilite)
+    pos1 = rng.integers(taille, size=len(mutes))
+    pos2 = rng.integers(pos1, taille) + 1   # fin (exclue) de la sous-séquence
+
+    # la lettre j de la sous-séquence [pos1, pos2[ est remplacée par la lettre pos1 + pos2 - 1 - j
+    j = np.arange(taille)
+    dans_sequence = (j >= pos1[:, None]) & (j < pos2[:, None])
+    sources = np.where(dans_sequence, (pos1 + pos2 - 1)[:, None] - j, j)
+    population[mutes] = np.take_along_axis(population[mutes], sources, axis=1)
+
+
+def get_nb_incompatibilites_population(moteur, identifiants, tentatives):
+    """
+    Fonction qui renvoie le nombre d'incompatibilités de chaque mot par rapport aux tentatives précédentes,
+    avec le moteur de feedback (un calcul vectorisé par tentative).
+
+    :param moteur: moteur de feedback du groupe des mots
+    :param identifiants: identifiants des mots
+    :param tentatives: liste des tentatives précédentes
+
+    :type moteur: MoteurFeedback
+    :type identifiants: np.ndarray
+    :type tentatives: list[list[str], Feedback]
+
+    :return: nombre d'incompatibilités de chaque mot
+    :rtype: np.ndarray
+    """
+
+    nb_incompatibilites = np.zeros(len(identifiants), dtype=np.int64)
+    for mot, feedback in tentatives:
+        nb_incompatibilites += moteur.codes_proposition(mot, identifiants) != moteur.code(feedback)
+
+    return nb_incompatibilites
+
+
+def evoluer_generation(rng, parents, groupe, moteur, tentatives, taille_pop, probas):
+    """
+    Fonction qui fait évoluer une génération de la version vectorisée : croisement et mutations de toute
+    la population, choix des mots existants les plus proches, calcul des fitness et choix des parents de la
+    génération suivante (la probabilité d'un enfant est inversement proportionnelle à son nombre
+    d'incompatibilités + 1, les meilleurs enfants sont favorisés).
+
+    :param rng: générateur aléatoire
+    :param parents: parents de la génération (codes ASCII, un mot par ligne)
+    :param groupe: groupe des mots de la taille des parents
+    :param moteur: moteur de feedback du groupe
+    :param tentatives: liste des tentatives précédentes
+    :param taille_pop: taille de la population
+    :param probas: probabilités de croisement, de mutation par remplacement, par échange et par renversement
+
+    :type rng: np.random.Generator
+    :type parents: np.ndarray
+    :type groupe: GroupeMots
+    :type moteur: MoteurFeedback
+    :type tentatives: list[list[str], Feedback]
+    :type taille_pop: int
+    :type probas: (float, float, float, float)
+
+    :return: identifiants des enfants, fitness des enfants, parents de la génération suivante
+    :rtype: (np.ndarray, np.ndarray, np.ndarray)
+    """
+
+    proba_croisement, proba_mutation_remplacement, proba_mutation_echange, proba_mutation_renversement = probas
+
+    # croisement et mutation de toute la population
+    population = croisement_population(rng, parents, taille_pop, proba_croisement)
+    mutation_remplacement_population(rng, population, proba_mutation_remplacement)
+    mutation_echange_population(rng, population, proba_mutation_echange)
+    mutation_renversement_population(rng, population, proba_mutation_renversement)
+
+    # choix des mots existants les plus proches
+    identifiants = groupe.voisins().plus_proches(population)
+
+    # calcul des fitness (-1 pour un enfant compatible avec toutes les tentatives)
+    fitnesses = - get_nb_incompatibilites_population(moteur, identifiants, tentatives) - 1
+
+    # choix des parents de la génération suivante
+    poids = -1 / fitnesses
+    distribution_proba = poids / poids.sum()
+    parents = groupe.mots[identifiants[rng.choice(taille_pop, size=len(parents), p=distribution_proba)]]
+
+    return identifiants, fitnesses, parents
+
+
+class Meilleurs:
+    """
+    Meilleurs enfants trouvés par la version vectorisée (identifiants des enfants de meilleure fitness,
+    au plus taille_max), pour avoir une réponse quand l'échéance est atteinte avant de trouver un mot compatible.
+    Les mots exclus (les mots déjà tentés) ne sont jamais gardés : ils ne peuvent pas être proposés à nouveau.
+    """
+
+    def __init__(self, taille_max, exclus=()):
+        self.taille_max = taille_max    # nombre max d'enfants gardés
+        self.fitness = None             # fitness des meilleurs enfants
+        self.identifiants = []          # identifiants des meilleurs enfants
+        self.exclus = np.array(exclus, dtype=np.int64)  # identifiants des mots exclus
+
+    def ajouter(self, identifiants, fitnesses):
+        """
+        Fonction qui met à jour les meilleurs enfants avec ceux d'une génération.
+
+        :param identifiants: identifiants des enfants
+        :param fitnesses: fitness des enfants
+
+        :type identifiants: np.ndarray
+        :type fitnesses: np.ndarray
+        """
+
+        if len(self.exclus) > 0:
+            gardes = ~np.isin(identifiants, self.exclus)
+            identifiants, fitnesses = identifiants[gardes], fitnesses[gardes]
+
+        if len(fitnesses) == 0:
+            return
+
+        fitness = int(fitnesses.max())
+        if self.fitness is None or fitness > self.fitness:
+            self.fitness = fitness
+            self.identifiants = []
+        elif fitness < self.fitness:
+            return
+
+        for identifiant in identifiants[fitnesses == fitness].tolist():
+            if len(self.identifiants) >= self.taille_max:
+                break
+            if identifiant not in self.identifiants:
+                self.identifiants.append(identifiant)
+
+
+def identifiants_tentes(groupe, tentatives):
+    """
+    Fonction qui renvoie les identifiants des mots déjà tentés (ceux qui ne sont pas dans le groupe sont ignorés).
+
+    :param groupe: groupe des mots de la taille des tentatives
+    :param tentatives: liste des tentatives précédentes
+
+    :type groupe: GroupeMots
+    :type tentatives: list[list[str], Feedback]
+
+    :return: identifiants des mots tentés
+    :rtype: list[int]
+    """
+
+    identifiants = [groupe.identifiant(mot) for mot, _ in tentatives]
+    return [identifiant for identifiant in identifiants if identifiant >= 0]
+
+
+def engendrer_ens_population(tentative_precedente, dictionnaire, tentatives, maxsize, maxgen, taille_pop=1000,
+                             nb_parents=2, proba_mutation_remplacement=0.4, proba_mutation_echange=0.4,
+                             proba_mutation_renversement=0.4, proba_croisement=0.4, timeout=300, rng=None,
+                             compteurs=None):
+    """
+    Fonction qui génère l'ensemble E des mots compatibles avec les tentatives précédentes,
+    comme engendrer_ens mais en faisant évoluer toute la population à la fois avec des opérations
+    sur des tableaux : croisement, mutations, choix des mots existants les plus proches et fitness.
+    Une grande population permet de faire beaucoup moins de générations.
+
+    :param tentative_precedente: dernier mot tenté
+    :param dictionnaire: dictionnaire des mots
+    :param tentatives: liste des tentatives précédentes
+    :param maxsize: taille max de l'ensemble E
+    :param maxgen: nombre de générations
+    :param taille_pop: taille de la population
+    :param nb_parents: nombre de parents à chaque génération
+    :param proba_mutation_remplacement: probabilité de mutation par remplacement
+    :param proba_mutation_echange: probabilité de mutation par échange
+    :param proba_mutation_renversement: probabilité de mutation par renversement
+    :param proba_croisement: probabilité de croisement
+    :param timeout: temps max d'exécution (échéance vérifiée à chaque génération)
+    :param rng: générateur aléatoire (un nouveau générateur si None)
+    :param compteurs: compteurs d'instrumentation (ou None)
+
+    :type tentative_precedente: list[str]
+    :type dictionnaire: dict[int, list[list[str]]] | Lexique
+    :type tentatives: list[list[str]]
+    :type maxsize: int
+    :type maxgen: int
+    :type taille_pop: int
+    :type nb_parents: int
+    :type proba_mutation_remplacement: float
+    :type proba_mutation_echange: float
+    :type proba_mutation_renversement: float
+    :type proba_croisement: float
+    :type timeout: int
+    :type rng: np.random.Generator
+    :type compteurs: Compteurs
+
+    :return: l'ensemble E (à l'échéance, si aucun mot compatible n'a été trouvé, les meilleurs enfants trouvés)
+    :rtype: list[list[str]]
+    """
+
+    echeance = time.perf_counter() + timeout  # échéance du tour
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    taille_mot = len(tentative_precedente)
+    groupe = lexique.obtenir_groupe(dictionnaire[taille_mot], taille_mot)
+    moteur = moteur_feedback.obtenir_moteur(groupe)
+    probas = (proba_croisement, proba_mutation_remplacement, proba_mutation_echange, proba_mutation_renversement)
+
+    mot_initial = np.frombuffer("".join(tentative_precedente).encode("ascii"), dtype=np.uint8)
+    parents = np.tile(mot_initial, (nb_parents, 1))  # parents (nb_parents x taille)
+
+    ens = dict()  # l'ensemble E (identifiants des mots, dans l'ordre où ils ont été trouvés)
+    meilleurs = Meilleurs(maxsize, identifiants_tentes(groupe, tentatives))  # solution de repli à l'échéance
+
+    gen = 0  # génération actuelle
+    expire = False  # si l'échéance est atteinte
+
+    # tant que l'échéance n'est pas atteinte
+    # et que l'ensemble E est vide (tant qu'on n'a pas trouvé de mots compatibles)
+    while not expire and not ens:
+
+        # tant que la taille de l'ensemble E n'a pas atteint sa taille max
+        # et que la génération actuelle n'est pas la dernière
+        while len(ens) < maxsize and gen < maxgen:
+            identifiants, fitnesses, parents = evoluer_generation(rng, parents, groupe, moteur, tentatives,
+                                                                  taille_pop, probas)
+
+            # les enfants qui ne sont pas incompatibles sont ajoutés à l'ensemble E (sans dépasser sa taille max)
+            for identifiant in identifiants[fitnesses == -1].tolist():
+                if len(ens) >= maxsize:
+                    break
+                ens[identifiant] = None
+            meilleurs.ajouter(identifiants, fitnesses)
+            gen += 1
+            if compteurs is not None:
+                compteurs.generations += 1
+                compteurs.recherches_mot_proche += taille_pop
+                compteurs.evaluations_feedback += taille_pop * len(tentatives)
+
+            if time.perf_counter() >= echeance:
+                expire = True
+                break
+
+        # si on n'a pas trouvé de mots compatibles, alors on recommence (on revient à la génération 0)
+        if not ens:
+            gen = 0
+            if compteurs is not None and not expire:
+                compteurs.redemarrages += 1
+
+    # si l'échéance est atteinte et si on n'a pas trouvé de mots, on renvoie les meilleurs enfants trouvés
+    if not ens:
+        return [groupe[identifiant] for identifiant in meilleurs.identifiants]
+
+    return [groupe[identifiant] for identifiant in ens]
+
+
+# Modèle en îles : plusieurs populations indépendantes évoluent dans des processus séparés, avec migration
+# périodique des meilleurs individus d'une île vers la suivante (en anneau)
+
+# groupe des mots et moteur de feedback du processus d'une île (initialisés une fois par processus)
+_groupe_ile = None
+_moteur_ile = None
+
+
+def initialiser_ile(taille, mots):
+    """
+    Fonction d'initialisation d'un processus d'île : construit le groupe des mots et son moteur de feedback.
+
+    :param taille: taille des mots
+    :param mots: codes ASCII des mots (un mot par ligne)
+
+    :type taille: int
+    :type mots: np.ndarray
+    """
+
+    global _groupe_ile, _moteur_ile
+    _groupe_ile = lexique.GroupeMots(taille, mots)
+    _moteur_ile = moteur_feedback.obtenir_moteur(_groupe_ile)
+
+
+# pools de processus des îles, indexés par (empreinte des mots, nombre de processus)
+_pools_iles = dict()
+
+
+def obtenir_pool_iles(groupe, workers):
+    """
+    Fonction qui renvoie le pool de processus des îles pour les mots d'une taille (lancé une seule fois par
+    contenu du groupe et par nombre de processus, puis réutilisé par toutes les parties du processus).
+
+    :param groupe: groupe des mots de la taille voulue
+    :param workers: nombre de processus
+
+    :type groupe: GroupeMots
+    :type workers: int
+
+    :return: pool de processus initialisés avec initialiser_ile
+    :rtype: concurrent.futures.ProcessPoolExecutor
+    """
+
+    cle = (moteur_feedback.obtenir_moteur(groupe).empreinte, workers)
+    pool = _pools_iles.get(cle)
+    if pool is None:
+        if not _pools_iles:
+            # les pools sont arrêtés à la fin du processus, y compris dans le processus d'une partie lancé avec
+            # multiprocessing (qui n'exécute pas les fonctions atexit et attend ses processus fils), avant la
+            # fermeture des files de multiprocessing (priorité 10) qui envoient l'ordre d'arrêt aux processus
+            multiprocessing.util.Finalize(None, fermer_pools_iles, exitpriority=20)
+        pool = _pools_iles[cle] = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=initialiser_ile, initargs=(groupe.taille, groupe.mots))
+
+    return pool
+
+
+def fermer_pools_iles():
+    """
+    Fonction qui arrête tous les pools de processus des îles (appelée à la fin du programme).
+    """
+
+    for pool in _pools_iles.values():
+        pool.shutdown()
+    _pools_iles.clear()
+
+
+def evoluer_ile(rng, parents, gen, tentatives, nb_generations, maxgen, restant, taille_pop, probas,
+                nb_migrants, echeance):
+    """
+    Fonction qui fait évoluer une île pendant une époque (au plus nb_generations générations), dans le
+    processus de l'île. L'époque s'arrête plus tôt si l'île a trouvé les mots qui manquent à l'ensemble E,
+    ou si l'échéance est atteinte.
+
+    :param rng: générateur aléatoire de l'île
+    :param parents: parents de l'île
+    :param gen: génération actuelle de l'île
+    :param tentatives: liste des tentatives précédentes
+    :param nb_generations: nombre de générations de l'époque
+    :param maxgen: nombre de générations
+    :param restant: nombre de mots qui manquent à l'ensemble E
+    :param taille_pop: taille de la population de l'île
+    :param probas: probabilités de croisement et de mutation (voir evoluer_generation)
+    :param nb_migrants: nombre de meilleurs individus envoyés à l'île suivante
+    :param echeance: échéance du tour (temps time.time())
+
+    :type rng: np.random.Generator
+    :type parents: np.ndarray
+    :type gen: int
+    :type tentatives: list[list[str], Feedback]
+    :type nb_generations: int
+    :type maxgen: int
+    :type restant: int
+    :type taille_pop: int
+    :type probas: (float, float, float, float)
+    :type nb_migrants: int
+    :type echeance: float
+
+    :return: générateur, parents et génération de l'île, identifiants des mots compatibles trouvés, migrants,
+             meilleurs enfants de l'époque
+    :rtype: (np.random.Generator, np.ndarray, int, list[int], np.ndarray, Meilleurs)
+    """
+
+    trouves = dict()
+    migrants = parents[:nb_migrants]
+    meilleurs = Meilleurs(restant, identifiants_tentes(_groupe_ile, tentatives))
+
+    fin = min(gen + nb_generations, maxgen)
+    while gen < fin and len(trouves) < restant and time.time() < echeance:
+        identifiants, fitnesses, parents = evoluer_generation(rng, parents, _groupe_ile, _moteur_ile, tentatives,
+                                                              taille_pop, probas)
+        for identifiant in identifiants[fitnesses == -1].tolist():
+            trouves[identifiant] = None
+        meilleurs.ajouter(identifiants, fitnesses)
+
+        # les meilleurs enfants de la dernière génération migrent vers l'île suivante
+        ordre = np.argsort(-fitnesses, kind="stable")[:nb_migrants]
+        migrants = _groupe_ile.mots[identifiants[ordre]]
+        gen += 1
+
+    return rng, parents, gen, list(trouves), migrants, meilleurs
+
+
+def engendrer_ens_iles(pool, nb_iles, tentative_precedente, dictionnaire, tentatives, maxsize, maxgen,
+                       taille_pop=1000, nb_parents=2, proba_mutation_remplacement=0.4, proba_mutation_echange=0.4,
+                       proba_mutation_renversement=0.4, proba_croisement=0.4, intervalle_migration=5,
+                       nb_migrants=1, timeout=300, rng=None, compteurs=None):
+    """
+    Fonction qui génère l'ensemble E des mots compatibles avec les tentatives précédentes avec le modèle en îles :
+    chaque île est une population de la version vectorisée qui évolue dans un processus du pool. Les îles
+    évoluent par époques de intervalle_migration générations ; à la fin de chaque époque, les mots compatibles
+    trouvés sont ajoutés à l'ensemble E (dans l'ordre des îles) et les nb_migrants meilleurs individus de
+    chaque île remplacent les derniers parents de l'île suivante. Les îles ne communiquent qu'entre deux époques :
+    pendant une époque, une île ne s'arrête que si elle a trouvé à elle seule les mots qui manquent à l'ensemble E.
+    Quand l'ensemble E atteint sa taille max, les autres îles finissent donc leur époque : au plus
+    intervalle_migration générations de trop par île, d'autant moins que intervalle_migration est petit.
+    Les époques sont synchrones et chaque île a son propre générateur (issu de rng) : le résultat ne dépend
+    que de rng, pas de l'ordre d'exécution des processus.
+
+    :param pool: pool de processus initialisés avec initialiser_ile
+    :param nb_iles: nombre d'îles
+    :param tentative_precedente: dernier mot tenté
+    :param dictionnaire: dictionnaire des mots
+    :param tentatives: liste des tentatives précédentes
+    :param maxsize: taille max de l'ensemble E
+    :param maxgen: nombre de générations
+    :param taille_pop: taille de la population de chaque île
+    :param nb_parents: nombre de parents à chaque génération
+    :param proba_mutation_remplacement: probabilité de mutation par remplacement
+    :param proba_mutation_echange: probabilité de mutation par échange
+    :param proba_mutation_renversement: probabilité de mutation par renversement
+    :param proba_croisement: probabilité de croisement
+    :param intervalle_migration: nombre de générations entre deux migrations
+    :param nb_migrants: nombre d'individus qui migrent d'une île à la suivante
+    :param timeout: temps max d'exécution (échéance vérifiée à chaque génération de chaque île)
+    :param rng: générateur aléatoire (un nouveau générateur si None)
+    :param compteurs: compteurs d'instrumentation (ou None)
+
+    :type pool: concurrent.futures.ProcessPoolExecutor
+    :type nb_iles: int
+    :type tentative_precedente: list[str]
+    :type dictionnaire: dict[int, list[list[str]]] | Lexique
+    :type tentatives: list[list[str]]
+    :type maxsize: int
+    :type maxgen: int
+    :type taille_pop: int
+    :type nb_parents: int
+    :type proba_mutation_remplacement: float
+    :type proba_mutation_echange: float
+    :type proba_mutation_renversement: float
+    :type proba_croisement: float
+    :type intervalle_migration: int
+    :type nb_migrants: int
+    :type timeout: int
+    :type rng: np.random.Generator
+    :type compteurs: Compteurs
+
+    :return: l'ensemble E (à l'échéance, si aucun mot compatible n'a été trouvé, les meilleurs enfants trouvés)
+    :rtype: list[list[str]]
+    """
+
+    echeance = time.time() + timeout  # échéance du tour (commune à tous les processus)
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    taille_mot = len(tentative_precedente)
+    groupe = lexique.obtenir_groupe(dictionnaire[taille_mot], taille_mot)
+    probas = (proba_croisement, proba_mutation_remplacement, proba_mutation_echange, proba_mutation_renversement)
+    nb_migrants = min(nb_migrants, nb_parents)
+
+    mot_initial = np.frombuffer("".join(tentative_precedente).encode("ascii"), dtype=np.uint8)
+    generateurs = rng.spawn(nb_iles)
+    parents = [np.tile(mot_initial, (nb_parents, 1)) for _ in range(nb_iles)]
+    generations = [0] * nb_iles
+
+    ens = dict()  # l'ensemble E (identifiants des mots, dans l'ordre où ils ont été trouvés)
+    # meilleurs enfants de toutes les îles (solution de repli à l'échéance)
+    meilleurs = Meilleurs(maxsize, identifiants_tentes(groupe, tentatives))
+
+    # tant que l'échéance n'est pas atteinte et que l'ensemble E n'a pas atteint sa taille max
+    while time.time() < echeance and len(ens) < maxsize:
+        if min(generations) >= maxgen:
+            if ens:
+                break
+            # si on n'a pas trouvé de mots compatibles, alors on recommence (on revient à la génération 0)
+            parents = [np.tile(mot_initial, (nb_parents, 1)) for _ in range(nb_iles)]
+            generations = [0] * nb_iles
+            if compteurs is not None:
+                compteurs.redemarrages += 1
+
+        # une époque de toutes les îles
+        restant = maxsize - len(ens)
+        resultats = list(pool.map(evoluer_ile, generateurs, parents, generations,
+                                  [tentatives] * nb_iles, [intervalle_migration] * nb_iles, [maxgen] * nb_iles,
+                                  [restant] * nb_iles, [taille_pop] * nb_iles, [probas] * nb_iles,
+                                  [nb_migrants] * nb_iles, [echeance] * nb_iles))
+        if compteurs is not None:
+            nb_generations = sum(resultat[2] for resultat in resultats) - sum(generations)
+            compteurs.generations += nb_generations
+            compteurs.recherches_mot_proche += nb_generations * taille_pop
+            compteurs.evaluations_feedback += nb_generations * taille_pop * len(tentatives)
+        generateurs, parents, generations, trouves, migrants, meilleurs_iles = (list(valeurs)
+                                                                                 for valeurs in zip(*resultats))
+
+        for trouves_ile in trouves:
+            for identifiant in trouves_ile:
+                if len(ens) >= maxsize:
+                    break
+                ens[identifiant] = None
+
+        for meilleurs_ile in meilleurs_iles:
+            if meilleurs_ile.fitness is not None:
+                meilleurs.ajouter(np.array(meilleurs_ile.identifiants),
+                                  np.full(len(meilleurs_ile.identifiants), meilleurs_ile.fitness))
+
+        # migration en anneau : les migrants de l'île i - 1 remplacent les derniers parents de l'île i
+        for i in range(nb_iles):
+            parents[i] = parents[i].copy()
+            parents[i][nb_parents - nb_migrants:] = migrants[i - 1]
+
+    # si l'échéance est atteinte et si on n'a pas trouvé de mots, on renvoie les meilleurs enfants trouvés
+    if not ens:
+        return [groupe[identifiant] for identifiant in meilleurs.identifiants]
+
+    return [groupe[identifiant] for identifiant in ens]
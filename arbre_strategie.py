@@ -0,0 +1,241 @@
+import os
+import time
+
+import numpy as np
+
+import CSP as csp
+import dictionnaire_compile
+import lexique
+import moteur_feedback
+import premier_mot as pm
+
+
+class ArbreStrategie:
+    """
+    Arbre de décision de resolution_par_CSP_opt pour une taille de mot, un premier mot et une stratégie :
+    chaque noeud est un mot proposé, chaque arc un code de feedback. Comme la proposition ne dépend que des
+    feedbacks déjà obtenus, une partie se joue en descendant dans l'arbre.
+
+    Les noeuds sont numérotés en largeur (la racine est le noeud 0) et les fils d'un noeud sont rangés par code
+    croissant : le fils de l'arc e est le noeud e + 1. Il suffit donc de stocker, pour chaque noeud, le mot
+    proposé et l'indice de son premier arc, et pour chaque arc son code.
+    """
+
+    def __init__(self, taille, empreinte, strategy, propositions, premiers_arcs, codes):
+        self.taille = taille                    # taille des mots
+        self.empreinte = empreinte              # empreinte des mots du moteur de feedback (voir MoteurFeedback)
+        self.strategy = strategy                # stratégie de donner_proposition
+        self.propositions = propositions        # indice du mot proposé de chaque noeud (np.ndarray)
+        self.premiers_arcs = premiers_arcs      # indice du premier arc de chaque noeud (nb_noeuds + 1 valeurs)
+        self.codes = codes                      # code de feedback de chaque arc (np.ndarray)
+        self._transitions = None                # dict noeud * nb_codes + code -> fils (construit au premier accès)
+
+    def __len__(self):
+        return len(self.propositions)
+
+    def proposition(self, noeud):
+        """
+        Fonction qui renvoie l'indice (dans le moteur de feedback) du mot proposé à un noeud.
+
+        :param noeud: numéro du noeud
+        :type noeud: int
+
+        :return: indice du mot proposé
+        :rtype: int
+        """
+
+        return int(self.propositions[noeud])
+
+    def fils(self, noeud, code):
+        """
+        Fonction qui renvoie le noeud atteint depuis un noeud pour un code de feedback.
+
+        :param noeud: numéro du noeud
+        :param code: code du feedback obtenu pour le mot proposé au noeud
+
+        :type noeud: int
+        :type code: int
+
+        :return: numéro du fils (-1 si aucun mot du dictionnaire ne donne ce feedback)
+        :rtype: int
+        """
+
+        if self._transitions is None:
+            nb_codes = (self.taille + 1) ** 2
+            sources = np.repeat(np.arange(len(self.propositions)), np.diff(self.premiers_arcs))
+            cles = sources * nb_codes + self.codes
+            self._transitions = dict(zip(cles.tolist(), range(1, len(cles) + 1)))
+
+        return self._transitions.get(noeud * (self.taille + 1) ** 2 + code, -1)
+
+    def sauvegarder(self, chemin):
+        """
+        Fonction qui écrit l'arbre dans un fichier .npz (écriture dans un fichier temporaire puis renommage).
+
+        :param chemin: chemin du fichier
+        :type chemin: str
+        """
+
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+
+        chemin_tmp = "{}.{}.tmp".format(chemin, os.getpid())
+        with open(chemin_tmp, "wb") as fichier:
+            np.savez(fichier, taille=self.taille, empreinte=self.empreinte, strategy=self.strategy,
+                     propositions=self.propositions, premiers_arcs=self.premiers_arcs, codes=self.codes)
+        os.replace(chemin_tmp, chemin)
+
+    @staticmethod
+    def charger(chemin):
+        """
+        Fonction qui charge un arbre écrit avec sauvegarder.
+
+        :param chemin: chemin du fichier
+        :type chemin: str
+
+        :return: arbre de stratégie
+        :rtype: ArbreStrategie
+        """
+
+        with np.load(chemin) as donnees:
+            return ArbreStrategie(int(donnees["taille"]), str(donnees["empreinte"]), str(donnees["strategy"]),
+                                  donnees["propositions"], donnees["premiers_arcs"], donnees["codes"])
+
+
+def construire_arbre(liste_mots, premier_mot, strategy="minimax"):
+    """
+    Fonction qui développe tout l'arbre de décision de resolution_par_CSP_opt pour les mots d'une taille :
+    pour chaque noeud, le pool des mots possibles est partitionné selon le feedback du mot proposé, et chaque
+    partie donne un fils dont le mot proposé est celui choisi par donner_proposition.
+    Chaque mot du dictionnaire est proposé à exactement un noeud (celui où il est le mot secret).
+
+    :param liste_mots: liste (ou groupe du lexique) des mots de la taille voulue
+    :param premier_mot: premier mot proposé (doit être dans la liste)
+    :param strategy: "minimax", "esperance" ou "entropie"
+
+    :type liste_mots: list[list[str]] | GroupeMots
+    :type premier_mot: list[str]
+    :type strategy: str
+
+    :return: arbre de stratégie
+    :rtype: ArbreStrategie
+    """
+
+    taille = len(premier_mot)
+    moteur = moteur_feedback.obtenir_moteur(liste_mots)
+    racine = lexique.obtenir_groupe(liste_mots, taille).identifiant(premier_mot)
+    if racine < 0:
+        raise ValueError("Le premier mot {} n'est pas dans le dictionnaire.".format("".join(premier_mot)))
+
+    propositions = [racine]
+    pools = [np.arange(moteur.nb_mots)]
+    premiers_arcs = [0]
+    codes = []
+
+    # parcours en largeur : les fils sont numérotés dans l'ordre où ils sont créés
+    noeud = 0
+    while noeud < len(propositions):
+        pool = pools[noeud]
+        pools[noeud] = None
+        codes_pool = moteur.codes(np.array([propositions[noeud]]), pool)[0]
+
+        for code in np.unique(codes_pool):
+            if code == moteur.code_gagnant:
+                continue
+            # même filtrage que moteur.filtrer : le pool reste trié comme dans une partie
+            sous_pool = pool[codes_pool == code]
+            codes.append(code)
+            propositions.append(csp.donner_proposition(moteur, sous_pool, strategy))
+            pools.append(sous_pool)
+
+        premiers_arcs.append(len(codes))
+        noeud += 1
+
+    type_indices = np.int32 if moteur.nb_mots < 2 ** 31 else np.int64
+    return ArbreStrategie(taille, moteur.empreinte, strategy, np.array(propositions, dtype=type_indices),
+                          np.array(premiers_arcs, dtype=type_indices), np.array(codes, dtype=moteur.dtype))
+
+
+def chemin_arbre(dossier, moteur, premier_mot, strategy="minimax"):
+    """
+    Fonction qui renvoie le chemin du fichier de l'arbre d'une taille, d'un premier mot et d'une stratégie :
+    comme pour les tables de feedback, l'empreinte des mots fait partie du nom.
+
+    :param dossier: dossier des arbres
+    :param moteur: moteur de feedback des mots de la taille voulue
+    :param premier_mot: premier mot proposé
+    :param strategy: "minimax", "esperance" ou "entropie"
+
+    :type dossier: str
+    :type moteur: MoteurFeedback
+    :type premier_mot: list[str]
+    :type strategy: str
+
+    :return: chemin du fichier
+    :rtype: str
+    """
+
+    nom_fichier = "arbre_n{}_{}_{}_{}.npz".format(moteur.taille, moteur.empreinte[:16], "".join(premier_mot), strategy)
+    return os.path.join(dossier, nom_fichier)
+
+
+# arbres déjà chargés, indexés par leur chemin (partagés par toutes les parties du processus)
+_arbres = dict()
+
+
+def obtenir_arbre(liste_mots, premier_mot, strategy="minimax", dossier="./cache/"):
+    """
+    Fonction qui renvoie l'arbre de stratégie d'une taille, d'un premier mot et d'une stratégie :
+    lu sur disque s'il y est déjà, construit puis écrit sinon (une seule lecture par processus).
+
+    :param liste_mots: liste (ou groupe du lexique) des mots de la taille voulue
+    :param premier_mot: premier mot proposé
+    :param strategy: "minimax", "esperance" ou "entropie"
+    :param dossier: dossier des arbres
+
+    :type liste_mots: list[list[str]] | GroupeMots
+    :type premier_mot: list[str]
+    :type strategy: str
+    :type dossier: str
+
+    :return: arbre de stratégie
+    :rtype: ArbreStrategie
+    """
+
+    chemin = chemin_arbre(dossier, moteur_feedback.obtenir_moteur(liste_mots), premier_mot, strategy)
+
+    arbre = _arbres.get(chemin)
+    if arbre is None:
+        if os.path.exists(chemin):
+            arbre = ArbreStrategie.charger(chemin)
+        else:
+            arbre = construire_arbre(liste_mots, premier_mot, strategy)
+            arbre.sauvegarder(chemin)
+        _arbres[chemin] = arbre
+
+    return arbre
+
+
+if __name__ == "__main__":
+    file_path = "./dico.txt"
+    dictionnaire, _ = dictionnaire_compile.charger_dictionnaires(file_path, "./cache/")
+    moteur_feedback.activer_cache("./cache/")
+
+    dossier_arbres = "./cache/"     # dossier des arbres
+    strategy = "minimax"            # stratégie de donner_proposition
+
+    premiers_mots = pm.lire_premiers_mots("./data/premier_mot.txt")
+
+    for taille in sorted(premiers_mots):
+        if taille not in dictionnaire:
+            continue
+
+        debut = time.perf_counter()
+        liste_mots = dictionnaire[taille]
+        arbre = construire_arbre(liste_mots, premiers_mots[taille], strategy)
+        arbre.sauvegarder(chemin_arbre(dossier_arbres, moteur_feedback.obtenir_moteur(liste_mots),
+                                       premiers_mots[taille], strategy))
+        fin = time.perf_counter()
+
+        print("taille {} ({:.2f} s):\t{} noeuds".format(taille, fin - debut, len(arbre)))
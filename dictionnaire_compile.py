@@ -0,0 +1,142 @@
+import glob
+import hashlib
+import os
+import shutil
+
+import numpy as np
+
+import lexique
+import moteur_feedback
+import trie_compact
+
+
+# préfixe des dossiers de dictionnaires compilés
+PREFIXE = "dico_"
+
+# version du format des dictionnaires compilés (les dictionnaires d'une autre version sont recompilés)
+VERSION = 2
+
+
+class ChargeurGroupes:
+    """
+    Chargeur des groupes de mots d'un dictionnaire compilé : les fichiers d'une taille ne sont projetés
+    en mémoire (mmap) qu'au premier accès à cette taille.
+    """
+
+    def __init__(self, dossier):
+        self.dossier = dossier      # dossier du dictionnaire compilé
+
+    def __call__(self, taille):
+        mots = np.load(os.path.join(self.dossier, "mots_n{}.npy".format(taille)), mmap_mode="r")
+        compteurs = np.load(os.path.join(self.dossier, "compteurs_n{}.npy".format(taille)), mmap_mode="r")
+
+        return lexique.GroupeMots(taille, mots, compteurs)
+
+
+def compiler(contenu, dossier):
+    """
+    Fonction qui lit en une seule passe le contenu d'un fichier de dictionnaire et écrit le dictionnaire
+    compilé dans un dossier : pour chaque taille, les mots (codes ASCII) et le nombre d'occurrences de chaque
+    lettre dans chaque mot, puis le trie compact de tous les mots.
+
+    :param contenu: contenu du fichier de dictionnaire
+    :param dossier: dossier du dictionnaire compilé
+
+    :type contenu: bytes
+    :type dossier: str
+    """
+
+    liste_mots = [mot for mot in contenu.decode("ascii").splitlines() if mot]
+
+    mots_par_taille = dict()
+    for mot in liste_mots:
+        mots_par_taille.setdefault(len(mot), []).append(mot)
+
+    # écriture dans un dossier temporaire puis renommage, pour qu'un autre processus
+    # ne puisse jamais ouvrir un dictionnaire compilé à moitié écrit
+    dossier_tmp = "{}.{}.tmp".format(dossier, os.getpid())
+    os.makedirs(dossier_tmp, exist_ok=True)
+
+    for taille, mots_taille in mots_par_taille.items():
+        octets = "".join(mots_taille).encode("ascii")
+        mots = np.frombuffer(octets, dtype=np.uint8).reshape(len(mots_taille), taille)
+        compteurs = moteur_feedback.compter_lettres(mots - np.uint8(ord("a")))
+
+        np.save(os.path.join(dossier_tmp, "mots_n{}.npy".format(taille)), mots)
+        np.save(os.path.join(dossier_tmp, "compteurs_n{}.npy".format(taille)), compteurs)
+
+    trie = trie_compact.construire_trie(liste_mots)
+    tailles = np.array(sorted(trie.racines), dtype=np.int32)
+    racines = np.array([tailles, [trie.racines[taille] for taille in tailles]], dtype=np.int32)
+    np.save(os.path.join(dossier_tmp, "trie_transitions.npy"), trie.transitions)
+    np.save(os.path.join(dossier_tmp, "trie_terminaux.npy"), trie.terminaux)
+    np.save(os.path.join(dossier_tmp, "trie_masques.npy"), trie.masques)
+    np.save(os.path.join(dossier_tmp, "trie_supports.npy"), trie.supports)
+    np.save(os.path.join(dossier_tmp, "trie_racines.npy"), racines)
+
+    try:
+        os.rename(dossier_tmp, dossier)
+    except OSError:
+        # un autre processus a compilé le même dictionnaire en même temps
+        shutil.rmtree(dossier_tmp)
+
+
+def ouvrir(dossier):
+    """
+    Fonction qui ouvre un dictionnaire compilé par projection en mémoire (mmap).
+    Les mots d'une taille ne sont chargés qu'au premier accès à cette taille.
+
+    :param dossier: dossier du dictionnaire compilé
+    :type dossier: str
+
+    :return: lexique des mots, trie des mots
+    :rtype: (Lexique, TrieCompact)
+    """
+
+    tailles, racines = np.load(os.path.join(dossier, "trie_racines.npy"))
+    trie = trie_compact.TrieCompact(np.load(os.path.join(dossier, "trie_transitions.npy"), mmap_mode="r"),
+                                    np.load(os.path.join(dossier, "trie_terminaux.npy"), mmap_mode="r"),
+                                    {int(taille): int(racine) for taille, racine in zip(tailles, racines)},
+                                    np.load(os.path.join(dossier, "trie_masques.npy"), mmap_mode="r"),
+                                    np.load(os.path.join(dossier, "trie_supports.npy"), mmap_mode="r"))
+
+    groupes = {int(taille): None for taille in tailles}
+    dictionnaire = lexique.Lexique(groupes, ChargeurGroupes(dossier))
+
+    return dictionnaire, trie
+
+
+def charger_dictionnaires(nom_fichier, dossier_cache="./cache/"):
+    """
+    Fonction qui renvoie le dictionnaire du fichier sous forme de Lexique (mots rangés par taille)
+    et de Trie. Le dictionnaire est compilé dans le dossier de cache au premier appel, puis simplement
+    ouvert par projection en mémoire aux appels suivants, tant que le contenu du fichier ne change pas.
+
+    :param nom_fichier: chemin du fichier
+    :param dossier_cache: dossier du cache
+
+    :type nom_fichier: str
+    :type dossier_cache: str
+
+    :return: lexique des mots, trie des mots
+    :rtype: (Lexique, TrieCompact)
+    """
+
+    with open(nom_fichier, "rb") as fichier:
+        contenu = fichier.read()
+    empreinte = hashlib.sha1(contenu).hexdigest()[:16]
+    # identifiant du fichier source, pour que les dictionnaires compilés de plusieurs fichiers cohabitent
+    source = hashlib.sha1(os.path.abspath(nom_fichier).encode()).hexdigest()[:8]
+
+    dossier = os.path.join(dossier_cache, "{}{}_v{}_{}".format(PREFIXE, source, VERSION, empreinte))
+    if not os.path.isdir(dossier):
+        os.makedirs(dossier_cache, exist_ok=True)
+
+        # dictionnaires compilés à partir d'une version précédente du même fichier (ou du format)
+        for ancien_dossier in glob.glob(os.path.join(dossier_cache, "{}{}_*".format(PREFIXE, source))):
+            if not ancien_dossier.endswith(".tmp"):
+                shutil.rmtree(ancien_dossier)
+
+        compiler(contenu, dossier)
+
+    return ouvrir(dossier)
@@ -0,0 +1,167 @@
+import string
+
+
+# liste des lettres de l'alphabet en lower case
+ALPHABET = list(string.ascii_lowercase)
+
+# nombre de lettres de l'alphabet
+NB_LETTRES = len(ALPHABET)
+
+# indice de chaque lettre dans l'alphabet
+INDICE_LETTRE = {lettre: i for i, lettre in enumerate(ALPHABET)}
+
+# masque de toutes les lettres de l'alphabet (bit i pour la lettre i)
+MASQUE_ALPHABET = (1 << len(ALPHABET)) - 1
+
+# masque de chaque lettre
+MASQUE_LETTRE = {lettre: 1 << i for i, lettre in enumerate(ALPHABET)}
+
+
+def masque_lettres(lettres):
+    """
+    Fonction qui renvoie le masque d'un ensemble de lettres.
+
+    :param lettres: lettres
+    :type lettres: list[str]
+
+    :return: masque des lettres
+    :rtype: int
+    """
+
+    masque = 0
+    for lettre in lettres:
+        masque |= MASQUE_LETTRE[lettre]
+    return masque
+
+
+def lettres_masque(masque):
+    """
+    Fonction qui renvoie les lettres d'un masque, dans l'ordre alphabétique.
+
+    :param masque: masque de lettres
+    :type masque: int
+
+    :return: liste des lettres
+    :rtype: list[str]
+    """
+
+    return [lettre for i, lettre in enumerate(ALPHABET) if masque >> i & 1]
+
+
+def premiere_lettre(masque):
+    """
+    Fonction qui renvoie la première lettre (dans l'ordre alphabétique) d'un masque non vide.
+
+    :param masque: masque de lettres
+    :type masque: int
+
+    :return: première lettre
+    :rtype: str
+    """
+
+    return ALPHABET[(masque & -masque).bit_length() - 1]
+
+
+class Domaines:
+    """
+    Domaines des variables du CSP : un masque sur 26 bits par variable (bit i pour la lettre i).
+    Les modifications faites avec retirer ou restreindre sont enregistrées dans une pile (trail)
+    et peuvent être annulées jusqu'à une marque, ce qui évite de copier les domaines lors du backtrack.
+    Si des bornes sont données, un domaine restauré ne peut jamais dépasser sa borne
+    (par exemple les domaines réduits par les tentatives faites entre-temps).
+    """
+
+    def __init__(self, masques, bornes=None):
+        self.masques = list(masques)    # masque du domaine de chaque variable
+        self.bornes = bornes            # masque maximal de chaque variable lors d'une restauration (ou None)
+        self._variables = []            # trail : variables modifiées
+        self._anciens = []              # trail : masques avant modification
+
+    def __len__(self):
+        return len(self.masques)
+
+    def __getitem__(self, var):
+        return self.masques[var]
+
+    def __setitem__(self, var, masque):
+        # modification définitive (non enregistrée dans le trail)
+        self.masques[var] = masque
+
+    def lettres(self, var):
+        """
+        Fonction qui renvoie les lettres du domaine d'une variable.
+
+        :param var: indice de la variable
+        :type var: int
+
+        :return: liste des lettres
+        :rtype: list[str]
+        """
+
+        return lettres_masque(self.masques[var])
+
+    def marque(self):
+        """
+        Fonction qui renvoie la position courante du trail, à laquelle on pourra revenir avec annuler.
+
+        :return: marque
+        :rtype: int
+        """
+
+        return len(self._variables)
+
+    def restreindre(self, var, masque):
+        """
+        Fonction qui restreint le domaine d'une variable aux lettres du masque.
+
+        :param var: indice de la variable
+        :param masque: masque des lettres autorisées
+
+        :type var: int
+        :type masque: int
+
+        :return: nouveau masque du domaine
+        :rtype: int
+        """
+
+        ancien = self.masques[var]
+        nouveau = ancien & masque
+        if nouveau != ancien:
+            self._variables.append(var)
+            self._anciens.append(ancien)
+            self.masques[var] = nouveau
+
+        return nouveau
+
+    def retirer(self, var, masque):
+        """
+        Fonction qui retire les lettres du masque du domaine d'une variable.
+
+        :param var: indice de la variable
+        :param masque: masque des lettres à retirer
+
+        :type var: int
+        :type masque: int
+
+        :return: nouveau masque du domaine
+        :rtype: int
+        """
+
+        return self.restreindre(var, ~masque)
+
+    def annuler(self, marque):
+        """
+        Fonction qui annule toutes les modifications faites depuis la marque.
+
+        :param marque: marque obtenue avec la fonction marque
+        :type marque: int
+        """
+
+        variables = self._variables
+        anciens = self._anciens
+        bornes = self.bornes
+
+        while len(variables) > marque:
+            var = variables.pop()
+            ancien = anciens.pop()
+            self.masques[var] = ancien if bornes is None else ancien & bornes[var]
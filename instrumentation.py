@@ -0,0 +1,72 @@
+import cProfile
+import os
+
+
+# noms des compteurs (dans l'ordre des colonnes des journaux de plot.lancer_all_algo)
+NOMS_COMPTEURS = ["evaluations_feedback", "noeuds_trie", "retours_arriere", "elagages_fc", "generations",
+                  "redemarrages", "recherches_mot_proche", "candidats_evalues", "nb_tours", "somme_tailles_pool"]
+
+
+class Compteurs:
+    """
+    Compteurs des opérations coûteuses d'une résolution, attachés (sur demande) à un WordleMindProblem.
+    Les solveurs ne comptent que si le problème a des compteurs : sinon le seul coût est le test
+    "compteurs is not None" aux endroits comptés.
+    """
+
+    def __init__(self):
+        self.evaluations_feedback = 0   # nombre de feedbacks calculés (mot contre mot)
+        self.noeuds_trie = 0            # noeuds du trie visités par le forward-checking et la propagation
+        self.retours_arriere = 0        # retours arrière du CSP
+        self.elagages_fc = 0            # instanciations rejetées par le forward-checking (ou la propagation)
+        self.generations = 0            # générations de l'algorithme génétique
+        self.redemarrages = 0           # redémarrages à la génération 0 de l'algorithme génétique
+        self.recherches_mot_proche = 0  # recherches du mot existant le plus proche d'un enfant
+        self.candidats_evalues = 0      # mots évalués (score de leur partition) pour choisir une proposition
+        self.tailles_pool = []          # nombre de mots encore possibles après chaque tentative
+
+    def totaux(self):
+        """
+        Fonction qui renvoie la valeur de chaque compteur (les tailles du pool sont résumées
+        par le nombre de tours et leur somme).
+
+        :return: valeur de chaque compteur de NOMS_COMPTEURS
+        :rtype: dict[str, int]
+        """
+
+        totaux = {nom: getattr(self, nom) for nom in NOMS_COMPTEURS[:-2]}
+        totaux["nb_tours"] = len(self.tailles_pool)
+        totaux["somme_tailles_pool"] = sum(self.tailles_pool)
+
+        return totaux
+
+    def __repr__(self):
+        valeurs = ", ".join("{}={}".format(nom, valeur) for nom, valeur in self.totaux().items())
+        return "Compteurs({}, tailles_pool={})".format(valeurs, self.tailles_pool)
+
+
+def profiler(fonction, chemin, *args, **kwargs):
+    """
+    Fonction qui appelle une fonction sous cProfile et écrit les statistiques dans un fichier
+    (lisible avec pstats ou snakeviz).
+
+    :param fonction: fonction à appeler
+    :param chemin: chemin du fichier des statistiques (.prof)
+    :param args: arguments de la fonction
+    :param kwargs: arguments nommés de la fonction
+
+    :type fonction: callable
+    :type chemin: str
+
+    :return: valeur renvoyée par la fonction
+    """
+
+    dossier = os.path.dirname(chemin)
+    if dossier:
+        os.makedirs(dossier, exist_ok=True)
+
+    profil = cProfile.Profile()
+    try:
+        return profil.runcall(fonction, *args, **kwargs)
+    finally:
+        profil.dump_stats(chemin)
@@ -0,0 +1,476 @@
+import collections.abc
+
+import numpy as np
+
+import domaines as dom
+
+
+class GroupeMots(collections.abc.Sequence):
+    """
+    Mots d'une même taille, stockés dans un seul tableau contigu d'octets (un mot par ligne).
+    Chaque mot est identifié par son indice (identifiant) dans le groupe ; il n'est décodé
+    en liste de lettres que lorsqu'on y accède.
+    """
+
+    def __init__(self, taille, mots, compteurs=None):
+        self.taille = taille                        # taille des mots
+        self.mots = np.ascontiguousarray(mots)      # codes ASCII des lettres (nb_mots x taille, uint8)
+        self.compteurs = compteurs                  # occurrences des lettres de chaque mot (précalculées ou None)
+        self._identifiants = None                   # identifiant de chaque mot (construit au premier test)
+        self._index = None                          # index des lettres (construit au premier accès)
+        self._voisins = None                        # index des plus proches voisins (construit au premier accès)
+
+    def __len__(self):
+        return self.mots.shape[0]
+
+    def __getitem__(self, identifiant):
+        if isinstance(identifiant, slice):
+            return [self[i] for i in range(*identifiant.indices(len(self)))]
+
+        return list(self.mots[identifiant].tobytes().decode("ascii"))
+
+    def __iter__(self):
+        for ligne in self.mots:
+            yield list(ligne.tobytes().decode("ascii"))
+
+    def __contains__(self, mot):
+        return self.identifiant(mot) >= 0
+
+    def identifiant(self, mot):
+        """
+        Fonction qui renvoie l'identifiant d'un mot dans le groupe, en temps constant.
+
+        :param mot: un mot
+        :type mot: list[str]
+
+        :return: identifiant du mot (-1 s'il n'est pas dans le groupe)
+        :rtype: int
+        """
+
+        if self._identifiants is None:
+            self._identifiants = {ligne.tobytes(): i for i, ligne in enumerate(self.mots)}
+
+        try:
+            cle = "".join(mot).encode("ascii")
+        except (TypeError, UnicodeEncodeError):
+            return -1
+
+        return self._identifiants.get(cle, -1)
+
+    def mot_str(self, identifiant):
+        """
+        Fonction qui renvoie le mot d'identifiant donné sous forme de chaine de caractères.
+
+        :param identifiant: identifiant du mot
+        :type identifiant: int
+
+        :return: mot
+        :rtype: str
+        """
+
+        return self.mots[identifiant].tobytes().decode("ascii")
+
+    def index(self):
+        """
+        Fonction qui renvoie l'index des lettres des mots du groupe (construit au premier appel).
+
+        :return: index des lettres
+        :rtype: IndexMots
+        """
+
+        if self._index is None:
+            self._index = IndexMots(self.mots)
+
+        return self._index
+
+    def voisins(self):
+        """
+        Fonction qui renvoie l'index des plus proches voisins des mots du groupe (construit au premier appel).
+
+        :return: index des plus proches voisins
+        :rtype: IndexHamming
+        """
+
+        if self._voisins is None:
+            self._voisins = IndexHamming(self)
+
+        return self._voisins
+
+
+class IndexMots:
+    """
+    Index inversé des mots d'une même taille : pour chaque position et chaque lettre, l'ensemble des mots
+    qui ont cette lettre à cette position, et pour chaque lettre, l'ensemble des mots qui la contiennent.
+    Un ensemble de mots est un entier dont le bit i vaut 1 si le mot d'identifiant i est dans l'ensemble,
+    ce qui permet de filtrer tout un groupe de mots avec quelques opérations bit à bit.
+    """
+
+    def __init__(self, mots):
+        self.nb_mots, self.taille = mots.shape
+        self.tous = (1 << self.nb_mots) - 1     # ensemble de tous les mots
+
+        # positions[i][l] : mots qui ont la lettre l à la position i
+        self.positions = [[_ensemble(mots[:, i] == ord(lettre)) for lettre in dom.ALPHABET]
+                          for i in range(self.taille)]
+
+        # presences[l] : mots qui contiennent la lettre l
+        self.presences = [0] * len(dom.ALPHABET)
+        for ensembles in self.positions:
+            for l, ensemble in enumerate(ensembles):
+                self.presences[l] |= ensemble
+
+    def position(self, i, lettre):
+        """
+        Fonction qui renvoie l'ensemble des mots qui ont une lettre donnée à une position donnée.
+
+        :param i: position
+        :param lettre: lettre
+
+        :type i: int
+        :type lettre: str
+
+        :return: ensemble de mots
+        :rtype: int
+        """
+
+        return self.positions[i][dom.INDICE_LETTRE[lettre]]
+
+    def presence(self, lettre):
+        """
+        Fonction qui renvoie l'ensemble des mots qui contiennent une lettre donnée.
+
+        :param lettre: lettre
+        :type lettre: str
+
+        :return: ensemble de mots
+        :rtype: int
+        """
+
+        return self.presences[dom.INDICE_LETTRE[lettre]]
+
+    def filtrer_domaines(self, domaines, candidats=None):
+        """
+        Fonction qui renvoie les mots dont chaque lettre est dans le domaine de sa position.
+
+        :param domaines: masque des lettres possibles pour chaque position
+        :param candidats: ensemble de mots à filtrer (tous les mots par défaut)
+
+        :type domaines: Domaines | list[int]
+        :type candidats: int
+
+        :return: ensemble de mots
+        :rtype: int
+        """
+
+        resultat = self.tous if candidats is None else candidats
+        for i in range(self.taille):
+            # on retire les mots qui ont à cette position une lettre retirée du domaine
+            retirees = ~domaines[i] & dom.MASQUE_ALPHABET
+            ensembles = self.positions[i]
+            while retirees:
+                bit = retirees & -retirees
+                retirees ^= bit
+                resultat &= ~ensembles[bit.bit_length() - 1]
+
+        return resultat
+
+    def prefiltrer(self, mot, feedback, candidats=None):
+        """
+        Fonction qui renvoie un sur-ensemble des mots compatibles avec le feedback d'un mot proposé,
+        calculé uniquement avec les ensembles de l'index : les mots qui ne sont pas dans cet ensemble
+        sont sûrement incompatibles, les autres doivent encore être vérifiés avec le feedback exact.
+
+        :param mot: mot proposé
+        :param feedback: feedback du mot proposé
+        :param candidats: ensemble de mots à filtrer (tous les mots par défaut)
+
+        :type mot: list[str]
+        :type feedback: Feedback
+        :type candidats: int
+
+        :return: ensemble de mots
+        :rtype: int
+        """
+
+        correctes, proches = feedback
+        communes = correctes + proches
+        resultat = self.tous if candidats is None else candidats
+
+        # mots qui ont au moins une lettre correcte
+        bien_places = 0
+        for i, lettre in enumerate(mot):
+            bien_places |= self.position(i, lettre)
+
+        if correctes == self.taille:
+            for i, lettre in enumerate(mot):
+                resultat &= self.position(i, lettre)
+            return resultat
+        if correctes == 0:
+            resultat &= ~bien_places
+        else:
+            resultat &= bien_places
+
+        # mots qui ont au moins une lettre commune
+        lettres_mot = set(mot)
+        presents = 0
+        for lettre in lettres_mot:
+            presents |= self.presence(lettre)
+
+        if communes == 0:
+            resultat &= ~presents
+        else:
+            resultat &= presents
+
+        # si toutes les lettres sont communes, le mot est une anagramme du mot proposé
+        if communes == self.taille:
+            for l, lettre in enumerate(dom.ALPHABET):
+                if lettre in lettres_mot:
+                    resultat &= self.presences[l]
+                else:
+                    resultat &= ~self.presences[l]
+
+        return resultat
+
+    def ensemble(self, identifiants):
+        """
+        Fonction qui renvoie l'ensemble des mots d'identifiants donnés.
+
+        :param identifiants: identifiants des mots
+        :type identifiants: np.ndarray
+
+        :return: ensemble de mots
+        :rtype: int
+        """
+
+        selection = np.zeros(self.nb_mots, dtype=np.bool_)
+        selection[identifiants] = True
+
+        return _ensemble(selection)
+
+    def identifiants(self, ensemble):
+        """
+        Fonction qui renvoie les identifiants des mots d'un ensemble, par ordre croissant.
+
+        :param ensemble: ensemble de mots
+        :type ensemble: int
+
+        :return: identifiants des mots
+        :rtype: np.ndarray
+        """
+
+        octets = ensemble.to_bytes((self.nb_mots + 7) // 8, "little")
+        bits = np.unpackbits(np.frombuffer(octets, dtype=np.uint8), bitorder="little")
+
+        return np.flatnonzero(bits[:self.nb_mots])
+
+
+class IndexHamming:
+    """
+    Index des plus proches voisins des mots d'un groupe pour la distance de Hamming (nombre de positions
+    où les lettres diffèrent). Un mot du groupe est trouvé en temps constant ; pour la distance 1, chaque
+    mot est rangé sous ses motifs à joker (une position remplacée par "*") ; au-delà, les distances à tous
+    les mots sont calculées en une seule opération vectorisée. En cas d'égalité, le mot de plus petit
+    identifiant est choisi (c'est-à-dire le premier dans l'ordre du dictionnaire).
+    """
+
+    JOKER = ord("*")
+
+    def __init__(self, groupe):
+        self.groupe = groupe
+
+        # plus petit identifiant des mots de chaque motif à joker
+        self.motifs = dict()
+        motifs = groupe.mots.copy()
+        for i in range(groupe.taille):
+            motifs[:, i] = self.JOKER
+            for identifiant, motif in enumerate(motifs):
+                self.motifs.setdefault(motif.tobytes(), identifiant)
+            motifs[:, i] = groupe.mots[:, i]
+
+    def voisin_direct(self, octets):
+        """
+        Fonction qui renvoie l'identifiant du mot du groupe le plus proche d'un mot s'il est à une distance
+        d'au plus 1 : le mot lui-même, ou sinon un mot qui a le même motif en remplaçant une lettre par le joker.
+
+        :param octets: codes ASCII des lettres du mot
+        :type octets: bytes
+
+        :return: identifiant du mot le plus proche (-1 s'il n'y a aucun mot à une distance d'au plus 1)
+        :rtype: int
+        """
+
+        identifiant = self.groupe.identifiant(octets.decode("ascii"))
+        if identifiant >= 0:
+            return identifiant
+
+        motif = bytearray(octets)
+        for i in range(len(motif)):
+            lettre = motif[i]
+            motif[i] = self.JOKER
+            voisin = self.motifs.get(bytes(motif), -1)
+            if voisin >= 0 and (identifiant < 0 or voisin < identifiant):
+                identifiant = voisin
+            motif[i] = lettre
+
+        return identifiant
+
+    def plus_proche(self, mot):
+        """
+        Fonction qui renvoie l'identifiant du mot du groupe le plus proche d'un mot de même taille.
+
+        :param mot: un mot
+        :type mot: list[str]
+
+        :return: identifiant du mot le plus proche (-1 si le groupe est vide)
+        :rtype: int
+        """
+
+        if len(self.groupe) == 0:
+            return -1
+
+        octets = "".join(mot).encode("ascii")
+        identifiant = self.voisin_direct(octets)
+        if identifiant >= 0:
+            return identifiant
+
+        # sinon, distance à tous les mots (argmin renvoie le premier minimum)
+        distances = (self.groupe.mots != np.frombuffer(octets, dtype=np.uint8)).sum(axis=1)
+        return int(np.argmin(distances))
+
+    def plus_proches(self, mots, taille_bloc=1 << 22):
+        """
+        Fonction qui renvoie l'identifiant du mot du groupe le plus proche de chacun des mots donnés.
+        Chaque mot différent n'est traité qu'une fois : d'abord avec les motifs à joker (distance d'au plus 1),
+        puis, pour les mots restants, en calculant les distances à tous les mots du groupe par blocs
+        (au plus taille_bloc comparaisons de lettres par bloc).
+
+        :param mots: codes ASCII des lettres des mots (nb_mots x taille)
+        :param taille_bloc: nombre maximal de comparaisons de lettres par bloc
+
+        :type mots: np.ndarray
+        :type taille_bloc: int
+
+        :return: identifiants des mots les plus proches
+        :rtype: np.ndarray
+        """
+
+        uniques, inverse = np.unique(mots, axis=0, return_inverse=True)
+        resultat = np.array([self.voisin_direct(ligne.tobytes()) for ligne in uniques], dtype=np.int64)
+
+        restants = np.flatnonzero(resultat < 0)
+        pas = max(1, taille_bloc // max(1, self.groupe.mots.size))
+        for debut in range(0, len(restants), pas):
+            indices = restants[debut:debut + pas]
+            distances = (uniques[indices, None, :] != self.groupe.mots[None, :, :]).sum(axis=2)
+            resultat[indices] = np.argmin(distances, axis=1)
+
+        return resultat[inverse.reshape(-1)]
+
+
+def _ensemble(selection):
+    # ensemble (entier) des indices où la sélection booléenne est vraie
+    return int.from_bytes(np.packbits(selection, bitorder="little").tobytes(), "little")
+
+
+class Lexique(collections.abc.Mapping):
+    """
+    Dictionnaire de mots qui a pour clé la taille des mots et pour valeur le groupe des mots de cette taille.
+    Il s'utilise à la place du dictionnaire renvoyé par utils.lire_dictionnaire.
+    Un groupe peut n'être chargé qu'au moment où on y accède (s'il vaut None, il est créé par le chargeur).
+    """
+
+    def __init__(self, groupes, chargeur=None):
+        self._groupes = groupes     # dict[int, GroupeMots | None]
+        self._chargeur = chargeur   # fonction taille -> GroupeMots pour les groupes pas encore chargés
+
+    def __getitem__(self, taille):
+        groupe = self._groupes[taille]
+        if groupe is None:
+            groupe = self._chargeur(taille)
+            self._groupes[taille] = groupe
+
+        return groupe
+
+    def __iter__(self):
+        return iter(self._groupes)
+
+    def __len__(self):
+        return len(self._groupes)
+
+
+def lire_lexique(nom_fichier):
+    """
+    Fonction qui lit les mots d'un dictionnaire et les range par taille dans un Lexique.
+
+    :param nom_fichier: chemin du fichier
+    :type nom_fichier: str
+
+    :return: lexique des mots du fichier
+    :rtype: Lexique
+    """
+
+    with open(nom_fichier, "r") as fichier:
+        lignes = fichier.read().split("\n")
+
+    mots_par_taille = dict()
+    for mot in lignes:
+        if mot:
+            mots_par_taille.setdefault(len(mot), []).append(mot)
+
+    groupes = dict()
+    for taille, liste_mots in mots_par_taille.items():
+        groupes[taille] = creer_groupe(liste_mots, taille)
+
+    return Lexique(groupes)
+
+
+def creer_groupe(liste_mots, taille):
+    """
+    Fonction qui range une liste de mots de même taille dans un groupe de mots.
+
+    :param liste_mots: liste de mots (listes de lettres ou chaines de caractères)
+    :param taille: taille des mots
+
+    :type liste_mots: list[list[str]] | list[str]
+    :type taille: int
+
+    :return: groupe des mots
+    :rtype: GroupeMots
+    """
+
+    octets = "".join("".join(mot) for mot in liste_mots).encode("ascii")
+    mots = np.frombuffer(octets, dtype=np.uint8).reshape(len(liste_mots), taille)
+
+    return GroupeMots(taille, mots)
+
+
+# groupes déjà construits à partir de listes de mots, indexés par l'identifiant de la liste
+_groupes = dict()
+
+
+def obtenir_groupe(liste_mots, taille):
+    """
+    Fonction qui renvoie le groupe de mots associé à une liste de mots de même taille
+    (le groupe n'est construit qu'une seule fois par liste, et un groupe est renvoyé tel quel).
+
+    :param liste_mots: liste (ou groupe du lexique) de mots de même taille
+    :param taille: taille des mots
+
+    :type liste_mots: list[list[str]] | GroupeMots
+    :type taille: int
+
+    :return: groupe des mots
+    :rtype: GroupeMots
+    """
+
+    if isinstance(liste_mots, GroupeMots):
+        return liste_mots
+
+    liste, groupe = _groupes.get(id(liste_mots), (None, None))
+
+    # on garde une référence vers la liste pour que son identifiant ne soit pas réutilisé
+    if liste is not liste_mots:
+        groupe = creer_groupe(liste_mots, taille)
+        _groupes[id(liste_mots)] = (liste_mots, groupe)
+
+    return groupe
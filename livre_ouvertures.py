@@ -0,0 +1,187 @@
+import csv
+import os
+import time
+
+import numpy as np
+
+import CSP as csp
+import dictionnaire_compile
+import lexique
+import moteur_feedback
+import premier_mot as pm
+import utils
+
+
+# chemin du livre d'ouvertures
+CHEMIN_LIVRE = "./data/livre_ouvertures.csv"
+
+# colonnes du livre d'ouvertures (les feedbacks du deuxième mot sont vides pour les deuxièmes propositions)
+COLONNES_LIVRE = ["taille", "empreinte", "strategy", "premier_mot", "correctes_1", "proches_1", "correctes_2",
+                  "proches_2", "proposition"]
+
+# lignes de chaque fichier de livre d'ouvertures déjà lu, indexées par (taille, empreinte, stratégie, premier mot)
+_fichiers = dict()
+
+# livres déjà construits, indexés par (chemin, empreinte, stratégie, premier mot)
+_livres = dict()
+
+
+def construire_livre(liste_mots, premier_mot, strategy="minimax", profondeur=3):
+    """
+    Fonction qui calcule les ouvertures de resolution_par_CSP_opt pour un premier mot : la deuxième proposition
+    pour chaque feedback du premier mot et, si profondeur vaut 3, la troisième pour chaque couple de feedbacks.
+
+    :param liste_mots: liste (ou groupe du lexique) des mots de la taille voulue
+    :param premier_mot: premier mot proposé
+    :param strategy: "minimax", "esperance" ou "entropie"
+    :param profondeur: numéro de la dernière proposition calculée (2 ou 3)
+
+    :type liste_mots: list[list[str]] | GroupeMots
+    :type premier_mot: list[str]
+    :type strategy: str
+    :type profondeur: int
+
+    :return: indice du mot proposé pour chaque suite de codes de feedback
+    :rtype: dict[tuple[int], int]
+    """
+
+    moteur = moteur_feedback.obtenir_moteur(liste_mots)
+
+    livre = dict()
+    # (codes des feedbacks déjà obtenus, mot proposé, pool des mots possibles avant la proposition)
+    ouvertures = [((), premier_mot, np.arange(moteur.nb_mots))]
+    for _ in range(profondeur - 1):
+        suivantes = []
+        for codes_precedents, proposition, pool in ouvertures:
+            codes_pool = moteur.codes_proposition(proposition, pool)
+            for code in np.unique(codes_pool):
+                if code == moteur.code_gagnant:
+                    continue
+                # même filtrage que moteur.filtrer : le pool reste trié comme dans une partie
+                sous_pool = pool[codes_pool == code]
+                codes = codes_precedents + (int(code),)
+                livre[codes] = csp.donner_proposition(moteur, sous_pool, strategy)
+                suivantes.append((codes, liste_mots[livre[codes]], sous_pool))
+        ouvertures = suivantes
+
+    return livre
+
+
+def ecrire_livre(chemin, livres):
+    """
+    Fonction qui écrit le livre d'ouvertures (un seul fichier CSV pour toutes les tailles, mots en majuscules).
+
+    :param chemin: chemin du fichier
+    :param livres: pour chaque taille, les mots, le premier mot, la stratégie et les ouvertures calculées
+                   par construire_livre
+
+    :type chemin: str
+    :type livres: list[(list[list[str]] | GroupeMots, list[str], str, dict[tuple[int], int])]
+    """
+
+    chemin_tmp = "{}.{}.tmp".format(chemin, os.getpid())
+    with open(chemin_tmp, "w", newline="") as fichier:
+        ecrivain = csv.writer(fichier)
+        ecrivain.writerow(COLONNES_LIVRE)
+        for liste_mots, premier_mot, strategy, livre in livres:
+            moteur = moteur_feedback.obtenir_moteur(liste_mots)
+            for codes in sorted(livre, key=lambda codes: (len(codes), codes)):
+                feedbacks = []
+                for code in codes:
+                    feedbacks += list(moteur.feedback(code))
+                feedbacks += [""] * (4 - len(feedbacks))
+                ecrivain.writerow([moteur.taille, moteur.empreinte[:16], strategy,
+                                   utils.liste_mot_en_str(premier_mot).upper()] + feedbacks
+                                  + [utils.liste_mot_en_str(liste_mots[livre[codes]]).upper()])
+    os.replace(chemin_tmp, chemin)
+
+
+def lire_livre(chemin):
+    """
+    Fonction qui lit le livre d'ouvertures (aucune ouverture si le fichier n'existe pas).
+
+    :param chemin: chemin du fichier
+    :type chemin: str
+
+    :return: lignes du livre indexées par (taille, empreinte, stratégie, premier mot)
+    :rtype: dict[(int, str, str, str), list[dict[str, str]]]
+    """
+
+    lignes = dict()
+    if not os.path.exists(chemin):
+        return lignes
+
+    with open(chemin, "r", newline="") as fichier:
+        for ligne in csv.DictReader(fichier):
+            cle = (int(ligne["taille"]), ligne["empreinte"], ligne["strategy"], ligne["premier_mot"])
+            lignes.setdefault(cle, []).append(ligne)
+
+    return lignes
+
+
+def obtenir_livre(liste_mots, premier_mot, strategy="minimax", chemin=CHEMIN_LIVRE):
+    """
+    Fonction qui renvoie les ouvertures d'un premier mot pour les mots d'une taille : le fichier n'est lu
+    qu'au premier appel, et seules les lignes calculées pour ces mots (même empreinte) et cette stratégie
+    sont utilisées.
+
+    :param liste_mots: liste (ou groupe du lexique) des mots de la taille voulue
+    :param premier_mot: premier mot proposé
+    :param strategy: "minimax", "esperance" ou "entropie"
+    :param chemin: chemin du livre d'ouvertures
+
+    :type liste_mots: list[list[str]] | GroupeMots
+    :type premier_mot: list[str]
+    :type strategy: str
+    :type chemin: str
+
+    :return: indice du mot proposé pour chaque suite de codes de feedback (vide si pas d'ouvertures)
+    :rtype: dict[tuple[int], int]
+    """
+
+    moteur = moteur_feedback.obtenir_moteur(liste_mots)
+    premier = utils.liste_mot_en_str(premier_mot).upper()
+    cle = (chemin, moteur.empreinte, strategy, premier)
+
+    livre = _livres.get(cle)
+    if livre is None:
+        if chemin not in _fichiers:
+            _fichiers[chemin] = lire_livre(chemin)
+
+        groupe = lexique.obtenir_groupe(liste_mots, moteur.taille)
+        livre = dict()
+        for ligne in _fichiers[chemin].get((moteur.taille, moteur.empreinte[:16], strategy, premier), []):
+            codes = (moteur.code(utils.Feedback(int(ligne["correctes_1"]), int(ligne["proches_1"]))),)
+            if ligne["correctes_2"]:
+                codes += (moteur.code(utils.Feedback(int(ligne["correctes_2"]), int(ligne["proches_2"]))),)
+            identifiant = groupe.identifiant(list(ligne["proposition"].lower()))
+            if identifiant >= 0:
+                livre[codes] = identifiant
+        _livres[cle] = livre
+
+    return livre
+
+
+if __name__ == "__main__":
+    file_path = "./dico.txt"
+    dictionnaire, _ = dictionnaire_compile.charger_dictionnaires(file_path, "./cache/")
+    moteur_feedback.activer_cache("./cache/")
+
+    strategy = "minimax"    # stratégie de donner_proposition
+    profondeur = 3          # numéro de la dernière proposition du livre
+
+    premiers_mots = pm.lire_premiers_mots("./data/premier_mot.txt")
+
+    livres = []
+    for taille in sorted(premiers_mots):
+        if taille not in dictionnaire:
+            continue
+
+        debut = time.perf_counter()
+        livre = construire_livre(dictionnaire[taille], premiers_mots[taille], strategy, profondeur)
+        fin = time.perf_counter()
+        livres.append((dictionnaire[taille], premiers_mots[taille], strategy, livre))
+
+        print("taille {} ({:.2f} s):\t{} ouvertures".format(taille, fin - debut, len(livre)))
+
+    ecrire_livre(CHEMIN_LIVRE, livres)
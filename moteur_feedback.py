@@ -0,0 +1,400 @@
+import glob
+import hashlib
+import os
+
+import numpy as np
+
+import lexique
+import utils
+
+
+# nombre de lettres de l'alphabet
+NB_LETTRES = len(utils.alphabet)
+
+# nombre max d'éléments des matrices intermédiaires lors du calcul d'une table par blocs
+TAILLE_BLOC = 1 << 22
+
+# dossier du cache disque des tables de feedback (pas de cache si None)
+_dossier_cache = None
+
+# taille max (en octets) de toutes les tables du cache disque : au-delà, les tables utilisées
+# le moins récemment sont supprimées
+TAILLE_MAX_CACHE = 4 << 30
+
+
+def encoder_mots(liste_mots, taille_mot):
+    """
+    Fonction qui encode une liste de mots de même taille en une matrice d'entiers (0 pour 'a', ..., 25 pour 'z').
+
+    :param liste_mots: liste de mots
+    :param taille_mot: nombre de lettres des mots
+
+    :type liste_mots: list[list[str]]
+    :type taille_mot: int
+
+    :return: matrice des mots encodés (une ligne par mot)
+    :rtype: np.ndarray
+    """
+
+    texte = "".join("".join(mot) for mot in liste_mots).encode("ascii")
+    mots = np.frombuffer(texte, dtype=np.uint8).reshape(len(liste_mots), taille_mot)
+
+    return mots - ord("a")
+
+
+def compter_lettres(mots):
+    """
+    Fonction qui calcule le nombre d'occurrences de chaque lettre de l'alphabet dans chaque mot encodé.
+
+    :param mots: matrice des mots encodés
+    :type mots: np.ndarray
+
+    :return: matrice du nombre d'occurrences (une ligne par mot, une colonne par lettre)
+    :rtype: np.ndarray
+    """
+
+    compteurs = np.zeros((mots.shape[0], NB_LETTRES), dtype=np.uint8)
+    lignes = np.arange(mots.shape[0])
+    for i in range(mots.shape[1]):
+        compteurs[lignes, mots[:, i]] += 1
+
+    return compteurs
+
+
+class MoteurFeedback:
+    """
+    Moteur de calcul vectorisé des feedbacks pour tous les mots d'une même taille.
+
+    Le feedback Feedback(correctes, proches) est codé par l'entier correctes * (taille + 1) + proches.
+    Le nombre de lettres proches est obtenu par : somme des min(occurrences) - nombre de lettres correctes.
+    """
+
+    def __init__(self, liste_mots, taille_mot=None, dossier_cache=None):
+        if taille_mot is None:
+            taille_mot = len(liste_mots[0])
+
+        self.taille = taille_mot                                # taille des mots
+        self.nb_mots = len(liste_mots)                          # nombre de mots
+        self.nb_codes = (taille_mot + 1) ** 2                   # nombre de codes de feedback possibles
+        self.code_gagnant = taille_mot * (taille_mot + 1)       # code du feedback Feedback(taille, 0)
+        self.dtype = np.uint8 if self.nb_codes <= 256 else np.uint16
+
+        if isinstance(liste_mots, lexique.GroupeMots):
+            # les mots sont déjà stockés en un tableau d'octets : pas besoin de les décoder
+            self.mots = liste_mots.mots - np.uint8(ord("a"))
+        else:
+            self.mots = encoder_mots(liste_mots, taille_mot)    # mots encodés (nb_mots x taille)
+        if isinstance(liste_mots, lexique.GroupeMots) and liste_mots.compteurs is not None:
+            self.compteurs = liste_mots.compteurs               # occurrences des lettres précalculées
+        else:
+            self.compteurs = compter_lettres(self.mots)         # occurrences des lettres (nb_mots x 26)
+
+        # empreinte du contenu des mots : une table en cache n'est valable que pour ces mots, dans cet ordre
+        self.empreinte = hashlib.sha1(self.mots.tobytes()).hexdigest()
+        self.dossier_cache = dossier_cache      # dossier du cache disque de la table (None si pas de cache)
+        self._table = None                      # table complète des codes de feedback (si calculée ou chargée)
+
+    def encoder(self, mot):
+        """
+        Fonction qui encode un mot en un vecteur d'entiers.
+
+        :param mot: un mot
+        :type mot: list[str]
+
+        :return: mot encodé
+        :rtype: np.ndarray
+        """
+
+        return encoder_mots([mot], self.taille)[0]
+
+    def code(self, feedback):
+        """
+        Fonction qui renvoie le code entier d'un feedback.
+
+        :param feedback: feedback (nombre de lettres correctes et proches)
+        :type feedback: Feedback
+
+        :return: code du feedback
+        :rtype: int
+        """
+
+        return feedback.correctes * (self.taille + 1) + feedback.proches
+
+    def feedback(self, code):
+        """
+        Fonction qui renvoie le feedback correspondant à un code entier.
+
+        :param code: code du feedback
+        :type code: int
+
+        :return: feedback (nombre de lettres correctes et proches)
+        :rtype: Feedback
+        """
+
+        correctes, proches = divmod(int(code), self.taille + 1)
+        return utils.Feedback(correctes, proches)
+
+    def codes_proposition(self, proposition, indices=None):
+        """
+        Fonction qui calcule les codes des feedbacks du mot proposé par rapport aux mots du moteur.
+
+        :param proposition: mot proposé
+        :param indices: indices des mots à comparer (tous les mots si None)
+
+        :type proposition: list[str]
+        :type indices: np.ndarray
+
+        :return: vecteur des codes de feedback
+        :rtype: np.ndarray
+        """
+
+        mot = self.encoder(proposition)
+        mots = self.mots if indices is None else self.mots[indices]
+        compteurs = self.compteurs if indices is None else self.compteurs[indices]
+
+        correctes = (mots == mot).sum(axis=1, dtype=self.dtype)
+
+        # seules les lettres du mot proposé peuvent être communes
+        lettres, occurrences = np.unique(mot, return_counts=True)
+        communes = np.minimum(compteurs[:, lettres], occurrences.astype(np.uint8)).sum(axis=1, dtype=self.dtype)
+
+        return correctes * self.dtype(self.taille + 1) + (communes - correctes)
+
+    def codes(self, lignes, colonnes):
+        """
+        Fonction qui calcule la matrice des codes de feedback entre deux ensembles de mots du moteur.
+        Le coefficient (i, j) est le code du feedback de la proposition lignes[i] pour le secret colonnes[j].
+
+        :param lignes: indices des mots proposés
+        :param colonnes: indices des mots secrets
+
+        :type lignes: np.ndarray
+        :type colonnes: np.ndarray
+
+        :return: matrice des codes de feedback
+        :rtype: np.ndarray
+        """
+
+        lignes = np.asarray(lignes)
+        colonnes = np.asarray(colonnes)
+
+        # si la table est en cache, on lit directement les codes
+        if self._table is None and self.dossier_cache is not None:
+            self.table()
+        if self._table is not None:
+            return self._table[np.ix_(lignes, colonnes)]
+
+        return self._calculer_codes(lignes, colonnes)
+
+    def _calculer_codes(self, lignes, colonnes):
+        """
+        Fonction qui calcule par blocs la matrice des codes de feedback entre deux ensembles de mots du moteur.
+
+        :param lignes: indices des mots proposés
+        :param colonnes: indices des mots secrets
+
+        :type lignes: np.ndarray
+        :type colonnes: np.ndarray
+
+        :return: matrice des codes de feedback
+        :rtype: np.ndarray
+        """
+
+        resultat = np.empty((len(lignes), len(colonnes)), dtype=self.dtype)
+
+        mots_colonnes = self.mots[colonnes]
+        compteurs_colonnes = self.compteurs[colonnes]
+        # les lettres absentes de tous les mots secrets ne contribuent pas aux lettres communes
+        lettres_utiles = np.flatnonzero(compteurs_colonnes.any(axis=0))
+
+        pas = max(1, TAILLE_BLOC // max(1, len(colonnes)))
+        for debut in range(0, len(lignes), pas):
+            bloc = lignes[debut:debut + pas]
+            mots_bloc = self.mots[bloc]
+            compteurs_bloc = self.compteurs[bloc]
+
+            correctes = np.zeros((len(bloc), len(colonnes)), dtype=self.dtype)
+            for i in range(self.taille):
+                correctes += mots_bloc[:, i, None] == mots_colonnes[None, :, i]
+
+            communes = np.zeros((len(bloc), len(colonnes)), dtype=self.dtype)
+            for lettre in lettres_utiles:
+                communes += np.minimum(compteurs_bloc[:, lettre, None], compteurs_colonnes[None, :, lettre])
+
+            resultat[debut:debut + pas] = correctes * self.dtype(self.taille + 1) + (communes - correctes)
+
+        return resultat
+
+    def table(self):
+        """
+        Fonction qui renvoie la table complète des codes de feedback entre tous les mots du moteur.
+        Si un dossier de cache est donné, la table est lue sur disque par projection en mémoire (mmap),
+        et n'est calculée puis écrite que si elle n'y est pas encore (ou si le dictionnaire a changé).
+
+        :return: matrice nb_mots x nb_mots des codes de feedback
+        :rtype: np.ndarray
+        """
+
+        if self._table is not None:
+            return self._table
+
+        if self.dossier_cache is None:
+            indices = np.arange(self.nb_mots)
+            self._table = self._calculer_codes(indices, indices)
+            return self._table
+
+        chemin = self.chemin_table()
+        if os.path.exists(chemin):
+            # date de dernière utilisation de la table, pour l'éviction du cache
+            os.utime(chemin)
+        else:
+            indices = np.arange(self.nb_mots)
+            self._sauvegarder_table(chemin, self._calculer_codes(indices, indices))
+
+        self._table = np.load(chemin, mmap_mode="r")
+        return self._table
+
+    def chemin_table(self):
+        """
+        Fonction qui renvoie le chemin du fichier de la table dans le cache disque.
+
+        :return: chemin du fichier
+        :rtype: str
+        """
+
+        nom_fichier = "table_n{}_{}.npy".format(self.taille, self.empreinte[:16])
+        return os.path.join(self.dossier_cache, nom_fichier)
+
+    def _sauvegarder_table(self, chemin, table):
+        """
+        Fonction qui écrit la table dans le cache disque, puis supprime les tables utilisées le moins récemment
+        tant que le cache dépasse TAILLE_MAX_CACHE (les tables de plusieurs dictionnaires peuvent cohabiter).
+
+        :param chemin: chemin du fichier
+        :param table: table des codes de feedback
+
+        :type chemin: str
+        :type table: np.ndarray
+        """
+
+        os.makedirs(self.dossier_cache, exist_ok=True)
+
+        # écriture dans un fichier temporaire puis renommage, pour qu'un autre processus
+        # ne puisse jamais ouvrir une table à moitié écrite
+        chemin_tmp = "{}.{}.tmp".format(chemin, os.getpid())
+        with open(chemin_tmp, "wb") as fichier:
+            np.save(fichier, table)
+        os.replace(chemin_tmp, chemin)
+
+        # tables du cache, de la moins récemment utilisée à la plus récente
+        tables = []
+        for autre_chemin in glob.glob(os.path.join(self.dossier_cache, "table_n*.npy")):
+            try:
+                infos = os.stat(autre_chemin)
+            except FileNotFoundError:
+                continue    # supprimée entre-temps par un autre processus
+            tables.append((infos.st_mtime, infos.st_size, autre_chemin))
+        tables.sort()
+
+        taille_totale = sum(taille for _, taille, _ in tables)
+        for _, taille, autre_chemin in tables:
+            if taille_totale <= TAILLE_MAX_CACHE:
+                break
+            if autre_chemin != chemin:
+                try:
+                    os.remove(autre_chemin)
+                except FileNotFoundError:
+                    pass
+                taille_totale -= taille
+
+    def histogrammes(self, lignes, colonnes):
+        """
+        Fonction qui calcule, pour chaque mot proposé, le nombre de mots secrets par code de feedback.
+
+        :param lignes: indices des mots proposés
+        :param colonnes: indices des mots secrets
+
+        :type lignes: np.ndarray
+        :type colonnes: np.ndarray
+
+        :return: matrice len(lignes) x nb_codes des effectifs
+        :rtype: np.ndarray
+        """
+
+        lignes = np.asarray(lignes)
+        codes = self.codes(lignes, colonnes).astype(np.int64)
+        # décalage des codes de chaque ligne pour faire tous les comptages en un seul appel
+        codes += np.arange(len(lignes))[:, None] * self.nb_codes
+
+        return np.bincount(codes.ravel(), minlength=len(lignes) * self.nb_codes).reshape(len(lignes), self.nb_codes)
+
+    def filtrer(self, indices, proposition, feedback):
+        """
+        Fonction qui filtre les indices des mots possibles et élimine ceux qui ne peuvent pas être le mot secret
+        selon le feedback obtenu pour le mot proposé (le mot proposé est lui aussi éliminé).
+
+        :param indices: indices des mots possibles
+        :param proposition: mot proposé
+        :param feedback: feedback
+
+        :type indices: np.ndarray
+        :type proposition: list[str]
+        :type feedback: Feedback
+
+        :return: indices des mots possibles filtrés
+        :rtype: np.ndarray
+        """
+
+        code = self.code(feedback)
+        if code == self.code_gagnant:
+            # seul le mot proposé lui-même est compatible avec ce feedback
+            return indices[:0]
+
+        codes = self.codes_proposition(proposition, indices)
+        return indices[codes == code]
+
+
+# moteurs déjà construits, indexés par l'identifiant de la liste de mots
+_moteurs = dict()
+
+
+def activer_cache(dossier="./cache/"):
+    """
+    Fonction qui active le cache disque des tables de feedback pour tous les moteurs.
+    Chaque table (une par taille de mot) est identifiée par une empreinte du contenu du dictionnaire :
+    si le dictionnaire change, la table est recalculée (les anciennes ne sont supprimées que lorsque le cache
+    dépasse TAILLE_MAX_CACHE).
+
+    :param dossier: dossier du cache
+    :type dossier: str
+    """
+
+    global _dossier_cache
+    _dossier_cache = dossier
+
+    for _, moteur in _moteurs.values():
+        if moteur.dossier_cache != dossier:
+            moteur.dossier_cache = dossier
+            moteur._table = None
+
+
+def obtenir_moteur(liste_mots):
+    """
+    Fonction qui renvoie le moteur de feedback associé à une liste de mots de même taille
+    (le moteur n'est construit qu'une seule fois par liste).
+
+    :param liste_mots: liste (ou groupe du lexique) de mots de même taille
+    :type liste_mots: list[list[str]] | GroupeMots
+
+    :return: moteur de feedback
+    :rtype: MoteurFeedback
+    """
+
+    liste, moteur = _moteurs.get(id(liste_mots), (None, None))
+
+    # on garde une référence vers la liste pour que son identifiant ne soit pas réutilisé
+    if liste is not liste_mots:
+        moteur = MoteurFeedback(liste_mots, dossier_cache=_dossier_cache)
+        _moteurs[id(liste_mots)] = (liste_mots, moteur)
+
+    return moteur
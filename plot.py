@@ -1,15 +1,26 @@
-import copy
+import csv
 import datetime
 import matplotlib.pyplot as plt
+import multiprocessing
+import multiprocessing.connection
+import numpy as np
 import os
-from statistics import mean
+import random
 import time
-
+import traceback
+
+import arbre_strategie
+import dictionnaire_compile
+import instrumentation
+import moteur_feedback
+import premier_mot
+import resultats
 import utils
 from WordleMindProblem import WordleMindProblem
 
 
-def lancer_algo(mot_secret, dictionnaire, trie, nom_algo, maxsize=5, maxgen=20, affichage=False):
+def lancer_algo(mot_secret, dictionnaire, trie, nom_algo, maxsize=5, maxgen=20, affichage=False, graine=None,
+                compteurs=None, profil=None, workers=None, arbre=None):
     """
     Fonction qui lance un algorithme donné en paramètre et renvoie le nombre de tentatives faites et le temps d'exécution.
     :param mot_secret: le mot secret
@@ -18,21 +29,58 @@ def lancer_algo(mot_secret, dictionnaire, trie, nom_algo, maxsize=5, maxgen=20,
     :param maxsize: taille max de l'ensemble E pour l'algorithme génétique
     :param maxgen: nombre max de génération pour l'algorithme génétique
     :param affichage: si on veut l'affichage des tentatives
+    :param graine: graine des générateurs aléatoires de la partie (partie non reproductible si None)
+    :param compteurs: compteurs d'instrumentation remplis pendant la résolution (pas de comptage si None)
+    :param profil: chemin du fichier où écrire les statistiques cProfile de la résolution (pas de profilage si None)
+    :param workers: nombre de processus des algorithmes parallèles (nombre de coeurs si None)
+    :param arbre: arbre de stratégie de csp_arbre (lu ou construit pendant la résolution si None)
     :type mot_secret: list[str]
     :type dictionnaire: dict[int, list[list[str]]]
     :type nom_algo: str
     :type maxsize: int
     :type maxgen: int
     :type affichage: bool
+    :type graine: int
+    :type compteurs: instrumentation.Compteurs
+    :type profil: str
+    :type workers: int
+    :type arbre: arbre_strategie.ArbreStrategie
     :return: nombre de tentatives faites, temps d'exécution
     :rtype: (int, float)
     """
 
+    if workers is None:
+        workers = os.cpu_count()
+
+    rng = None
+    if graine is not None:
+        random.seed(graine)
+        np.random.seed(graine)
+        rng = np.random.default_rng(graine)
+
     # initialisation du Wordle Mind
-    WMP = WordleMindProblem(mot_secret, dictionnaire, trie)
+    WMP = WordleMindProblem(mot_secret, dictionnaire, trie, compteurs=compteurs)
 
-    # choix de l'algorithme
+    # résolution (sous cProfile si demandé)
     tps_debut = time.perf_counter()
+    if profil is None:
+        nb_essais = _resoudre(WMP, nom_algo, maxsize, maxgen, affichage, rng, workers, arbre)
+    else:
+        nb_essais = instrumentation.profiler(_resoudre, profil, WMP, nom_algo, maxsize, maxgen, affichage, rng,
+                                             workers, arbre)
+    tps_fin = time.perf_counter()
+
+    # calcul du temps d'exécution
+    tps_total = tps_fin - tps_debut
+
+    return nb_essais, tps_total
+
+
+def _resoudre(WMP, nom_algo, maxsize, maxgen, affichage, rng, workers, arbre):
+    """
+    Fonction qui résout le problème avec l'algorithme donné et renvoie le nombre de tentatives faites.
+    """
+
     if nom_algo == "csp_rac":
         if affichage:
             print("----- CSP RAC -----")
@@ -43,140 +91,304 @@ def lancer_algo(mot_secret, dictionnaire, trie, nom_algo, maxsize=5, maxgen=20,
         if affichage:
             print("----- CSP FC -----")
         nb_essais = WMP.resolution_par_CSP(type_dico="trie", version="A2", verbose=affichage)
+    elif nom_algo == "csp_al":
+        if affichage:
+            print("----- CSP AL -----")
+        nb_essais = WMP.resolution_par_CSP(type_dico="trie", version="A3", verbose=affichage)
     elif nom_algo == "csp_opt":
         if affichage:
             print("----- CSP OPT -----")
         nb_essais = WMP.resolution_par_CSP_opt(verbose=affichage)
+    elif nom_algo == "csp_opt_budget":
+        if affichage:
+            print("----- CSP OPT (propositions en temps limité) -----")
+        nb_essais = WMP.resolution_par_CSP_opt(verbose=affichage, budget_ms=50, rng=rng)
+    elif nom_algo == "csp_arbre":
+        if affichage:
+            print("----- CSP OPT (arbre de stratégie) -----")
+        if arbre is None:
+            arbre = obtenir_arbre(WMP.dictionnaire[WMP.taille_mot])
+        nb_essais = WMP.resolution_par_CSP_opt(verbose=affichage, arbre=arbre)
     elif nom_algo == "ag":
         if affichage:
             print("----- Algo Génétique -----")
         nb_essais = WMP.resolution_par_algo_genetique(maxsize, maxgen, verbose=affichage)
+    elif nom_algo == "ag_pop":
+        if affichage:
+            print("----- Algo Génétique (population vectorisée) -----")
+        nb_essais = WMP.resolution_par_algo_genetique(maxsize, maxgen, verbose=affichage, taille_pop=1000,
+                                                      vectorise=True, rng=rng)
+    elif nom_algo == "ag_iles":
+        if affichage:
+            print("----- Algo Génétique (modèle en îles) -----")
+        nb_essais = WMP.resolution_par_algo_genetique(maxsize, maxgen, verbose=affichage, taille_pop=250,
+                                                      workers=workers, rng=rng)
     else:
-        nb_essais = -1
-    tps_fin = time.perf_counter()
+        raise ValueError("Algorithme inconnu : {}.".format(nom_algo))
 
-    # calcul du temps d'exécution
-    tps_total = tps_fin - tps_debut
-
-    return nb_essais, tps_total
+    return nb_essais
 
 
-def lancer_all_algo(liste_tailles, liste_algo, nb_tours, dictionnaire, trie, dossier, maxsize=5, maxgen=20, affichage=False):
+def obtenir_arbre(liste_mots):
+    """
+    Fonction qui renvoie l'arbre de stratégie de csp_arbre pour les mots d'une taille (premier mot de
+    ./data/premier_mot.txt, stratégie minimax) : lu sur disque s'il y est déjà, construit sinon.
+    :param liste_mots: liste des mots de la taille voulue
+    :type liste_mots: list[list[str]]
+    :return: arbre de stratégie
+    :rtype: arbre_strategie.ArbreStrategie
     """
-    Fonction qui lance tous les algorithmes de la liste et renvoie le nombre d'essais moyen par taille et par algorithme,
-    ainsi que le temps moyen d'exécution.
-    Les listes retournées sont de format : len(liste_tailles) x len(liste_algo)
 
-    :param liste_tailles: liste des tailles du mot secret
-    :param liste_algo: liste des noms des algorithmes
-    :param nb_tours: nombre de fois qu'on lance les algorithmes
-    :param maxsize: taille max de l'ensemble E pour l'algorithme génétique
-    :param maxgen: nombre max de génération pour l'algorithme génétique
-    :param affichage: si on veut l'affichage des tentatives
+    premiers_mots = premier_mot.lire_premiers_mots("./data/premier_mot.txt")
+    return arbre_strategie.obtenir_arbre(liste_mots, premiers_mots[len(liste_mots[0])])
 
-    :type liste_tailles: list[int]
-    :type liste_algo: list[str]
-    :type nb_tours: int
-    :type maxsize: int
-    :type maxgen: int
-    :type affichage: bool
-    :return: liste nombre d'essais moyen, liste temps moyen d'exécution
-    :rtype: (list[list[int]], list[list[float]])
-    """
 
-    liste_all_essais = []   # liste de nombres d'essais moyen pour chaque taille et chaque algo
-    liste_all_tps = []  # liste de temps moyen pour chaque taille et chaque algo
+# colonnes du journal des parties d'une campagne (un fichier par algorithme et par taille)
+COLONNES_JOURNAL = ["indice", "graine", "mot_secret", "nb_essais", "temps", "statut", "erreur"]
 
-    # pour chaque taille du mot secret
-    for taille in liste_tailles:
 
-        liste_moy_essais = []
-        liste_moy_tps = []
+def graine_partie(graine, taille, indice):
+    """
+    Fonction qui renvoie les graines d'une partie d'une campagne : elles ne dépendent que de la graine de la campagne,
+    de la taille du mot secret et de l'indice de la partie (tous les algorithmes jouent les mêmes parties).
+    Le tirage du mot secret et les générateurs aléatoires de la partie ont des graines indépendantes : sinon,
+    un algorithme qui tire son premier mot avec le générateur de la partie trouverait le mot secret dès le premier coup.
 
-        # pour chaque algo
-        for algo in liste_algo:
-            liste_nb_essais = []
-            liste_tps = []
+    :param graine: graine de la campagne
+    :param taille: taille du mot secret
+    :param indice: indice de la partie
 
-            nom_txt = "{}_n{}_min{}_max{}".format(algo, taille, liste_tailles[0], liste_tailles[-1])
-            f = open(dossier+nom_txt+".txt", "a")
+    :type graine: int
+    :type taille: int
+    :type indice: int
 
-            # nb_tours exécutions des algorithmes
-            for i in range(nb_tours):
+    :return: graine du tirage du mot secret, graine des générateurs aléatoires de la partie
+    :rtype: (int, int)
+    """
 
-                # initialisation du mot secret
-                mot_secret = utils.generer_mot_secret(dictionnaire, n=taille)
+    graine_secret, graine_jeu = np.random.SeedSequence([graine, taille, indice]).spawn(2)
+    return int(graine_secret.generate_state(1)[0]), int(graine_jeu.generate_state(1)[0])
 
-                if affichage:
-                    print("\nmot secret:\t{}".format(utils.liste_mot_en_str(mot_secret).upper()))
 
-                nb_essais, tps_total = lancer_algo(mot_secret, dictionnaire, trie, algo, maxsize=maxsize, maxgen=maxgen,
-                                                   affichage=affichage)
-                liste_nb_essais.append(nb_essais)
-                liste_tps.append(tps_total)
+def lire_journal(chemin):
+    """
+    Fonction qui lit le journal des parties d'un algorithme pour une taille (liste vide si pas de journal).
 
-                ecriture = "{},{},{}\n".format(mot_secret, nb_essais, tps_total)
-                f.write(ecriture)
+    :param chemin: chemin du journal
+    :type chemin: str
 
-            liste_moy_essais.append(mean(liste_nb_essais))
-            liste_moy_tps.append(mean(liste_tps))
+    :return: parties du journal (une ligne par partie)
+    :rtype: list[dict[str, str]]
+    """
 
-            f.close()
+    if not os.path.exists(chemin):
+        return []
 
-        liste_all_essais.append(liste_moy_essais)
-        liste_all_tps.append(liste_moy_tps)
+    with open(chemin, "r", newline="") as fichier:
+        return list(csv.DictReader(fichier))
 
-    return liste_all_essais, liste_all_tps
 
+def _jouer_partie(connexion, mot_secret, dictionnaire, trie, nom_algo, graine, maxsize, maxgen, instrumente, profil,
+                  workers, arbre):
+    """
+    Fonction lancée dans le processus d'une partie : joue la partie et envoie le résultat (et les compteurs si la
+    partie est instrumentée, ou la trace de l'exception si la partie a échoué) au processus principal.
+    """
 
-def recuperer_donnees_pour_graphe(liste_tailles, liste_algo, liste_all_essais, liste_all_tps):
+    compteurs = instrumentation.Compteurs() if instrumente else None
+    try:
+        nb_essais, tps_total = lancer_algo(mot_secret, dictionnaire, trie, nom_algo, maxsize=maxsize, maxgen=maxgen,
+                                           graine=graine, compteurs=compteurs, profil=profil, workers=workers,
+                                           arbre=arbre)
+        # une partie où l'algorithme n'a plus de mot à proposer (nb_essais = -1) n'a pas abouti
+        statut = "ok" if nb_essais >= 0 else "echec"
+        connexion.send((statut, nb_essais, tps_total, compteurs.totaux() if instrumente else {}))
+    except Exception:
+        connexion.send(("erreur", -1, 0.0, {"erreur": traceback.format_exc()}))
+    connexion.close()
+
+
+def lancer_all_algo(liste_tailles, liste_algo, nb_tours, dictionnaire, trie, dossier, maxsize=5, maxgen=20, affichage=False,
+                    nb_processus=None, graine=0, timeout=600, tous_les_mots=False, instrumente=False, profil=False):
     """
-    Fonction qui récupérer les données des algorithmes pour les mettre au bon format pour faire un graphe du nombre
-    d'essais moyen et temps moyen d'exécution de chaque algorithme en fonction de la taille du mot secret.
-    Les listes retournées sont de format : len(liste_algo) x len(liste_tailles)
+    Fonction qui lance tous les algorithmes de la liste et renvoie le nombre d'essais moyen par taille et par algorithme,
+    ainsi que le temps moyen d'exécution.
+    Les listes retournées sont de format : len(liste_tailles) x len(liste_algo)
+
+    Chaque partie est jouée dans son propre processus (au plus nb_processus parties à la fois), avec une graine fixe
+    (voir graine_partie) et un temps max : une partie qui le dépasse est arrêtée et notée "timeout" ; une partie qui
+    lève une exception est notée "erreur", avec la trace de l'exception dans la colonne "erreur" du journal ; une partie
+    où l'algorithme n'a plus de mot à proposer est notée "echec".
+    Le résultat de chaque partie est ajouté dès la fin de la partie au journal de son algorithme et de sa taille
+    (dossier/<algo>_n<taille>.csv) : relancer la campagne dans le même dossier ne rejoue que les parties manquantes.
+    Les moyennes ne portent que sur les parties terminées normalement.
+    Les coeurs sont partagés entre les parties en cours : chaque partie d'un algorithme parallèle (modèle en îles)
+    a os.cpu_count() // nb_processus processus (au moins un).
+    Les arbres de stratégie de csp_arbre sont lus (ou construits) une seule fois, avant de lancer les parties :
+    le temps de construction n'est pas compté dans le temps des parties.
+    Si la campagne est instrumentée, les compteurs de chaque partie (voir instrumentation.Compteurs) sont ajoutés
+    au journal ; si elle est profilée, les statistiques cProfile de chaque partie sont écrites dans
+    dossier/profils/<algo>_n<taille>_<indice>.prof.
+
     :param liste_tailles: liste des tailles du mot secret
     :param liste_algo: liste des noms des algorithmes
-    :param liste_all_essais: liste nombre d'essais moyen
-    :param liste_all_tps: liste temps moyen d'exécution
+    :param nb_tours: nombre de fois qu'on lance les algorithmes
+    :param dossier: dossier de la campagne (journaux des parties)
+    :param maxsize: taille max de l'ensemble E pour l'algorithme génétique
+    :param maxgen: nombre max de génération pour l'algorithme génétique
+    :param affichage: si on veut l'affichage de l'avancement
+    :param nb_processus: nombre de parties jouées en parallèle (nombre de coeurs si None)
+    :param graine: graine de la campagne
+    :param timeout: temps max (en secondes) d'une partie
+    :param tous_les_mots: si on veut jouer une partie par mot du dictionnaire de chaque taille (au lieu de nb_tours
+                          mots secrets tirés au hasard)
+    :param instrumente: si on veut les compteurs de chaque partie dans les journaux
+    :param profil: si on veut profiler chaque partie avec cProfile
+
     :type liste_tailles: list[int]
     :type liste_algo: list[str]
-    :type liste_all_essais: list[list[int]]
-    :type liste_all_tps: list[list[float]]
+    :type nb_tours: int
+    :type dossier: str
+    :type maxsize: int
+    :type maxgen: int
+    :type affichage: bool
+    :type nb_processus: int
+    :type graine: int
+    :type timeout: float
+    :type tous_les_mots: bool
+    :type instrumente: bool
+    :type profil: bool
     :return: liste nombre d'essais moyen, liste temps moyen d'exécution
     :rtype: (list[list[int]], list[list[float]])
     """
 
-    liste_donnees_essais = []   # liste de nombres d'essais moyen pour chaque algo et chaque taille
-    liste_donnees_tps = []  # liste de temps moyen pour chaque algo et chaque taille
+    if nb_processus is None:
+        nb_processus = os.cpu_count()
+    workers = max(1, os.cpu_count() // nb_processus)
 
-    # initialiser les listes des données
-    for i, algo in enumerate(liste_algo):
-        liste_tmp = []
-        for j, taille in enumerate(liste_tailles):
-            liste_tmp.append(-1)
-        liste_donnees_essais.append(copy.deepcopy(liste_tmp))
-        liste_donnees_tps.append(copy.deepcopy(liste_tmp))
+    os.makedirs(dossier, exist_ok=True)
 
-    # récupérer les données
-    for i, taille in enumerate(liste_tailles):
-        for j, algo in enumerate(liste_algo):
-            liste_donnees_essais[j][i] = liste_all_essais[i][j]
-            liste_donnees_tps[j][i] = liste_all_tps[i][j]
+    # parties qui restent à jouer (les parties déjà dans les journaux ne sont pas rejouées)
+    parties = []
+    for taille in liste_tailles:
+        liste_mots = dictionnaire[taille]
+        nb_parties = len(liste_mots) if tous_les_mots else nb_tours
 
-    return liste_donnees_essais, liste_donnees_tps
+        for algo in liste_algo:
+            faites = {int(ligne["indice"]) for ligne in lire_journal(os.path.join(dossier, "{}_n{}.csv".format(algo, taille)))}
+            for indice in range(nb_parties):
+                if indice in faites:
+                    continue
+                graine_secret, graine_p = graine_partie(graine, taille, indice)
+                if tous_les_mots:
+                    mot_secret = liste_mots[indice]
+                else:
+                    mot_secret = liste_mots[int(np.random.default_rng(graine_secret).integers(len(liste_mots)))]
+                parties.append((algo, taille, indice, graine_p, mot_secret))
+
+    # arbres de stratégie de csp_arbre, partagés par toutes les parties de la même taille
+    arbres = dict()
+    for algo, taille, _, _, _ in parties:
+        if algo == "csp_arbre" and taille not in arbres:
+            arbres[taille] = obtenir_arbre(dictionnaire[taille])
 
+    if affichage:
+        print("{} parties à jouer".format(len(parties)))
+
+    # ordonnanceur : chaque partie dans son processus, arrêté s'il dépasse le temps max
+    en_cours = dict()   # connexion -> (processus, partie, début)
+    nb_finies = 0
+    while parties or en_cours:
+        while parties and len(en_cours) < nb_processus:
+            partie = parties.pop(0)
+            algo, taille, indice, graine_p, mot_secret = partie
+            chemin_profil = None
+            if profil:
+                chemin_profil = os.path.join(dossier, "profils", "{}_n{}_{}.prof".format(algo, taille, indice))
+            connexion, connexion_fils = multiprocessing.Pipe(duplex=False)
+            processus = multiprocessing.Process(target=_jouer_partie, args=(connexion_fils, mot_secret, dictionnaire,
+                                                                           trie, algo, graine_p, maxsize, maxgen,
+                                                                           instrumente, chemin_profil, workers,
+                                                                           arbres.get(taille)))
+            processus.start()
+            connexion_fils.close()
+            en_cours[connexion] = (processus, partie, time.perf_counter())
+
+        echeance = min(debut for _, _, debut in en_cours.values()) + timeout
+        pretes = multiprocessing.connection.wait(list(en_cours), timeout=max(0, echeance - time.perf_counter()))
+
+        finies = []
+        for connexion in pretes:
+            processus, partie, _ = en_cours.pop(connexion)
+            try:
+                resultat = connexion.recv()
+            except EOFError:
+                # le processus de la partie s'est arrêté sans envoyer de résultat
+                resultat = ("erreur", -1, 0.0, {})
+            processus.join()
+            connexion.close()
+            finies.append((partie, resultat))
+
+        maintenant = time.perf_counter()
+        for connexion, (processus, partie, debut) in list(en_cours.items()):
+            if maintenant - debut >= timeout:
+                processus.terminate()
+                processus.join()
+                connexion.close()
+                del en_cours[connexion]
+                finies.append((partie, ("timeout", -1, timeout, {})))
+
+        for (algo, taille, indice, graine_p, mot_secret), (statut, nb_essais, tps_total, totaux) in finies:
+            chemin = os.path.join(dossier, "{}_n{}.csv".format(algo, taille))
+            # un journal existant garde ses colonnes (les compteurs absents de ses colonnes sont ignorés)
+            if os.path.exists(chemin):
+                with open(chemin, "r", newline="") as fichier:
+                    colonnes = next(csv.reader(fichier))
+                nouveau = False
+            else:
+                colonnes = COLONNES_JOURNAL + (instrumentation.NOMS_COMPTEURS if instrumente else [])
+                nouveau = True
+            with open(chemin, "a", newline="") as fichier:
+                journal = csv.DictWriter(fichier, colonnes, extrasaction="ignore")
+                if nouveau:
+                    journal.writeheader()
+                journal.writerow(dict(totaux, indice=indice, graine=graine_p,
+                                      mot_secret=utils.liste_mot_en_str(mot_secret), nb_essais=nb_essais,
+                                      temps=tps_total, statut=statut))
+
+            nb_finies += 1
+            if affichage:
+                print("{} n={} #{} {}: {} essais, {:.3f} s ({})".format(algo, taille, indice,
+                                                                      utils.liste_mot_en_str(mot_secret).upper(),
+                                                                      nb_essais, tps_total, statut))
+
+    # résultats par colonnes de toutes les parties de la campagne (de cette exécution et des précédentes)
+    stock = resultats.lire_journaux(dossier)
+    stock.sauvegarder(os.path.join(dossier, "resultats"))
+
+    # moyennes par taille et par algo
+    liste_all_essais = resultats.tableau(resultats.agreger(stock, "nb_essais"), ("taille", "algo"),
+                                         (liste_tailles, liste_algo), "moyenne")
+    liste_all_tps = resultats.tableau(resultats.agreger(stock, "temps"), ("taille", "algo"),
+                                      (liste_tailles, liste_algo), "moyenne")
+
+    return liste_all_essais, liste_all_tps
 
-def afficher_graphe(liste_tailles, liste_algo, liste_donnees_essais, liste_donnees_tps, nb_tours, nom_dossier):
+
+def afficher_graphe(liste_tailles, liste_algo, stock, nb_tours, nom_dossier):
     """
-    Fonction qui plot le nombre d'essais moyen et le temps moyen d'exécution de chaque algorithme en fonction de la taille du mot secret.
+    Fonction qui plot le nombre d'essais moyen et le temps d'exécution (moyenne, p95 et p99) de chaque algorithme
+    en fonction de la taille du mot secret, à partir des résultats par colonnes d'une campagne.
     :param liste_tailles: liste des tailles du mot secret
     :param liste_algo: liste des noms des algorithmes
-    :param liste_donnees_essais: liste nombre d'essais moyen
-    :param liste_donnees_tps: liste temps moyen d'exécution
+    :param stock: résultats des parties
+    :param nb_tours: nombre de parties par taille et par algorithme (pour le nom du fichier)
+    :param nom_dossier: dossier du graphe
     :type liste_tailles: list[int]
     :type liste_algo: list[str]
-    :type liste_donnees_essais: list[list[int]]
-    :type liste_donnees_tps: list[list[float]]
+    :type stock: Resultats
+    :type nb_tours: int
+    :type nom_dossier: str
     :return: None
     """
 
@@ -185,19 +397,30 @@ def afficher_graphe(liste_tailles, liste_algo, liste_donnees_essais, liste_donne
     for algo in liste_algo:
         noms_aglo += algo+"_"
 
+    # données de chaque algo et chaque taille (len(liste_algo) x len(liste_tailles))
+    par = ("algo", "taille")
+    agregat_essais = resultats.agreger(stock, "nb_essais", par=par)
+    agregat_tps = resultats.agreger(stock, "temps", par=par)
+    liste_donnees_essais = resultats.tableau(agregat_essais, par, (liste_algo, liste_tailles), "moyenne")
+    liste_donnees_tps = resultats.tableau(agregat_tps, par, (liste_algo, liste_tailles), "moyenne")
+    liste_donnees_p95 = resultats.tableau(agregat_tps, par, (liste_algo, liste_tailles), "p95")
+    liste_donnees_p99 = resultats.tableau(agregat_tps, par, (liste_algo, liste_tailles), "p99")
+
     fig, axs = plt.subplots(1, 2, figsize=(18, 8))
 
     for i, algo in enumerate(liste_algo):
         axs[0].plot(liste_tailles, liste_donnees_essais[i], label=algo)
-        axs[1].plot(liste_tailles, liste_donnees_tps[i], label=algo)
+        ligne, = axs[1].plot(liste_tailles, liste_donnees_tps[i], label=algo)
+        axs[1].plot(liste_tailles, liste_donnees_p95[i], linestyle="--", color=ligne.get_color(), label=algo+" p95")
+        axs[1].plot(liste_tailles, liste_donnees_p99[i], linestyle=":", color=ligne.get_color(), label=algo+" p99")
 
     axs[0].set_title("nombre d'essais moyen de chaque algorithme en fonction de la taille du mot secret")
     axs[0].set_xlabel("taille du mot secret")
     axs[0].set_ylabel("nombre d'essais moyen")
 
-    axs[1].set_title("temps moyen d'exécution de chaque algorithme en fonction de la taille du mot secret")
+    axs[1].set_title("temps d'exécution (moyenne, p95, p99) de chaque algorithme en fonction de la taille du mot secret")
     axs[1].set_xlabel("taille du mot secret")
-    axs[1].set_ylabel("temps moyen")
+    axs[1].set_ylabel("temps")
 
     plt.legend()
     # plt.show()
@@ -208,12 +431,20 @@ def afficher_graphe(liste_tailles, liste_algo, liste_donnees_essais, liste_donne
 if __name__ == "__main__":
 
     file_path = "./dico.txt"
-    dictionnaire = utils.lire_dictionnaire(file_path)  # lecture du dictionnaire
-    trie = utils.lire_dictionnaire_trie(file_path)
-
-    d = datetime.datetime.today()
-    nom_run = d.strftime("%Y_%m_%d-%H_%M_%S")
-    dossier = "./test_data/"+nom_run+"/"
+    # lecture du dictionnaire (compilé dans le cache au premier lancement, puis projeté en mémoire)
+    dictionnaire, trie = dictionnaire_compile.charger_dictionnaires(file_path, "./cache/")
+    # tables de feedback lues depuis le cache disque (calculées au premier lancement)
+    moteur_feedback.activer_cache("./cache/")
+
+    # pour reprendre une campagne interrompue, donner son dossier (None pour une nouvelle campagne)
+    dossier_reprise = None
+
+    if dossier_reprise is None:
+        d = datetime.datetime.today()
+        nom_run = d.strftime("%Y_%m_%d-%H_%M_%S")
+        dossier = "./test_data/"+nom_run+"/"
+    else:
+        dossier = dossier_reprise
     
     try:
         os.makedirs(dossier)
@@ -225,6 +456,12 @@ if __name__ == "__main__":
     affichage = True   # si on veut l'affichage des tentatives
     
     nb_tours = 20        # nombre de fois qu'on exécute les algorithmes
+    tous_les_mots = False   # si on veut jouer tous les mots secrets de chaque taille (au lieu de nb_tours)
+    graine = 0          # graine de la campagne
+    timeout = 600       # temps max d'une partie (en secondes)
+    nb_processus = None     # nombre de parties jouées en parallèle (nombre de coeurs si None)
+    instrumente = False     # si on veut les compteurs de chaque partie dans les journaux
+    profil = False          # si on veut profiler chaque partie (dossier/profils)
 
     taille_min = 2      # taille minimale du mot secret
     taille_max = 10      # taille maximale du mot secret
@@ -235,17 +472,14 @@ if __name__ == "__main__":
     # liste des tailles voulues pour le mot secret
     liste_tailles = [i for i in range(taille_min, taille_max + 1)]
     # nom de tous les algorithmes
-    # liste_algo = ["csp_rac", "csp_fc", "csp_opt", "ag", "ag_opt"]
+    # liste_algo = ["csp_rac", "csp_fc", "csp_al", "csp_opt", "csp_opt_budget", "csp_arbre", "ag", "ag_opt", "ag_pop", "ag_iles"]
     liste_algo = ["csp_fc"]
 
     if affichage:
         print("========== Bienvenue dans Wordle Mind ==========")
 
     # exécuter tous les algorithmes
-    liste_all_essais, liste_all_tps = lancer_all_algo(liste_tailles, liste_algo, nb_tours, dictionnaire, trie, dossier, maxsize=maxsize, maxgen=maxgen, affichage=affichage)
-
-    # récupérer les données pour plot
-    liste_donnees_essais, liste_donnees_tps = recuperer_donnees_pour_graphe(liste_tailles, liste_algo, liste_all_essais, liste_all_tps)
+    liste_all_essais, liste_all_tps = lancer_all_algo(liste_tailles, liste_algo, nb_tours, dictionnaire, trie, dossier, maxsize=maxsize, maxgen=maxgen, affichage=affichage, nb_processus=nb_processus, graine=graine, timeout=timeout, tous_les_mots=tous_les_mots, instrumente=instrumente, profil=profil)
 
-    # plot
-    afficher_graphe(liste_tailles, liste_algo, liste_donnees_essais, liste_donnees_tps, nb_tours, dossier)
+    # plot à partir des résultats par colonnes de la campagne
+    afficher_graphe(liste_tailles, liste_algo, resultats.Resultats.charger(os.path.join(dossier, "resultats")), nb_tours, dossier)
@@ -1,57 +1,43 @@
 import copy
 import datetime
 import matplotlib.pyplot as plt
-import os
-import glob
-from statistics import mean
 import time
 
-import utils
+import dictionnaire_compile
+import resultats
 from WordleMindProblem import WordleMindProblem
 
 
-def recuperer_donnees(path_file):
-    moy_essais = []
-    moy_tps = []
+def recuperer_donnees(path_file, algo):
+    """
+    Fonction qui lit les résultats (ancien format texte) d'un algorithme et calcule, pour chaque taille du mot secret,
+    le nombre d'essais moyen et le temps d'exécution (moyenne, p95 et p99).
 
-    for filename in glob.glob(os.path.join(path_file, '*.txt')):
-        with open(os.path.join(os.getcwd(), filename), 'r') as fichier:
-            donnees_essais = []
-            donnees_tps = []
-            flag = int
-            data = ""
-            cpt = 0
+    :param path_file: dossier des fichiers de résultats de l'algorithme
+    :param algo: nom de l'algorithme
 
-            for mot in fichier:
-                mot = mot.strip('\n')
-                if cpt == 0:
-                    for i, lettre in enumerate(mot):
-                        if lettre == "]":
-                            flag = i
-                cpt += 1
+    :type path_file: str
+    :type algo: str
 
-                data = mot[flag + 2:]
-                essais = data[0]
-                tps = data[3:]
+    :return: tailles, nombre d'essais moyen, temps moyen, p95 et p99 du temps (un élément par taille)
+    :rtype: (np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray)
+    """
 
-                if essais == "-":
-                    essais = -1
+    stock = resultats.lire_dossier_texte(path_file, algo)
+    # les parties qui n'ont pas abouti (-1 tentatives) sont comptées, comme dans les anciennes moyennes
+    agregat_essais = resultats.agreger(stock, "nb_essais", par=("taille",), statut=None)
+    agregat_tps = resultats.agreger(stock, "temps", par=("taille",), statut=None)
 
-                donnees_essais.append(int(essais))
-                donnees_tps.append(float(tps))
-
-        moy_essais.append(mean(donnees_essais))
-        moy_tps.append(mean(donnees_tps))
-
-    return moy_essais, moy_tps
+    return (agregat_essais["taille"], agregat_essais["moyenne"], agregat_tps["moyenne"], agregat_tps["p95"],
+            agregat_tps["p99"])
 
 
 if __name__ == "__main__":
     print("===== START =====")
 
     file_path = "./dico.txt"
-    dictionnaire = utils.lire_dictionnaire(file_path)  # lecture du dictionnaire
-    trie = utils.lire_dictionnaire_trie(file_path)
+    # lecture du dictionnaire (compilé dans le cache au premier lancement, puis projeté en mémoire)
+    dictionnaire, trie = dictionnaire_compile.charger_dictionnaires(file_path, "./cache/")
 
     # nom de tous les algorithmes
     # liste_algo = ["csp_rac", "csp_fc", "csp_opt", "ag", "ag_opt"]
@@ -68,42 +54,19 @@ if __name__ == "__main__":
 
     fig, axs = plt.subplots(1, 2, figsize=(18, 8))
 
-    print("----- csp_fc -----")
-
-    csp_fc_path = "data/csp_fc/"
-    csp_fc_essais, csp_fc_tps = recuperer_donnees(csp_fc_path)
-
-    axs[0].plot(liste_tailles, csp_fc_essais, label="csp_fc")
-    axs[1].plot(liste_tailles, csp_fc_tps, label="csp_fc")
-
-    print("----- csp_opt -----")
-
-    csp_opt_path = "data/csp_opt/"
-    csp_opt_essais, csp_opt_tps = recuperer_donnees(csp_opt_path)
+    # dossier des résultats de chaque algorithme (les tailles sont lues dans les résultats : 4 à 8, 2 à 5 pour csp_rac)
+    dossiers_algo = [("csp_fc", "data/csp_fc/"), ("csp_opt", "data/csp_opt/"), ("ag", "data/ag/"),
+                     ("csp_rac", "data/csp_rac/")]
 
-    axs[0].plot(liste_tailles, csp_opt_essais, label="csp_opt")
-    axs[1].plot(liste_tailles, csp_opt_tps, label="csp_opt")
-
-    print("----- ag -----")
-
-    cag_path = "data/ag/"
-    ag_essais, ag_tps = recuperer_donnees(cag_path)
-
-    axs[0].plot(liste_tailles, ag_essais, label="ag")
-    axs[1].plot(liste_tailles, ag_tps, label="ag")
-
-    print("----- csp_rac -----")
-
-    taille_min_rac = 2  # taille minimale du mot secret
-    taille_max_rac = 5  # taille maximale du mot secret
-    # liste des tailles voulues pour le mot secret
-    liste_tailles_rac = [i for i in range(taille_min_rac, taille_max_rac + 1)]
+    for algo, path in dossiers_algo:
+        print("----- {} -----".format(algo))
 
-    csp_rac_path = "data/csp_rac/"
-    csp_rac_essais, csp_rac_tps = recuperer_donnees(csp_rac_path)
+        tailles, moy_essais, moy_tps, p95_tps, p99_tps = recuperer_donnees(path, algo)
 
-    axs[0].plot(liste_tailles_rac, csp_rac_essais, label="csp_rac")
-    axs[1].plot(liste_tailles_rac, csp_rac_tps, label="csp_rac")
+        axs[0].plot(tailles, moy_essais, label=algo)
+        ligne, = axs[1].plot(tailles, moy_tps, label=algo)
+        axs[1].plot(tailles, p95_tps, linestyle="--", color=ligne.get_color(), label=algo+" p95")
+        axs[1].plot(tailles, p99_tps, linestyle=":", color=ligne.get_color(), label=algo+" p99")
 
     print("===== PLOT =====")
 
@@ -111,9 +74,9 @@ if __name__ == "__main__":
     axs[0].set_xlabel("taille du mot secret")
     axs[0].set_ylabel("nombre d'essais moyen")
 
-    axs[1].set_title("temps moyen d'exécution en fonction de la taille du mot secret")
+    axs[1].set_title("temps d'exécution (moyenne, p95, p99) en fonction de la taille du mot secret")
     axs[1].set_xlabel("taille du mot secret")
-    axs[1].set_ylabel("temps moyen")
+    axs[1].set_ylabel("temps")
 
     plt.legend()
     # plt.show()
@@ -1,91 +1,260 @@
-import sys
+import concurrent.futures
+import os
+import shutil
 import time
 
+import numpy as np
+
+import lexique
+import moteur_feedback
 import utils
-import CSP as csp
 
 
-def liste_mot_en_str(mot_list):
-    mot_str = ""
-    for lettre in mot_list:
-        mot_str += lettre
-    return mot_str
+# moteur de feedback de chaque processus du pool (initialisé une seule fois par processus)
+_moteur = None
+
+
+def initialiser_processus(file_path, taille, dossier_cache):
+    """
+    Fonction exécutée au démarrage de chaque processus du pool : elle charge les mots de la taille voulue.
+
+    :param file_path: chemin du dictionnaire
+    :param taille: taille des mots
+    :param dossier_cache: dossier du cache disque des tables de feedback (None si pas de cache)
+
+    :type file_path: str
+    :type taille: int
+    :type dossier_cache: str
+    """
+
+    global _moteur
+    dictionnaire = lexique.lire_lexique(file_path)
+    _moteur = moteur_feedback.MoteurFeedback(dictionnaire[taille], dossier_cache=dossier_cache)
+
+
+def calculer_bloc(debut, fin, chemin_bloc):
+    """
+    Fonction qui calcule les histogrammes des feedbacks des mots tests d'indices debut à fin-1
+    par rapport à tous les mots secrets, et les écrit dans un fichier (point de reprise).
+
+    :param debut: indice du premier mot test du bloc
+    :param fin: indice du dernier mot test du bloc + 1
+    :param chemin_bloc: chemin du fichier du bloc
+
+    :type debut: int
+    :type fin: int
+    :type chemin_bloc: str
+
+    :return: indice du premier mot test du bloc
+    :rtype: int
+    """
+
+    histogrammes = _moteur.histogrammes(np.arange(debut, fin), np.arange(_moteur.nb_mots))
+
+    chemin_tmp = "{}.{}.tmp".format(chemin_bloc, os.getpid())
+    with open(chemin_tmp, "wb") as fichier:
+        np.save(fichier, histogrammes.astype(np.uint32))
+    os.replace(chemin_tmp, chemin_bloc)
+
+    return debut
+
+
+def moyennes_mots_restants(histogrammes, code_gagnant):
+    """
+    Fonction qui calcule, pour chaque mot test, le nombre moyen de mots restants après l'avoir proposé.
+    Pour un mot secret de feedback c, il reste les histogrammes[c] mots de même feedback
+    (aucun si le mot test est le mot secret), d'où une moyenne de somme(h_c ** 2) / nb_mots.
+
+    :param histogrammes: matrice du nombre de mots secrets par code de feedback (une ligne par mot test)
+    :param code_gagnant: code du feedback Feedback(taille, 0)
+
+    :type histogrammes: np.ndarray
+    :type code_gagnant: int
+
+    :return: somme des nombres de mots restants, moyenne des nombres de mots restants
+    :rtype: (np.ndarray, np.ndarray)
+    """
+
+    carres = histogrammes.astype(np.int64) ** 2
+    sommes = carres.sum(axis=1) - carres[:, code_gagnant]
+    nb_mots = histogrammes.shape[0]
+
+    return sommes, sommes / nb_mots
+
+
+def balayer_taille(file_path, taille, dossier_sortie, nb_processus=None, taille_bloc=256, dossier_cache=None):
+    """
+    Fonction qui calcule, pour chaque mot test d'une taille donnée, le nombre moyen de mots restants après
+    l'avoir proposé en premier, en répartissant les mots tests sur un pool de processus.
+    Chaque bloc de mots tests calculé est sauvegardé : un calcul interrompu reprend là où il s'était arrêté.
+
+    Les résultats sont écrits dans le dossier de sortie :
+    - premier_mot_n<taille>.npy : histogrammes des feedbacks (une ligne par mot test, une colonne par code),
+      dont on peut déduire toute la matrice mot_test x mot_secret des nombres de mots restants
+    - resume_n<taille>.csv : mots tests triés par nombre moyen de mots restants
+
+    :param file_path: chemin du dictionnaire
+    :param taille: taille des mots
+    :param dossier_sortie: dossier des résultats
+    :param nb_processus: nombre de processus (nombre de coeurs si None)
+    :param taille_bloc: nombre de mots tests par bloc
+    :param dossier_cache: dossier du cache disque des tables de feedback (None si pas de cache)
+
+    :type file_path: str
+    :type taille: int
+    :type dossier_sortie: str
+    :type nb_processus: int
+    :type taille_bloc: int
+    :type dossier_cache: str
+
+    :return: meilleur mot test, nombre moyen de mots restants pour ce mot, nombre de mots de cette taille
+    :rtype: (str, float, int)
+    """
+
+    dictionnaire = lexique.lire_lexique(file_path)
+    liste_mots = dictionnaire[taille]
+    moteur = moteur_feedback.MoteurFeedback(liste_mots, dossier_cache=dossier_cache)
+
+    if dossier_cache is not None:
+        # la table est calculée une seule fois ici, puis projetée en mémoire par chaque processus
+        moteur.table()
+
+    # les points de reprise ne sont valables que pour ce contenu du dictionnaire et cette taille de bloc
+    dossier_blocs = os.path.join(dossier_sortie, "n{}_{}_b{}".format(taille, moteur.empreinte[:16], taille_bloc))
+    os.makedirs(dossier_blocs, exist_ok=True)
+
+    chemins_blocs = []
+    blocs = []
+    for debut in range(0, moteur.nb_mots, taille_bloc):
+        chemin_bloc = os.path.join(dossier_blocs, "bloc_{:06d}.npy".format(debut))
+        chemins_blocs.append(chemin_bloc)
+        if not os.path.exists(chemin_bloc):
+            blocs.append((debut, min(debut + taille_bloc, moteur.nb_mots), chemin_bloc))
+
+    nb_blocs = len(chemins_blocs)
+    nb_blocs_faits = nb_blocs - len(blocs)
+    if nb_blocs_faits > 0:
+        print("taille {} : reprise à {}/{} blocs".format(taille, nb_blocs_faits, nb_blocs))
+
+    if blocs:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=nb_processus, initializer=initialiser_processus,
+                                                    initargs=(file_path, taille, dossier_cache)) as pool:
+            taches = [pool.submit(calculer_bloc, *bloc) for bloc in blocs]
+            for tache in concurrent.futures.as_completed(taches):
+                tache.result()
+                nb_blocs_faits += 1
+                print(f"\r{nb_blocs_faits}/{nb_blocs}", end="")
+        print()
+
+    # assemblage des blocs
+    histogrammes = np.concatenate([np.load(chemin) for chemin in chemins_blocs])
+    if len(histogrammes) != moteur.nb_mots:
+        raise ValueError("blocs incohérents dans {} : {} lignes pour {} mots".format(
+            dossier_blocs, len(histogrammes), moteur.nb_mots))
+    type_effectifs = np.uint16 if moteur.nb_mots < 2 ** 16 else np.uint32
+    np.save(os.path.join(dossier_sortie, "premier_mot_n{}.npy".format(taille)), histogrammes.astype(type_effectifs))
+
+    sommes, moyennes = moyennes_mots_restants(histogrammes, moteur.code_gagnant)
+    ordre = np.argsort(sommes, kind="stable")
+    with open(os.path.join(dossier_sortie, "resume_n{}.csv".format(taille)), "w") as fichier:
+        fichier.write("mot_test,moyenne_mots_restants\n")
+        for i in ordre:
+            fichier.write("{},{}\n".format(utils.liste_mot_en_str(liste_mots[i]), moyennes[i]))
+
+    shutil.rmtree(dossier_blocs)
+
+    meilleur = ordre[0]
+    return utils.liste_mot_en_str(liste_mots[meilleur]), float(moyennes[meilleur]), moteur.nb_mots
+
+
+def lire_premiers_mots(chemin):
+    """
+    Fonction qui lit le fichier des meilleurs premiers mots (un mot par taille, en majuscules).
+
+    :param chemin: chemin du fichier
+    :type chemin: str
+
+    :return: meilleur premier mot de chaque taille (en minuscules)
+    :rtype: dict[int, list[str]]
+    """
+
+    premiers_mots = dict()
+    with open(chemin, "r") as fichier:
+        for ligne in fichier:
+            mot = ligne.strip("\n")
+            if mot:
+                premiers_mots[len(mot)] = list(mot.lower())
+
+    return premiers_mots
+
+
+def mettre_a_jour_premiers_mots(chemin, premiers_mots):
+    """
+    Fonction qui met à jour le fichier des meilleurs premiers mots (un mot par taille, en majuscules).
+
+    :param chemin: chemin du fichier
+    :param premiers_mots: meilleur premier mot pour chaque taille recalculée
+
+    :type chemin: str
+    :type premiers_mots: dict[int, str]
+    """
+
+    mots_par_taille = dict()
+    if os.path.exists(chemin):
+        with open(chemin, "r") as fichier:
+            for ligne in fichier:
+                mot = ligne.strip("\n")
+                if mot:
+                    mots_par_taille[len(mot)] = mot
+
+    for taille, mot in premiers_mots.items():
+        mots_par_taille[taille] = mot.upper()
+
+    with open(chemin, "w") as fichier:
+        for taille in sorted(mots_par_taille):
+            fichier.write(mots_par_taille[taille] + "\n")
 
 
 if __name__ == "__main__":
     file_path = "./dico.txt"
-    dictionnaire = utils.lire_dictionnaire(file_path)
+    dictionnaire = lexique.lire_lexique(file_path)
 
     liste_tailles = list(dictionnaire.keys())
     liste_tailles.sort()
 
-    # nb_mots_par_taille = dict()
-    # for taille in liste_tailles:
-    #     nb_mots_par_taille.update({taille: len(dictionnaire[taille])})
-
     taille_min = 5  # min(liste_tailles)
     taille_max = max(liste_tailles)
 
-    nb_mots_restants_par_taille = dict()
+    dossier_sortie = "./out/"           # dossier des résultats (et des points de reprise)
+    dossier_cache = "./cache/"          # cache disque des tables de feedback
+    nb_processus = os.cpu_count()       # nombre de processus du pool
+    mettre_a_jour_data = False          # si on veut réécrire ./data/premier_mot.txt avec les résultats
+
+    os.makedirs(dossier_sortie, exist_ok=True)
+    premiers_mots = dict()
 
     print("\n----- DEBUT -----\n")
 
     debut_tps_calcul = time.perf_counter()
     for taille in range(taille_min, taille_max + 1):
-        out_file_path = "./out/out_" + str(taille) + ".csv"
-        moy_min = float("infinity")
-        mot_opt = ""
-        liste_mots = dictionnaire[taille]
-        nb_mot_taille = len(liste_mots)
-        with open(out_file_path, "w") as out_file:
-            # we write the list of words in the file
-            out_file.write("mot_test|mot_secret,")
-            for mot in liste_mots:
-                mot = liste_mot_en_str(mot)
-                out_file.write(mot + ",")
-            out_file.write("\n")
-            debut_tps_taille = time.perf_counter()
-            for i, mot_test in enumerate(liste_mots):
-                mot_test_str = liste_mot_en_str(mot_test)
-                nb_mots_restants = 0
-                out_file.write(mot_test_str + ",")
-                # if i == 0:
-                #     print("=")
-                # elif i % 100 == 0:
-                #     print("-")
-                # elif i % 10 == 0:
-                #     print("_")
-
-                for j, mot_secret in enumerate(liste_mots):
-                    # if j == 0:
-                    #     print("*", end='')
-                    # elif j % 1000 == 0:
-                    #     print(",")
-                    # elif j % 100 == 0:
-                    #     print(".", end='')
-
-                    feedback = utils.recuperer_feedback(mot_secret, mot_test)
-                    mots_restants = csp.filtrer_propositions(liste_mots, mot_test, feedback)
-                    out_file.write(str(len(mots_restants)) + ",")
-                    nb_mots_restants += len(mots_restants)
-
-                moy_mots_restants = nb_mots_restants / nb_mot_taille
-                out_file.write(str(moy_mots_restants) + "\n")
-                nb_mots_restants_par_taille.update({taille: {mot_test_str: moy_mots_restants}})
-
-                if moy_mots_restants < moy_min:
-                    moy_min = moy_mots_restants
-                    mot_opt = mot_test_str
-                # we clear the previous  console line and then print the current one/
-                print(f"\r{i + 1}/{nb_mot_taille}")
+        if taille not in dictionnaire:
+            continue
 
+        debut_tps_taille = time.perf_counter()
+        mot_opt, moy_min, nb_mot_taille = balayer_taille(file_path, taille, dossier_sortie, nb_processus=nb_processus,
+                                                         dossier_cache=dossier_cache)
         fin_tps_taille = time.perf_counter()
         tps_taille = fin_tps_taille - debut_tps_taille
 
+        premiers_mots[taille] = mot_opt
+
         print(
             "taille {} ({:.5f} s):\t{}\t{:.2f}/{}".format(taille, tps_taille, mot_opt.upper(), moy_min, nb_mot_taille))
 
     fin_tps_calcul = time.perf_counter()
     tps_calcul = fin_tps_calcul - debut_tps_calcul
 
+    if mettre_a_jour_data:
+        mettre_a_jour_premiers_mots("./data/premier_mot.txt", premiers_mots)
+
     print("\n----- FIN ----- {:.5f} s\n".format(tps_calcul))
@@ -0,0 +1,391 @@
+import csv
+import glob
+import os
+import re
+
+import numpy as np
+
+
+# colonnes des résultats et leur type (les compteurs d'instrumentation sont des colonnes entières en plus)
+TYPES_COLONNES = {
+    "mot_secret": "S",      # mot secret (ASCII, largeur fixe)
+    "taille": np.int16,     # taille du mot secret
+    "algo": "S",            # nom de l'algorithme
+    "nb_essais": np.int32,  # nombre de tentatives (-1 si la partie n'a pas abouti)
+    "temps": np.float64,    # temps d'exécution de la partie (en secondes)
+    "graine": np.int64,     # graine de la partie (-1 si inconnue)
+    "statut": "S",          # "ok", "timeout", "erreur" ou "echec"
+}
+
+# colonnes des journaux qui ne sont ni des résultats ni des compteurs (trace de l'exception d'une partie en erreur)
+COLONNES_IGNOREES = ("indice", "erreur")
+
+# type des colonnes de compteurs
+TYPE_COMPTEUR = np.int64
+
+# quantiles calculés par défaut par agreger (en pourcentage)
+QUANTILES = (50, 95, 99)
+
+
+class Resultats:
+    """
+    Résultats de parties stockés par colonnes : un tableau numpy typé par colonne (une ligne par partie).
+    Les résultats sont sauvegardés dans un dossier avec un fichier .npy par colonne, et rechargés par
+    projection en mémoire (mmap) : seules les colonnes utilisées par une agrégation sont lues.
+    """
+
+    def __init__(self, colonnes):
+        self.colonnes = colonnes    # dict[str, np.ndarray] nom de la colonne -> valeurs
+
+    def __len__(self):
+        return len(next(iter(self.colonnes.values()))) if self.colonnes else 0
+
+    def __getitem__(self, nom):
+        return self.colonnes[nom]
+
+    def compteurs(self):
+        """
+        Fonction qui renvoie les noms des colonnes de compteurs.
+
+        :return: noms des colonnes de compteurs
+        :rtype: list[str]
+        """
+
+        return [nom for nom in self.colonnes if nom not in TYPES_COLONNES]
+
+    def selection(self, masque):
+        """
+        Fonction qui renvoie les résultats des lignes sélectionnées.
+
+        :param masque: masque (ou indices) des lignes
+        :type masque: np.ndarray
+
+        :return: résultats sélectionnés
+        :rtype: Resultats
+        """
+
+        return Resultats({nom: valeurs[masque] for nom, valeurs in self.colonnes.items()})
+
+    def sauvegarder(self, dossier):
+        """
+        Fonction qui sauvegarde les résultats dans un dossier (un fichier .npy par colonne).
+
+        :param dossier: dossier des résultats
+        :type dossier: str
+        """
+
+        os.makedirs(dossier, exist_ok=True)
+        for nom, valeurs in self.colonnes.items():
+            np.save(os.path.join(dossier, "{}.npy".format(nom)), valeurs)
+
+    @staticmethod
+    def charger(dossier):
+        """
+        Fonction qui charge les résultats sauvegardés avec sauvegarder, par projection en mémoire.
+
+        :param dossier: dossier des résultats
+        :type dossier: str
+
+        :return: résultats
+        :rtype: Resultats
+        """
+
+        colonnes = dict()
+        for chemin in sorted(glob.glob(os.path.join(dossier, "*.npy"))):
+            nom = os.path.splitext(os.path.basename(chemin))[0]
+            colonnes[nom] = np.load(chemin, mmap_mode="r")
+
+        if not colonnes:
+            return creer_resultats([])
+
+        return Resultats(colonnes)
+
+    @staticmethod
+    def concatener(liste_resultats):
+        """
+        Fonction qui met bout à bout plusieurs résultats (les compteurs absents valent 0).
+
+        :param liste_resultats: liste de résultats
+        :type liste_resultats: list[Resultats]
+
+        :return: résultats
+        :rtype: Resultats
+        """
+
+        liste_resultats = [resultats for resultats in liste_resultats if len(resultats) > 0]
+        if not liste_resultats:
+            return creer_resultats([])
+
+        noms = list(TYPES_COLONNES)
+        for resultats in liste_resultats:
+            noms += [nom for nom in resultats.compteurs() if nom not in noms]
+
+        colonnes = dict()
+        for nom in noms:
+            colonnes[nom] = np.concatenate([resultats[nom] if nom in resultats.colonnes
+                                            else np.zeros(len(resultats), dtype=TYPE_COMPTEUR)
+                                            for resultats in liste_resultats])
+
+        return Resultats(colonnes)
+
+
+def creer_resultats(lignes, compteurs=()):
+    """
+    Fonction qui range des parties dans des résultats par colonnes.
+
+    :param lignes: une partie par ligne (les colonnes absentes ont une valeur par défaut)
+    :param compteurs: noms des colonnes de compteurs
+
+    :type lignes: list[dict]
+    :type compteurs: list[str]
+
+    :return: résultats
+    :rtype: Resultats
+    """
+
+    defauts = {"mot_secret": "", "taille": 0, "algo": "", "nb_essais": -1, "temps": 0.0, "graine": -1,
+               "statut": "ok"}
+
+    colonnes = dict()
+    for nom, type_colonne in TYPES_COLONNES.items():
+        valeurs = [ligne.get(nom, defauts[nom]) for ligne in lignes]
+        if type_colonne == "S":
+            colonnes[nom] = np.array([str(valeur).encode("ascii") for valeur in valeurs], dtype="S")
+        else:
+            colonnes[nom] = np.array(valeurs, dtype=type_colonne)
+
+    for nom in compteurs:
+        colonnes[nom] = np.array([ligne.get(nom, 0) for ligne in lignes], dtype=TYPE_COMPTEUR)
+
+    return Resultats(colonnes)
+
+
+def lire_journaux(dossier):
+    """
+    Fonction qui lit les journaux d'une campagne de plot.lancer_all_algo (fichiers <algo>_n<taille>.csv).
+    Les colonnes des journaux qui ne sont pas des colonnes des résultats sont des compteurs.
+
+    :param dossier: dossier de la campagne
+    :type dossier: str
+
+    :return: résultats de toutes les parties de la campagne
+    :rtype: Resultats
+    """
+
+    liste_resultats = []
+    for chemin in sorted(glob.glob(os.path.join(dossier, "*_n*.csv"))):
+        correspondance = re.fullmatch(r"(.+)_n(\d+)\.csv", os.path.basename(chemin))
+        if correspondance is None:
+            continue
+        algo, taille = correspondance.group(1), int(correspondance.group(2))
+
+        with open(chemin, "r", newline="") as fichier:
+            lecteur = csv.DictReader(fichier)
+            compteurs = [nom for nom in lecteur.fieldnames if nom not in TYPES_COLONNES and nom not in COLONNES_IGNOREES]
+            lignes = []
+            for ligne in lecteur:
+                partie = {"mot_secret": ligne["mot_secret"], "taille": taille, "algo": algo,
+                          "nb_essais": int(ligne["nb_essais"]), "temps": float(ligne["temps"]),
+                          "graine": int(ligne["graine"]), "statut": ligne["statut"]}
+                for nom in compteurs:
+                    partie[nom] = int(ligne[nom]) if ligne[nom] else 0
+                lignes.append(partie)
+
+        liste_resultats.append(creer_resultats(lignes, compteurs))
+
+    return Resultats.concatener(liste_resultats)
+
+
+def lire_fichier_texte(chemin, algo):
+    """
+    Fonction qui lit un fichier de résultats de l'ancien format texte : une partie par ligne, de la forme
+    "['s', 'e', 'e', 'm'],7,0.029" (mot secret, nombre de tentatives, temps d'exécution).
+    Les deux derniers champs sont lus à partir de la fin de la ligne, quel que soit leur nombre de chiffres.
+
+    :param chemin: chemin du fichier
+    :param algo: nom de l'algorithme
+
+    :type chemin: str
+    :type algo: str
+
+    :return: résultats du fichier
+    :rtype: Resultats
+    """
+
+    lignes = []
+    with open(chemin, "r") as fichier:
+        for ligne in fichier:
+            ligne = ligne.strip()
+            if not ligne:
+                continue
+
+            mot, essais, tps = ligne.rsplit(",", 2)
+            mot_secret = "".join(re.findall(r"[a-z]", mot))
+            nb_essais = int(essais)
+            lignes.append({"mot_secret": mot_secret, "taille": len(mot_secret), "algo": algo,
+                           "nb_essais": nb_essais, "temps": float(tps), "statut": "ok" if nb_essais >= 0 else "echec"})
+
+    return creer_resultats(lignes)
+
+
+def lire_dossier_texte(dossier, algo):
+    """
+    Fonction qui lit tous les fichiers de résultats de l'ancien format texte d'un dossier.
+
+    :param dossier: dossier des fichiers .txt
+    :param algo: nom de l'algorithme
+
+    :type dossier: str
+    :type algo: str
+
+    :return: résultats de tous les fichiers
+    :rtype: Resultats
+    """
+
+    return Resultats.concatener([lire_fichier_texte(chemin, algo)
+                                 for chemin in sorted(glob.glob(os.path.join(dossier, "*.txt")))])
+
+
+def _groupes(resultats, par):
+    """
+    Fonction qui numérote les groupes de lignes qui ont les mêmes valeurs pour les colonnes données.
+
+    :return: numéro du groupe de chaque ligne, valeurs des colonnes pour chaque groupe
+    :rtype: (np.ndarray, dict[str, np.ndarray])
+    """
+
+    codes = []
+    valeurs_uniques = []
+    for nom in par:
+        valeurs, code = np.unique(np.asarray(resultats[nom]), return_inverse=True)
+        valeurs_uniques.append(valeurs)
+        codes.append(code.reshape(-1))
+
+    if not par:
+        return np.zeros(len(resultats), dtype=np.int64), dict()
+
+    combinaison = np.ravel_multi_index(codes, [len(valeurs) for valeurs in valeurs_uniques])
+    combinaisons, groupes = np.unique(combinaison, return_inverse=True)
+    indices = np.unravel_index(combinaisons, [len(valeurs) for valeurs in valeurs_uniques])
+    cles = {nom: valeurs[indice] for nom, valeurs, indice in zip(par, valeurs_uniques, indices)}
+
+    return groupes.reshape(-1), cles
+
+
+def _filtrer(resultats, statut):
+    if statut is None or len(resultats) == 0:
+        return resultats
+
+    return resultats.selection(np.asarray(resultats["statut"]) == statut.encode("ascii"))
+
+
+def agreger(resultats, colonne="temps", par=("algo", "taille"), quantiles=QUANTILES, statut="ok"):
+    """
+    Fonction qui calcule, pour chaque groupe de parties (mêmes valeurs des colonnes par), le nombre de parties,
+    la moyenne et les quantiles d'une colonne. Tout le calcul est vectorisé : les valeurs sont triées par groupe
+    puis par valeur, et les quantiles sont lus aux positions correspondantes de chaque groupe (interpolation
+    linéaire, comme np.percentile).
+
+    :param resultats: résultats des parties
+    :param colonne: colonne à agréger ("temps", "nb_essais" ou un compteur)
+    :param par: colonnes qui définissent les groupes
+    :param quantiles: quantiles à calculer (en pourcentage)
+    :param statut: statut des parties prises en compte (toutes les parties si None)
+
+    :type resultats: Resultats
+    :type colonne: str
+    :type par: tuple[str]
+    :type quantiles: tuple[float]
+    :type statut: str
+
+    :return: valeurs des colonnes par, "nb", "moyenne" et "p<q>" pour chaque quantile (un élément par groupe)
+    :rtype: dict[str, np.ndarray]
+    """
+
+    resultats = _filtrer(resultats, statut)
+    groupes, cles = _groupes(resultats, par)
+    valeurs = np.asarray(resultats[colonne], dtype=np.float64) if len(resultats) else np.zeros(0)
+
+    nb_groupes = int(groupes.max()) + 1 if len(groupes) else 0
+    effectifs = np.bincount(groupes, minlength=nb_groupes)
+    agregat = dict(cles)
+    agregat["nb"] = effectifs
+    agregat["moyenne"] = np.bincount(groupes, weights=valeurs, minlength=nb_groupes) / np.maximum(effectifs, 1)
+
+    # valeurs triées par groupe puis par valeur, et début de chaque groupe
+    triees = valeurs[np.lexsort((valeurs, groupes))]
+    debuts = np.concatenate(([0], np.cumsum(effectifs)[:-1])) if nb_groupes else effectifs
+
+    for quantile in quantiles:
+        position = debuts + quantile / 100 * (effectifs - 1)
+        bas = np.floor(position).astype(np.int64)
+        haut = np.ceil(position).astype(np.int64)
+        agregat["p{:g}".format(quantile)] = triees[bas] + (triees[haut] - triees[bas]) * (position - bas)
+
+    return agregat
+
+
+def histogrammes(resultats, colonne, bornes, par=("algo", "taille"), statut="ok"):
+    """
+    Fonction qui calcule l'histogramme d'une colonne pour chaque groupe de parties (en un seul comptage).
+
+    :param resultats: résultats des parties
+    :param colonne: colonne de l'histogramme
+    :param bornes: bornes des intervalles (croissantes, len(bornes) - 1 intervalles)
+    :param par: colonnes qui définissent les groupes
+    :param statut: statut des parties prises en compte (toutes les parties si None)
+
+    :type resultats: Resultats
+    :type colonne: str
+    :type bornes: np.ndarray
+    :type par: tuple[str]
+    :type statut: str
+
+    :return: valeurs des colonnes par pour chaque groupe, matrice nb_groupes x nb_intervalles des effectifs
+    :rtype: (dict[str, np.ndarray], np.ndarray)
+    """
+
+    resultats = _filtrer(resultats, statut)
+    groupes, cles = _groupes(resultats, par)
+    bornes = np.asarray(bornes)
+    nb_intervalles = len(bornes) - 1
+
+    # intervalle de chaque valeur (les valeurs hors des bornes sont ignorées, la dernière borne est incluse)
+    valeurs = np.asarray(resultats[colonne], dtype=np.float64) if len(resultats) else np.zeros(0)
+    intervalles = np.searchsorted(bornes, valeurs, side="right") - 1
+    intervalles[valeurs == bornes[-1]] = nb_intervalles - 1
+    dans_bornes = (intervalles >= 0) & (intervalles < nb_intervalles)
+
+    nb_groupes = int(groupes.max()) + 1 if len(groupes) else 0
+    effectifs = np.bincount(groupes[dans_bornes] * nb_intervalles + intervalles[dans_bornes],
+                            minlength=nb_groupes * nb_intervalles)
+
+    return cles, effectifs.reshape(nb_groupes, nb_intervalles)
+
+
+def tableau(agregat, par, liste_par, nom):
+    """
+    Fonction qui met une valeur agrégée au format len(liste_par[0]) x len(liste_par[1]) (-1 si le groupe
+    n'a aucune partie), par exemple les temps moyens par algorithme et par taille pour un graphe.
+
+    :param agregat: résultat de agreger
+    :param par: les deux colonnes des groupes
+    :param liste_par: les valeurs voulues pour chacune des deux colonnes
+    :param nom: valeur agrégée ("moyenne", "p95", ...)
+
+    :type agregat: dict[str, np.ndarray]
+    :type par: (str, str)
+    :type liste_par: (list, list)
+    :type nom: str
+
+    :return: tableau des valeurs
+    :rtype: list[list[float]]
+    """
+
+    valeurs = dict()
+    for cle_1, cle_2, valeur in zip(agregat[par[0]], agregat[par[1]], agregat[nom]):
+        cle_1 = cle_1.decode("ascii") if isinstance(cle_1, bytes) else cle_1.item()
+        cle_2 = cle_2.decode("ascii") if isinstance(cle_2, bytes) else cle_2.item()
+        valeurs[cle_1, cle_2] = float(valeur)
+
+    return [[valeurs.get((cle_1, cle_2), -1) for cle_2 in liste_par[1]] for cle_1 in liste_par[0]]
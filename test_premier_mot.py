@@ -1,5 +1,7 @@
 import time
 
+import dictionnaire_compile
+import moteur_feedback
 import utils
 from WordleMindProblem import WordleMindProblem
 
@@ -8,8 +10,10 @@ if __name__ == "__main__":
     print("========== Bienvenue dans Wordle Mind ========== \n")
 
     file_path = "./dico.txt"
-    dictionnaire = utils.lire_dictionnaire(file_path)
-    trie = utils.lire_dictionnaire_trie(file_path)
+    # lecture du dictionnaire (compilé dans le cache au premier lancement, puis projeté en mémoire)
+    dictionnaire, trie = dictionnaire_compile.charger_dictionnaires(file_path, "./cache/")
+    # tables de feedback lues depuis le cache disque (calculées au premier lancement)
+    moteur_feedback.activer_cache("./cache/")
 
     # toutes les tailles de mot possibles
     liste_tailles = list(dictionnaire.keys())
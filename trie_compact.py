@@ -0,0 +1,359 @@
+import string
+
+import numpy as np
+
+
+# liste des lettres de l'alphabet en lower case
+ALPHABET = list(string.ascii_lowercase)
+
+# nombre de lettres de l'alphabet
+NB_LETTRES = len(ALPHABET)
+
+# indice de chaque lettre dans l'alphabet
+INDICE_LETTRE = {lettre: i for i, lettre in enumerate(ALPHABET)}
+
+
+class TrieCompact:
+    """
+    Automate minimal (DAWG) qui représente le dictionnaire : les préfixes communs et les suffixes communs
+    des mots sont partagés, et il y a une racine par taille de mot.
+    Les noeuds sont des entiers et les transitions sont stockées dans un tableau nb_noeuds x 26
+    (-1 s'il n'y a pas de transition), ce qui permet de le sauvegarder et de le recharger directement.
+    Chaque noeud a aussi une table de support : pour chaque position en dessous de lui, le masque des lettres
+    qu'on peut encore y trouver, ce qui permet de filtrer les domaines du CSP sans parcourir le sous-arbre.
+    """
+
+    def __init__(self, transitions, terminaux, racines, masques=None, supports=None):
+        self.transitions = np.ascontiguousarray(transitions, dtype=np.int32)   # fils de chaque noeud par lettre
+        self.terminaux = np.ascontiguousarray(terminaux, dtype=np.bool_)        # noeuds de fin de mot
+        self.racines = racines                                                  # dict[int, int] taille -> racine
+
+        # masque (sur 26 bits) des lettres des fils de chaque noeud
+        if masques is None:
+            masques = ((self.transitions >= 0).astype(np.int64) << np.arange(NB_LETTRES)).sum(axis=1)
+        self.masques = np.ascontiguousarray(masques, dtype=np.int64)
+
+        # masque des lettres atteignables à chaque profondeur sous chaque noeud (nb_noeuds x profondeur maximale)
+        if supports is None:
+            supports = calculer_supports(self.transitions, self.masques)
+        self.supports = np.ascontiguousarray(supports, dtype=np.int64)
+        self.profondeur = self.supports.shape[1]
+
+        # accès rapides (sans passer par les scalaires numpy) pour les parcours en Python
+        self._transitions = memoryview(self.transitions.ravel())
+        self._terminaux = memoryview(self.terminaux.view(np.uint8))
+        self._masques = memoryview(self.masques)
+        self._supports = memoryview(self.supports.ravel())
+
+    @property
+    def nb_noeuds(self):
+        return self.transitions.shape[0]
+
+    def tailles(self):
+        """
+        Fonction qui renvoie les tailles de mot présentes dans le trie.
+
+        :return: liste triée des tailles
+        :rtype: list[int]
+        """
+
+        return sorted(self.racines)
+
+    def racine(self, taille_mot):
+        """
+        Fonction qui renvoie la racine du trie des mots d'une taille donnée.
+
+        :param taille_mot: taille des mots
+        :type taille_mot: int
+
+        :return: noeud racine (-1 s'il n'y a aucun mot de cette taille)
+        :rtype: int
+        """
+
+        return self.racines.get(taille_mot, -1)
+
+    def enfant(self, noeud, lettre):
+        """
+        Fonction qui descend d'un niveau dans le trie en suivant une lettre.
+
+        :param noeud: noeud courant
+        :param lettre: lettre à suivre
+
+        :type noeud: int
+        :type lettre: str
+
+        :return: noeud fils (-1 s'il n'existe pas)
+        :rtype: int
+        """
+
+        return self._transitions[noeud * NB_LETTRES + INDICE_LETTRE[lettre]]
+
+    def lettres(self, noeud):
+        """
+        Fonction qui renvoie les lettres des fils d'un noeud.
+
+        :param noeud: un noeud
+        :type noeud: int
+
+        :return: liste des lettres
+        :rtype: list[str]
+        """
+
+        masque = self._masques[noeud]
+        return [lettre for i, lettre in enumerate(ALPHABET) if masque >> i & 1]
+
+    def masque_lettres(self, noeud):
+        """
+        Fonction qui renvoie le masque sur 26 bits des lettres des fils d'un noeud (bit i pour la lettre i).
+
+        :param noeud: un noeud
+        :type noeud: int
+
+        :return: masque des lettres
+        :rtype: int
+        """
+
+        return self._masques[noeud]
+
+    def support(self, noeud, decalage):
+        """
+        Fonction qui renvoie le masque des lettres qu'on peut trouver à une profondeur donnée sous un noeud
+        (decalage 0 pour les lettres des fils du noeud, 1 pour celles des petits-fils, etc.).
+
+        :param noeud: un noeud
+        :param decalage: profondeur sous le noeud
+
+        :type noeud: int
+        :type decalage: int
+
+        :return: masque des lettres
+        :rtype: int
+        """
+
+        return self._supports[noeud * self.profondeur + decalage]
+
+    def enfants(self, noeud):
+        """
+        Fonction qui renvoie les fils d'un noeud avec la lettre qui y mène.
+
+        :param noeud: un noeud
+        :type noeud: int
+
+        :return: liste de (lettre, noeud fils)
+        :rtype: list[(str, int)]
+        """
+
+        return [(lettre, self.enfant(noeud, lettre)) for lettre in self.lettres(noeud)]
+
+    def est_terminal(self, noeud):
+        """
+        Fonction qui teste si un noeud marque la fin d'un mot.
+
+        :param noeud: un noeud
+        :type noeud: int
+
+        :return: vrai si un mot se termine à ce noeud
+        :rtype: bool
+        """
+
+        return self._terminaux[noeud] == 1
+
+    def descendre(self, mot, noeud=None):
+        """
+        Fonction qui descend dans le trie en suivant les lettres d'un mot (à partir de la racine de sa taille
+        si aucun noeud n'est donné).
+
+        :param mot: lettres à suivre
+        :param noeud: noeud de départ
+
+        :type mot: list[str]
+        :type noeud: int
+
+        :return: noeud atteint (-1 si le chemin n'existe pas)
+        :rtype: int
+        """
+
+        if noeud is None:
+            noeud = self.racine(len(mot))
+
+        for lettre in mot:
+            if noeud < 0:
+                return -1
+            noeud = self.enfant(noeud, lettre)
+
+        return noeud
+
+    def contient(self, mot):
+        """
+        Fonction qui teste la présence d'un mot dans le trie.
+
+        :param mot: un mot
+        :type mot: list[str]
+
+        :return: vrai si le mot est présent
+        :rtype: bool
+        """
+
+        noeud = self.descendre(mot)
+        return noeud >= 0 and self.est_terminal(noeud)
+
+    def sauvegarder(self, chemin, empreinte=""):
+        """
+        Fonction qui sauvegarde le trie dans un fichier .npz.
+
+        :param chemin: chemin du fichier
+        :param empreinte: empreinte du dictionnaire dont est issu le trie
+
+        :type chemin: str
+        :type empreinte: str
+        """
+
+        tailles = np.array(sorted(self.racines), dtype=np.int32)
+        racines = np.array([self.racines[taille] for taille in tailles], dtype=np.int32)
+
+        with open(chemin, "wb") as fichier:
+            np.savez(fichier, transitions=self.transitions, terminaux=self.terminaux, supports=self.supports,
+                     tailles=tailles, racines=racines, empreinte=np.array(empreinte))
+
+    @staticmethod
+    def charger(chemin):
+        """
+        Fonction qui charge un trie sauvegardé avec sauvegarder.
+
+        :param chemin: chemin du fichier
+        :type chemin: str
+
+        :return: le trie et l'empreinte du dictionnaire dont il est issu
+        :rtype: (TrieCompact, str)
+        """
+
+        with np.load(chemin) as donnees:
+            racines = {int(taille): int(racine) for taille, racine in zip(donnees["tailles"], donnees["racines"])}
+            supports = donnees["supports"] if "supports" in donnees else None
+            trie = TrieCompact(donnees["transitions"], donnees["terminaux"], racines, supports=supports)
+            empreinte = str(donnees["empreinte"])
+
+        return trie, empreinte
+
+
+def calculer_supports(transitions, masques):
+    """
+    Fonction qui calcule la table de support de chaque noeud : supports[noeud, k] est le masque des lettres
+    qu'on peut trouver k niveaux sous les fils du noeud. Les noeuds sont traités par hauteur croissante,
+    chaque table étant l'union des tables de ses fils décalées d'un niveau.
+
+    :param transitions: fils de chaque noeud par lettre (-1 s'il n'y a pas de transition)
+    :param masques: masque des lettres des fils de chaque noeud
+
+    :type transitions: np.ndarray
+    :type masques: np.ndarray
+
+    :return: tables de support (nb_noeuds x hauteur maximale)
+    :rtype: np.ndarray
+    """
+
+    nb_noeuds = transitions.shape[0]
+
+    # hauteur de chaque noeud (tous les mots sous un noeud ont la même taille) : 0 pour les fins de mot
+    premier_fils = transitions[np.arange(nb_noeuds), np.argmax(transitions >= 0, axis=1)]
+    hauteurs = np.zeros(nb_noeuds, dtype=np.int64)
+    while True:
+        nouvelles = np.where(premier_fils >= 0, hauteurs[premier_fils] + 1, 0)
+        if np.array_equal(nouvelles, hauteurs):
+            break
+        hauteurs = nouvelles
+
+    profondeur = max(int(hauteurs.max(initial=0)), 1)
+    supports = np.zeros((nb_noeuds, profondeur), dtype=np.int64)
+    supports[:, 0] = masques
+
+    for hauteur in range(2, profondeur + 1):
+        noeuds = np.flatnonzero(hauteurs == hauteur)
+        for lettre in range(NB_LETTRES):
+            fils = transitions[noeuds, lettre]
+            existe = fils >= 0
+            supports[noeuds[existe], 1:] |= supports[fils[existe], :-1]
+
+    return supports
+
+
+def construire_trie(liste_mots):
+    """
+    Fonction qui construit l'automate minimal (DAWG) d'une liste de mots, par l'algorithme incrémental
+    de Daciuk et al. : les mots de chaque taille sont insérés dans l'ordre alphabétique, et dès qu'une
+    branche ne peut plus changer, ses noeuds sont fusionnés avec des noeuds équivalents déjà construits.
+
+    :param liste_mots: liste de mots (chaines de caractères)
+    :type liste_mots: list[str]
+
+    :return: le trie compact
+    :rtype: TrieCompact
+    """
+
+    fils = []           # fils de chaque noeud (dict lettre -> noeud)
+    terminaux = []      # noeuds de fin de mot
+    registre = dict()   # noeuds déjà minimisés, par signature (terminal, fils)
+
+    def nouveau_noeud():
+        fils.append(dict())
+        terminaux.append(False)
+        return len(fils) - 1
+
+    def minimiser(non_verifies, profondeur):
+        # fusion des noeuds de la branche en dessous de la profondeur donnée
+        while len(non_verifies) > profondeur:
+            parent, lettre, noeud = non_verifies.pop()
+            signature = (terminaux[noeud], tuple(sorted(fils[noeud].items())))
+            if signature in registre:
+                fils[parent][lettre] = registre[signature]
+            else:
+                registre[signature] = noeud
+
+    mots_par_taille = dict()
+    for mot in liste_mots:
+        mots_par_taille.setdefault(len(mot), []).append(mot)
+
+    racines = dict()
+    for taille, mots in mots_par_taille.items():
+        racine = nouveau_noeud()
+        racines[taille] = racine
+
+        non_verifies = []   # branche du dernier mot inséré : (parent, lettre, noeud)
+        mot_precedent = ""
+        for mot in sorted(mots):
+            # longueur du préfixe commun avec le mot précédent
+            prefixe = 0
+            while prefixe < len(mot) and prefixe < len(mot_precedent) and mot[prefixe] == mot_precedent[prefixe]:
+                prefixe += 1
+
+            minimiser(non_verifies, prefixe)
+
+            noeud = non_verifies[-1][2] if non_verifies else racine
+            for lettre in mot[prefixe:]:
+                nouveau = nouveau_noeud()
+                fils[noeud][lettre] = nouveau
+                non_verifies.append((noeud, lettre, nouveau))
+                noeud = nouveau
+
+            terminaux[noeud] = True
+            mot_precedent = mot
+
+        minimiser(non_verifies, 0)
+
+    # renumérotation des seuls noeuds atteignables depuis les racines
+    numeros = dict()
+    a_visiter = list(racines.values())
+    while a_visiter:
+        noeud = a_visiter.pop()
+        if noeud not in numeros:
+            numeros[noeud] = len(numeros)
+            a_visiter.extend(fils[noeud].values())
+
+    transitions = np.full((len(numeros), NB_LETTRES), -1, dtype=np.int32)
+    terminaux_compacts = np.zeros(len(numeros), dtype=np.bool_)
+    for noeud, numero in numeros.items():
+        for lettre, f in fils[noeud].items():
+            transitions[numero, INDICE_LETTRE[lettre]] = numeros[f]
+        terminaux_compacts[numero] = terminaux[noeud]
+
+    return TrieCompact(transitions, terminaux_compacts, {taille: numeros[r] for taille, r in racines.items()})
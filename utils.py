@@ -1,7 +1,12 @@
-import itertools
-import string
 import collections
+import hashlib
+import itertools
+import os
 import random
+import string
+
+import domaines as dom
+import trie_compact
 
 
 # liste des lettres de l'alphabet en lower case
@@ -11,6 +16,9 @@ alphabet = list(string.ascii_lowercase)
 #            nombre de lettre proches (mal placées)
 Feedback = collections.namedtuple('Feedback', ['correctes', 'proches'])
 
+# nombre de mots dont on garde la signature en mémoire
+TAILLE_CACHE_SIGNATURES = 1 << 16
+
 
 def liste_mot_en_str(mot_list):
     """
@@ -74,38 +82,42 @@ def lire_dictionnaire(nom_fichier):
     return dictionnaire
 
 
-def lire_dictionnaire_trie(nom_fichier):
+def lire_dictionnaire_trie(nom_fichier, fichier_cache=None):
     """
-    Fonction qui crée un arbre Trie pour représenter le dictionnaire contenu dans le fichier passé en paramètre.
+    Fonction qui crée un arbre Trie (automate minimal compact) pour représenter le dictionnaire
+    contenu dans le fichier passé en paramètre.
+    Si un fichier de cache est donné, le trie y est sauvegardé, et il est rechargé directement
+    depuis ce fichier aux appels suivants tant que le dictionnaire n'a pas changé.
 
     :param nom_fichier: chemin du fichier
+    :param fichier_cache: chemin du fichier de sauvegarde du trie (.npz)
+
     :type nom_fichier: str
+    :type fichier_cache: str
 
-    :return:
-    :rtype:
+    :return: le trie du dictionnaire (une racine par taille de mot)
+    :rtype: TrieCompact
     """
 
-    # La clés du dictionnaire à la racine représentent les tailles des mots.
-    # Pour chaque taille de mot, on retrouve un Trie.
+    with open(nom_fichier, "rb") as fichier:
+        contenu = fichier.read()
+    empreinte = hashlib.sha1(contenu).hexdigest()
 
-    fichier = open(nom_fichier, "r")
-    racine_dico = dict()
+    if fichier_cache is not None and os.path.exists(fichier_cache):
+        trie, empreinte_cache = trie_compact.TrieCompact.charger(fichier_cache)
+        if empreinte_cache == empreinte:
+            return trie
 
-    for mot in fichier:
+    liste_mots = [mot for mot in contenu.decode("ascii").splitlines() if mot]
+    trie = trie_compact.construire_trie(liste_mots)
 
-        mot = mot.strip('\n')
-        taille_mot = len(mot)
+    if fichier_cache is not None:
+        dossier = os.path.dirname(fichier_cache)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        trie.sauvegarder(fichier_cache, empreinte)
 
-        dico_de_travail = racine_dico.setdefault(taille_mot, dict())
-
-        for lettre in mot:
-            dico_de_travail = dico_de_travail.setdefault(lettre, dict())
-
-        dico_de_travail["fin"] = "fin"  # pour pouvoir tester l'existence d'un mot qui pourrait être préfixe d'un autre mot
-
-    fichier.close()
-
-    return racine_dico
+    return trie
 
 
 def present_dans_trie(mot, trie):
@@ -116,15 +128,7 @@ def present_dans_trie(mot, trie):
     :rtype: bool
     """
 
-    dico_de_travail = trie[len(mot)]
-    for lettre in mot:
-
-        if lettre not in dico_de_travail:
-            return False
-
-        dico_de_travail = dico_de_travail[lettre]
-
-    return "fin" in dico_de_travail
+    return trie.contient(mot)
 
 
 def enlever_lettres_correctes(mot_actuel, proposition):
@@ -152,6 +156,35 @@ def enlever_lettres_correctes(mot_actuel, proposition):
     return actuel, guess
 
 
+# signature de chaque mot déjà rencontré (clé : tuple des lettres) : le masque de ses lettres par position et le
+# masque du nombre d'occurrences de chaque lettre (la k-ième occurrence d'une lettre a son propre bit). Le nombre
+# de lettres correctes entre deux mots est le nombre de bits communs des masques de positions, la somme des
+# min(occurrences) celui des masques d'occurrences. Le cache est vidé quand il dépasse TAILLE_CACHE_SIGNATURES mots.
+_signatures = dict()
+
+
+def _signature(mot):
+    signature = _signatures.get(mot)
+    if signature is not None:
+        return signature
+
+    positions = 0       # bit i*26 + l si la lettre l est à la position i
+    occurrences = 0     # bit k*26 + l si la lettre l apparait au moins k+1 fois
+    for i, lettre in enumerate(mot):
+        indice = dom.INDICE_LETTRE[lettre]
+        positions |= 1 << (i * dom.NB_LETTRES + indice)
+        bit = 1 << indice
+        while occurrences & bit:
+            bit <<= dom.NB_LETTRES
+        occurrences |= bit
+
+    if len(_signatures) >= TAILLE_CACHE_SIGNATURES:
+        _signatures.clear()
+    signature = _signatures[mot] = (positions, occurrences)
+
+    return signature
+
+
 def recuperer_nb_lettres_proches(mot_actuel, proposition):
     """
     Fonction qui renvoie le nombre total des lettres proches (mal placées) du mot proposé par rapport au mot actuel.
@@ -166,22 +199,7 @@ def recuperer_nb_lettres_proches(mot_actuel, proposition):
     :rtype: int
     """
 
-    # enlever les lettres correctes pour éviter de les compter deux fois
-    mot_actuel, proposition = enlever_lettres_correctes(mot_actuel, proposition)
-    # nombre de lettres proches (mal placées)
-    nb_lettres_proches = 0
-    # pour chaque lettre du mot proposé
-    for lettre in proposition:
-        # si la lettre est dans le mot actuel
-        pos = mot_actuel.find(lettre)
-        if pos >= 0:
-            # enlever toutes les occurrences de la lettre du mot actuel pour éviter de la compter à nouveau
-            mot_actuel = mot_actuel[:pos] + mot_actuel[pos + 1:]
-
-            # incrémenter le nombre de lettres proches
-            nb_lettres_proches += 1
-
-    return nb_lettres_proches
+    return recuperer_feedback(mot_actuel, proposition).proches
 
 
 def recuperer_nb_lettres_correctes(mot_actuel, proposition):
@@ -198,14 +216,15 @@ def recuperer_nb_lettres_correctes(mot_actuel, proposition):
     :rtype: int
     """
 
-    nb_lettres_correctes = sum([1 for (a, b) in zip(mot_actuel, proposition) if a == b])
-    return nb_lettres_correctes
+    return recuperer_feedback(mot_actuel, proposition).correctes
 
 
 def recuperer_feedback(mot_actuel, proposition):
     """
     Fonction qui compare les deux mots l'un par rapport à l'autre et renvoie un feedback
     (c'est-à-dire le nombre de lettres correctes et proches).
+    Le nombre de lettres proches est la somme des min(occurrences) de chaque lettre moins le nombre de
+    lettres correctes, calculé à partir des signatures des mots.
 
     :param mot_actuel: mot actuel
     :param proposition: mot proposé
@@ -217,9 +236,36 @@ def recuperer_feedback(mot_actuel, proposition):
     :rtype: Feedback
     """
 
-    fb = Feedback(recuperer_nb_lettres_correctes(mot_actuel, proposition),
-                  recuperer_nb_lettres_proches(mot_actuel, proposition))
-    return fb
+    positions_actuel, occurrences_actuel = _signature(tuple(mot_actuel))
+    positions, occurrences = _signature(tuple(proposition))
+
+    correctes = (positions_actuel & positions).bit_count()
+    return Feedback(correctes, (occurrences_actuel & occurrences).bit_count() - correctes)
+
+
+def recuperer_feedback_batch(mot_actuel, propositions):
+    """
+    Fonction qui renvoie le feedback de chacun des mots proposés par rapport au mot actuel.
+
+    :param mot_actuel: mot actuel
+    :param propositions: mots proposés
+
+    :type mot_actuel: list[str]
+    :type propositions: list[list[str]]
+
+    :return: feedback de chaque mot proposé
+    :rtype: list[Feedback]
+    """
+
+    positions_actuel, occurrences_actuel = _signature(tuple(mot_actuel))
+
+    feedbacks = []
+    for proposition in propositions:
+        positions, occurrences = _signature(tuple(proposition))
+        correctes = (positions_actuel & positions).bit_count()
+        feedbacks.append(Feedback(correctes, (occurrences_actuel & occurrences).bit_count() - correctes))
+
+    return feedbacks
 
 
 def test_compatibilite(proposition, feedback, mot_possible):
@@ -253,10 +299,13 @@ def get_nb_incompatibilites(mot, tentatives_precedentes):
     :return: nombre d'incompatibilités
     """
 
+    # le mot est compatible avec une tentative si son feedback par rapport à l'ancien mot est celui obtenu
+    # par l'ancien mot (le feedback est symétrique : on score le mot contre tous les anciens mots à la fois)
+    feedbacks = recuperer_feedback_batch(mot, [ancien_mot for ancien_mot, _ in tentatives_precedentes])
+
     cpt_incompatibilites = 0
-    for ancien_mot, feedback in tentatives_precedentes:
-        compatible = test_compatibilite(ancien_mot, feedback, mot)
-        if not compatible:
+    for feedback_mot, (_, feedback) in zip(feedbacks, tentatives_precedentes):
+        if feedback_mot != feedback:
             cpt_incompatibilites += 1
 
     return cpt_incompatibilites
@@ -266,11 +315,11 @@ def reduire_domaines(mot, feedback, domaines):
     """
     :param mot: mot de la tentative précédente
     :param feedback: feedback de la tentative précédente
-    :param domaines: dictionnaire qui contient une liste de lettres acceptables pour chaque variable
+    :param domaines: domaines des variables (masque des lettres acceptables pour chaque variable)
 
     :type mot: list[str]
     :type feedback: Feedback
-    :type domaines: dict[int: list[str]]
+    :type domaines: Domaines | list[int]
 
     :return: none
     """
@@ -279,15 +328,13 @@ def reduire_domaines(mot, feedback, domaines):
         # si aucune lettre n'est correcte ni proche
         if feedback.proches == 0:
             # on retire toutes les lettres du mot des domaines de toutes les variables
+            masque_mot = dom.masque_lettres(mot)
             for i in range(len(mot)):
-                for lettre in mot:
-                    if lettre in domaines[i]:
-                        domaines[i].remove(lettre)
+                domaines[i] &= ~masque_mot
 
         # si aucune lettre n'est correcte mais certaines sont proches
         else:
             # on retire la lettre instancié pour chaque variable du domaine de cette variable
             # ex : on retire la première lettre du mot de la variable 0 car on sait qu'elle n'apparaitra jamais à cette position
             for i in range(len(mot)):
-                if mot[i] in domaines[i]:
-                    domaines[i].remove(mot[i])
+                domaines[i] &= ~dom.MASQUE_LETTRE[mot[i]]